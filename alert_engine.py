@@ -0,0 +1,436 @@
+import os
+import re
+import string
+import numpy as np
+import pandas as pd
+from queries.streaks import block_starts, block_streaks
+
+
+# --------------------------------------------------
+# VECTORIZED BLOCK ALERT ENGINE
+# --------------------------------------------------
+# Python twin of the EPC/EPI CTE chain (rolling -> flagged -> streaked -> final).
+# It takes the raw base rows from base_scan.fetch_block_base and returns the
+# same columns as the SQL trackers, so the window work runs on our own cores
+# instead of the shared analyst DB.
+
+DEFAULT_ENGINE = os.environ.get("BLOCK_ALERT_ENGINE", "sql")
+
+HIGH_REV_SHARE = 0.015
+STAGNATION_REV_SHARE = 0.01
+
+# The email job's copies of the queries round both metrics' percentages to 1 decimal
+EMAIL_PERF_DECIMALS = 1
+
+METRIC_SPECS = {
+    "epc": {"label": "EPC", "denominator": "paid_clicks", "perf_decimals": 2, "high_streak_end": "high", "email_prep": "on"},
+    # The EPI SQL checks the low-streak end marker on its high-streak branches; kept for parity
+    "epi": {"label": "EPI", "denominator": "uniq_impr", "perf_decimals": 1, "high_streak_end": "low", "email_prep": "in"},
+}
+
+
+# --------------------------------------------------
+# WINDOW HELPERS
+# --------------------------------------------------
+
+def block_positions(block_ids):
+    """Block-start markers and each row's position inside its block (rows sorted by block, date)"""
+    starts = block_starts(block_ids)
+
+    idx = np.arange(len(block_ids))
+    start_idx = np.maximum.accumulate(np.where(starts, idx, 0))
+    return starts, idx - start_idx
+
+
+def trailing_window(values, pos, window):
+    """
+    Sum and non-null count over the current row and the `window - 1` rows before it
+    in the same block (ROWS BETWEEN window-1 PRECEDING AND CURRENT ROW)
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    total = filled.copy()
+    count = present.astype(float)
+
+    for k in range(1, window):
+        in_block = pos[k:] >= k
+        total[k:] += np.where(in_block, filled[:-k], 0.0)
+        count[k:] += np.where(in_block, present[:-k], 0)
+
+    return total, count
+
+
+def lag(values, starts):
+    """Previous row's value in the same block (LAG)"""
+    prev = np.empty_like(values)
+    prev[0:1] = np.nan
+    prev[1:] = values[:-1]
+    prev[starts] = np.nan
+    return prev
+
+
+def safe_ratio(num, den):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den == 0, np.nan, num / den)
+
+
+def sql_round(values, decimals):
+    """ROUND() as the database does it: halves go away from zero (np.round goes to even)"""
+    values = np.asarray(values, dtype=float)
+    scale = 10.0 ** decimals
+    with np.errstate(invalid="ignore"):
+        return np.sign(values) * np.floor(np.abs(values) * scale + 0.5 + 1e-9) / scale
+
+
+# --------------------------------------------------
+# LABEL RENDERING
+# --------------------------------------------------
+
+def sql_text(value):
+    """Render a number the way MySQL CONCAT does; NULL stays NULL"""
+    if value is None or pd.isna(value):
+        return None
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _render(template, fields, rows):
+    """Fill a label template for the given rows; any NULL field makes the label NULL (as CONCAT does)"""
+    rendered = pd.Series([""] * len(rows), dtype="string")
+
+    for literal, name, _, _ in string.Formatter().parse(template):
+        if literal:
+            rendered = rendered + literal
+        if name:
+            rendered = rendered + pd.Series(fields[name][rows]).map(sql_text).astype("string")
+
+    return rendered.astype(object).where(rendered.notna(), None).to_numpy()
+
+
+# --------------------------------------------------
+# CORE ENGINE
+# --------------------------------------------------
+
+def build_block_features(base_df, metric):
+    """rolling + flagged + streaked stages for one metric over base rows"""
+    spec = METRIC_SPECS[metric]
+
+    df = base_df.sort_values(["keyword_block_id", "eventDate"], kind="stable").reset_index(drop=True)
+
+    block_ids = df["keyword_block_id"].to_numpy()
+    starts, pos = block_positions(block_ids)
+
+    earnings = pd.to_numeric(df["est_earnings"], errors="coerce").to_numpy(dtype=float)
+    impressions = pd.to_numeric(df["uniq_impr"], errors="coerce").to_numpy(dtype=float)
+    denominator = pd.to_numeric(df[spec["denominator"]], errors="coerce").to_numpy(dtype=float)
+    value = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=float)
+    share = pd.to_numeric(df["daily_rev_share"], errors="coerce").to_numpy(dtype=float)
+
+    # ---------------- rolling ----------------
+    earn_7, earn_7_n = trailing_window(earnings, pos, 7)
+    earn_30, earn_30_n = trailing_window(earnings, pos, 30)
+    den_7, den_7_n = trailing_window(denominator, pos, 7)
+    den_30, den_30_n = trailing_window(denominator, pos, 30)
+    impr_7, impr_7_n = trailing_window(impressions, pos, 7)
+
+    value_7d = safe_ratio(earn_7, np.where(den_7_n == 0, np.nan, den_7))
+    value_30d = safe_ratio(earn_30, np.where(den_30_n == 0, np.nan, den_30))
+    earn_7d_avg = safe_ratio(earn_7, earn_7_n)
+    earn_30d_avg = safe_ratio(earn_30, earn_30_n)
+    impr_7d_avg = safe_ratio(impr_7, impr_7_n)
+    prev_value = lag(value, starts)
+
+    # ---------------- flagged ----------------
+    flags = flag_features(value, value_7d, prev_value, earnings, earn_7d_avg, impressions, impr_7d_avg)
+
+    # ROW_NUMBER() - ROW_NUMBER() OVER (..., volume_led) = number of earlier
+    # rows in the block that were not volume-led
+    not_led = (~flags.pop("volume_led")).astype(int)
+    not_led_before = pd.Series(not_led).groupby(block_ids).cumsum().to_numpy() - not_led
+    flags["stagnation"] = flags["stagnation"] & (not_led_before == 1)
+
+    # ---------------- streaked ----------------
+    streaks = block_streaks({k: flags[k] for k in ("low", "high", "drift", "rise")}, starts)
+
+    return df, {
+        "value": value, "value_7d": value_7d, "value_30d": value_30d,
+        "earn_7d_avg": earn_7d_avg, "earn_30d_avg": earn_30d_avg, "impr_7d_avg": impr_7d_avg,
+        "share": share,
+        **flags,
+        **streaks,
+        **pct_features(value, value_7d, prev_value, earnings, earn_7d_avg, spec["perf_decimals"]),
+    }
+
+
+def flag_features(value, value_7d, prev_value, earnings, earn_7d_avg, impressions, impr_7d_avg):
+    """
+    `flagged` stage for already-aligned rows. `stagnation` here is only the
+    per-row part; callers AND it with their earlier-rows condition and drop `volume_led`.
+    """
+    with np.errstate(invalid="ignore"):
+        low = value < value_7d * 0.8
+        high = value > value_7d * 1.15
+        has_prev = ~np.isnan(prev_value)
+
+        volume_led = (
+            (impressions > impr_7d_avg * 1.8)
+            & (value >= value_7d * 0.85)
+            & (value <= value_7d * 1.05)
+        )
+
+        return {
+            "low": low,
+            "high": high,
+            "low_low_rev": low & (earnings < earn_7d_avg * 0.95),
+            "low_high_rev": low & (earnings > earn_7d_avg * 0.90),
+            "high_high_rev": high & (earnings > earn_7d_avg * 0.90),
+            "high_low_rev": high & (earnings < earn_7d_avg * 0.95),
+            "sharp_drop": has_prev & (value < prev_value * 0.5),
+            "sharp_rise": has_prev & (value > prev_value * 1.5),
+            "drift": value < prev_value,
+            "rise": value > prev_value,
+            "volume_led": volume_led,
+            "stagnation": volume_led & (impressions > 900) & (earnings > earn_7d_avg * 1.3),
+        }
+
+
+def pct_features(value, value_7d, prev_value, earnings, earn_7d_avg, perf_decimals):
+    """Rounded percentages the labels print"""
+    value_vs_7d = safe_ratio(value - value_7d, value_7d) * 100
+
+    return {
+        "perf_pct": sql_round(value_vs_7d, perf_decimals),
+        "perf_pct_2": sql_round(value_vs_7d, 2),
+        "rev_perf_pct": sql_round(safe_ratio(earnings - earn_7d_avg, earn_7d_avg) * 100, perf_decimals),
+        "vs_prev_pct": sql_round(safe_ratio(value - prev_value, prev_value) * 100, 2),
+    }
+
+
+def label_alerts(f, metric, style="dashboard"):
+    """`final` stage: the Alerts CASE, evaluated in the same order as the SQL (dashboard or email wording)"""
+    with np.errstate(invalid="ignore"):
+        high_rev = f["share"] > HIGH_REV_SHARE
+        stagnation_rev = f["share"] > STAGNATION_REV_SHARE
+
+    case_builder = _email_cases if style == "email" else _dashboard_cases
+    cases = case_builder(f, METRIC_SPECS[metric], high_rev, stagnation_rev)
+
+    case_idx = np.select([cond for cond, _ in cases], list(range(len(cases))), default=-1)
+
+    alerts = np.full(len(case_idx), "Within Thresholds", dtype=object)
+    for i, (_, template) in enumerate(cases):
+        rows = np.flatnonzero(case_idx == i)
+        if len(rows):
+            alerts[rows] = _render(template, f, rows)
+
+    return alerts, high_rev.astype(int)
+
+
+def _dashboard_cases(f, spec, high_rev, stagnation_rev):
+    m = spec["label"]
+
+    low_streak = (f["low_len"] >= 3) & (f["low_end"] == 1)
+    high_streak = (f["high_len"] >= 3) & (f[f"{spec['high_streak_end']}_end"] == 1)
+
+    return [
+        # 1) CRITICAL RED (streak / sharp drops)
+        (low_streak & high_rev, f"🔥 {m} ↓ {{low_len}}D Streak | {{perf_pct}}% vs 7D Avg | High Rev Block"),
+        (low_streak, f"⚠️ {m} ↓ {{low_len}}D Streak | {{perf_pct}}% vs 7D Avg"),
+        (f["sharp_drop"] & high_rev, f"🚨 Sharp {m} ↓ {{vs_prev_pct}}% vs Yesterday | High Rev Block"),
+        (f["sharp_drop"], f"🚨 Sharp {m} ↓ {{vs_prev_pct}}% vs Yesterday"),
+
+        # 2) CRITICAL GREEN (streak / sharp rises) - the SQL prints low_streak_len here
+        (high_streak & high_rev, f"🔥 {m} ↑ {{high_len}}D Streak | {{perf_pct}}% vs 7D Avg | High Rev Block"),
+        (high_streak, f"📈 {m} ↑ {{low_len}}D Streak | {{perf_pct}}% vs 7D Avg"),
+        (f["sharp_rise"] & high_rev, f"🏆 Sharp {m} ↑ {{vs_prev_pct}}% vs Yesterday | High Rev Block"),
+        (f["sharp_rise"], f"✨ Sharp {m} ↑ {{vs_prev_pct}}% vs Yesterday"),
+
+        # 3) DAILY MOVERS
+        ((f["drift_len"] >= 4) & (f["drift_end"] == 1), f"👀 {m} Declining Daily For {{drift_len}} Days"),
+        ((f["rise_len"] >= 4) & (f["rise_end"] == 1), f"🏆 {m} Rising Daily For {{rise_len}} Days"),
+
+        # 4) SINGLE-DAY diagnostics
+        (f["low_low_rev"] & high_rev, f"❌ Both {m} & Rev Low | High Rev Block"),
+        (f["low_high_rev"], f"⚠️ {m}: {{perf_pct}}% | Rev: {{rev_perf_pct}}%"),
+        (f["high_high_rev"] & high_rev, f"✅ {m} & Revenue Both High | High Rev Block"),
+        (f["high_low_rev"], f"✨ {m}: {{perf_pct}}% | Rev: {{rev_perf_pct}}%"),
+        (f["high_high_rev"], f"✅ {m} & Revenue Both Higher Than 7D Avg"),
+        (f["low"] & high_rev, f"🔎 Low {m} - High Revenue Block"),
+        (f["high"] & high_rev, f"🔎 High {m} - High Revenue Block"),
+        (f["low"], f"⚠️ {m} DOWN | {{perf_pct}}% vs 7D Avg"),
+        (f["high"], f"📈 {m} UP | {{perf_pct}}% vs 7D Avg"),
+
+        # 5) SCALE QUALITY WATCH
+        (f["stagnation"] & stagnation_rev, f"📈 Traffic & Revenue Spike with Stable {m} on High Revenue Block"),
+        (f["stagnation"], f"📈 Traffic & Revenue Spike with Stable {m}"),
+    ]
+
+
+def _email_cases(f, spec, high_rev, stagnation_rev):
+    m, prep = spec["label"], spec["email_prep"]
+
+    # The email job only keeps the newest day, where every open streak ends, so no end checks here
+    return [
+        # 1) CRITICAL RED (streak / sharp drops)
+        ((f["low_len"] >= 3) & high_rev, f"3D {m} Decline {prep} High Revenue Block"),
+        (f["low_len"] >= 3, f"3D {m} Decline Streak"),
+        (f["sharp_drop"] & high_rev, f"Sharp {m} Drop on High Revenue Block"),
+        (f["sharp_drop"], f"Sharp {m} Drop From Yesterday by {{vs_prev_pct}}%"),
+
+        # 2) CRITICAL GREEN (streak / sharp rises)
+        ((f["high_len"] >= 3) & high_rev, f"3D {m} Rise {prep} High Revenue Block"),
+        (f["high_len"] >= 3, f"3D {m} Rise Streak"),
+        (f["sharp_rise"] & high_rev, f"Sharp {m} Rise on High Revenue Block"),
+        (f["sharp_rise"], f"Sharp {m} Rise From Yesterday by {{vs_prev_pct}}%"),
+
+        # 3) DAILY MOVERS
+        ((f["drift_len"] >= 4) & (f["drift_end"] == 1), f"{m} Declining Daily For {{drift_len}} Days"),
+        ((f["rise_len"] >= 4) & (f["rise_end"] == 1), f"{m} Rising Daily For {{rise_len}} Days"),
+
+        # 4) SINGLE-DAY diagnostics
+        (f["low_low_rev"] & high_rev, f"Both {m} & Rev Low on High Revenue Block"),
+        (f["low_high_rev"], f"{m}: {{perf_pct}}% | Rev: {{rev_perf_pct}}%"),
+        (f["high_high_rev"] & high_rev, f"{m} & Revenue Both High on High Revenue Block"),
+        (f["high_low_rev"], f"{m}: {{perf_pct}}% | Rev: {{rev_perf_pct}}%"),
+        (f["high_high_rev"], f"{m} & Revenue Both Higher Than 7D Avg"),
+        (f["low"] & high_rev, f"Low {m} - High Revenue Block"),
+        (f["high"] & high_rev, f"High {m} - High Revenue Block"),
+        (f["low"], f"{m} DOWN ({{perf_pct_2}}%)"),
+        (f["high"], f"{m} UP ({{perf_pct_2}}%)"),
+
+        # 5) SCALE QUALITY WATCH
+        (f["stagnation"] & stagnation_rev, f"Traffic & Revenue Spike with Stable {m} on High Revenue Block"),
+        (f["stagnation"], f"Traffic & Revenue Spike with Stable {m}"),
+    ]
+
+
+def alert_buckets(alerts, f):
+    """red / green / no impact, same precedence as the SQL alert_bucket CASE"""
+    green = (
+        (f["high_len"] >= 3) | f["sharp_rise"] | f["high_high_rev"] | f["high_low_rev"]
+        | f["high"] | (f["rise_len"] >= 4)
+    )
+    red = (
+        (f["low_len"] >= 3) | f["sharp_drop"] | f["low_low_rev"] | f["low_high_rev"]
+        | f["low"] | (f["drift_len"] >= 4) | f["stagnation"]
+    )
+    within = alerts == "Within Thresholds"
+
+    return np.select([within, green, red], ["no impact", "green", "red"], default="no impact")
+
+
+def compute_block_alerts(base_df, metric, start_date, end_date):
+    """EPC/EPI tracker output computed from base rows (same columns and order as the SQL tracker)"""
+    if base_df.empty:
+        return pd.DataFrame(columns=tracker_columns(metric))
+
+    df, f = build_block_features(base_df, metric)
+    out = tracker_frame(df, f, metric)
+
+    out = out[out["Date"].between(start_date, end_date)]
+    return out.sort_values(["Date", "Earnings"], ascending=[False, False], kind="stable").reset_index(drop=True)
+
+
+def tracker_frame(df, f, metric, style="dashboard"):
+    """Label the rows and lay them out like the SQL tracker (dashboard) or the email job's query"""
+    m = METRIC_SPECS[metric]["label"]
+    alerts, is_high_rev = label_alerts(f, metric, style)
+
+    columns = {
+        "Date": pd.to_datetime(df["eventDate"]).dt.date,
+        "Alerts": alerts,
+        "Block ID": df["keyword_block_id"],
+        "Partner": df["partner"],
+        "Block Name": df["block_name"],
+        "Earnings": sql_round(pd.to_numeric(df["est_earnings"]).to_numpy(dtype=float), 2),
+        "7D Avg Earnings": sql_round(f["earn_7d_avg"], 2),
+        "30D Avg Earnings": sql_round(f["earn_30d_avg"], 2),
+        "Impressions": df["uniq_impr"],
+        "Clicks": df["paid_clicks"],
+        m: sql_round(f["value"], 4),
+        f"7D Avg {m}": sql_round(f["value_7d"], 4),
+        f"30D Avg {m}": sql_round(f["value_30d"], 4),
+        "Block's Daily Share": sql_round(f["share"] * 100, 2),
+        "7D Avg Impressions": sql_round(f["impr_7d_avg"], 2),
+        "is_high_revenue_block": is_high_rev,
+        "alert_bucket": alert_buckets(alerts, f),
+    }
+
+    if style == "email":
+        return pd.DataFrame({col: columns[col] for col in email_columns(metric)})
+    return pd.DataFrame(columns)
+
+
+def compute_epc_alerts(base_df, start_date, end_date):
+    return compute_block_alerts(base_df, "epc", start_date, end_date)
+
+
+def compute_epi_alerts(base_df, start_date, end_date):
+    return compute_block_alerts(base_df, "epi", start_date, end_date)
+
+
+def tracker_columns(metric):
+    m = METRIC_SPECS[metric]["label"]
+    return [
+        "Date", "Alerts", "Block ID", "Partner", "Block Name", "Earnings",
+        "7D Avg Earnings", "30D Avg Earnings", "Impressions", "Clicks",
+        m, f"7D Avg {m}", f"30D Avg {m}", "Block's Daily Share",
+        "7D Avg Impressions", "is_high_revenue_block", "alert_bucket",
+    ]
+
+
+def email_columns(metric):
+    m = METRIC_SPECS[metric]["label"]
+    return [
+        "Date", "Block ID", "Partner", "Block Name", "Earnings", "7D Avg Earnings",
+        "Impressions", "Clicks", m, f"7D Avg {m}", "Block's Daily Share", "Alerts", "alert_bucket",
+    ]
+
+
+# --------------------------------------------------
+# PARITY CHECK
+# --------------------------------------------------
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _labels_close(left, right, tolerance):
+    """Same text once the numbers in it are taken out, and those numbers within tolerance"""
+    if _NUMBER.sub("#", left) != _NUMBER.sub("#", right):
+        return False
+    a, b = _NUMBER.findall(left), _NUMBER.findall(right)
+    return np.allclose(np.array(a, dtype=float), np.array(b, dtype=float), atol=tolerance, rtol=0)
+
+
+def compare_with_sql(sql_df, engine_df, tolerance=1e-6):
+    """
+    Rows where the Python engine disagrees with the SQL tracker, keyed by (Date, Block ID).
+    Empty result means the two engines produced the same alerts and numbers.
+    Numbers, including those inside alert labels, may differ by tolerance.
+    """
+    keys = ["Date", "Block ID"]
+    merged = sql_df.merge(engine_df, on=keys, how="outer", suffixes=("_sql", "_py"), indicator=True)
+
+    mismatch = merged["_merge"] != "both"
+    for col in sql_df.columns:
+        if col in keys or f"{col}_py" not in merged:
+            continue
+
+        left, right = merged[f"{col}_sql"], merged[f"{col}_py"]
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            differs = ~np.isclose(left.astype(float), right.astype(float), atol=tolerance, equal_nan=True)
+        else:
+            # Compared as values: compacted frames hold categoricals with per-frame categories
+            left, right = left.astype(object), right.astype(object)
+            differs = ~((left == right) | (left.isna() & right.isna()))
+            text = left.notna() & right.notna() & differs
+            if text.any():
+                differs[text] = [
+                    not _labels_close(str(a), str(b), tolerance) for a, b in zip(left[text], right[text])
+                ]
+        mismatch |= differs
+
+    return merged[mismatch]
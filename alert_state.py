@@ -0,0 +1,334 @@
+import os
+import tempfile
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from queries.alert_engine import (
+    METRIC_SPECS, EMAIL_PERF_DECIMALS, flag_features, pct_features, safe_ratio, tracker_frame,
+)
+from queries.base_scan import block_base_query, iter_event_days
+
+
+# --------------------------------------------------
+# PERSISTED PER-BLOCK ALERT STATE
+# --------------------------------------------------
+# Classifying the newest day only needs each block's recent rows, the previous
+# EPC/EPI and the open streak lengths. This store keeps exactly that, per block,
+# and is advanced once per new eventDate, so a daily run reads one day of
+# team_block_stats and does O(blocks) work instead of re-windowing 45-90 days.
+#
+# Rows live in per-block ring buffers of HISTORY_ROWS slots. 30 would cover
+# the rolling averages; the extra slots are for the stagnation check, which
+# looks at every earlier row inside the scan window.
+#
+# The newest folded day may have been read while it was still loading (the
+# mirror and block dimension re-pull their watermark day for the same
+# reason), so every sync rolls that day back and folds it again from a fresh
+# read. Blocks with no rows in the last HISTORY_ROWS days are dropped.
+
+HISTORY_ROWS = 90
+CALC_WINDOW_DAYS = 90       # dashboard trackers: end_date - 89 .. end_date
+EMAIL_WINDOW_DAYS = 46      # email job: alert_date - 45 .. alert_date
+
+RING_FIELDS = ("est_earnings", "paid_clicks", "uniq_impr", "epc", "epi")
+STREAK_FLAGS = ("low", "high", "drift", "rise")
+
+
+def empty_state():
+    state = {
+        "block_ids": np.array([], dtype=np.int64),
+        "head": np.array([], dtype=np.int64),
+        "dates": np.zeros((0, HISTORY_ROWS), dtype=np.int64),
+        "last_date": np.array(0, dtype=np.int64),
+        "prev_last_date": np.array(0, dtype=np.int64),
+    }
+    for field in RING_FIELDS:
+        state[field] = np.full((0, HISTORY_ROWS), np.nan)
+    for metric in METRIC_SPECS:
+        state[f"{metric}_led"] = np.zeros((0, HISTORY_ROWS), dtype=bool)
+        for flag in STREAK_FLAGS:
+            state[f"{metric}_{flag}_streak"] = np.array([], dtype=np.int64)
+            state[f"{metric}_{flag}_streak_prev"] = np.array([], dtype=np.int64)
+    return state
+
+
+def last_date(state):
+    """Last eventDate folded into the state (None when empty)"""
+    ordinal = int(state["last_date"])
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def load_state(path):
+    """Load a saved state, or None if there is none yet (or it predates the current layout)"""
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        if set(empty_state()) - set(saved.files):
+            return None
+        return {key: saved[key] for key in saved.files}
+
+
+def save_state(state, path):
+    """Write the state atomically so a crashed run never leaves half a file behind"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **state)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+# --------------------------------------------------
+# ADVANCING ONE DAY
+# --------------------------------------------------
+
+def _block_index(state, block_ids):
+    """Row of each block in the state, adding rows for blocks seen for the first time"""
+    idx = pd.Index(state["block_ids"]).get_indexer(block_ids)
+
+    new_ids = block_ids[idx < 0]
+    if len(new_ids):
+        n = len(new_ids)
+        for key, value in state.items():
+            if key in ("last_date", "prev_last_date"):
+                continue
+            if key == "block_ids":
+                fill = new_ids
+            elif value.ndim == 2:
+                fill = np.zeros((n, HISTORY_ROWS), dtype=value.dtype)
+                if value.dtype.kind == "f":
+                    fill[:] = np.nan
+            else:
+                fill = np.zeros(n, dtype=value.dtype)
+            state[key] = np.concatenate([value, fill])
+
+        idx = pd.Index(state["block_ids"]).get_indexer(block_ids)
+
+    return idx
+
+
+def _history(state, idx, window_start):
+    """Each block's earlier rows, most recent first, and which of them fall inside the scan window"""
+    head = state["head"][idx]
+    lags = np.arange(1, HISTORY_ROWS + 1)
+    slots = (head[:, None] - lags) % HISTORY_ROWS
+
+    rows = {key: np.take_along_axis(state[key][idx], slots, axis=1)
+            for key in ("dates",) + RING_FIELDS + tuple(f"{m}_led" for m in METRIC_SPECS)}
+    valid = (lags <= head[:, None]) & (rows["dates"] >= window_start)
+    return rows, valid
+
+
+def _window_sum(current, history, valid, size):
+    """SUM/COUNT over ROWS BETWEEN size-1 PRECEDING AND CURRENT ROW (NULLs skipped, like SQL)"""
+    prior = history[:, :size - 1]
+    usable = valid[:, :size - 1] & ~np.isnan(prior)
+
+    total = np.nan_to_num(current) + np.where(usable, prior, 0).sum(axis=1)
+    count = (~np.isnan(current)).astype(int) + usable.sum(axis=1)
+    return np.where(count == 0, np.nan, total), count
+
+
+def advance_state(state, day_df, window_days=CALC_WINDOW_DAYS):
+    """
+    Fold one eventDate of base rows into the state.
+
+    day_df:      that day's base rows (base_scan filters, every partner), one row per block
+    window_days: length of the scan window the SQL being replaced uses
+
+    Returns (day_df, features) where features[metric] holds the same arrays
+    alert_engine.build_block_features produces, aligned with the returned rows.
+    """
+    day_df = day_df.reset_index(drop=True)
+    event_date = pd.to_datetime(day_df["eventDate"]).dt.date.iloc[0] if not day_df.empty else None
+    if event_date is None:
+        return day_df, {}
+
+    day = event_date.toordinal()
+    if day <= int(state["last_date"]):
+        raise ValueError(f"State already covers {last_date(state)}; cannot fold in {event_date}")
+
+    block_ids = day_df["keyword_block_id"].to_numpy(dtype=np.int64)
+    idx = _block_index(state, block_ids)
+    hist, valid = _history(state, idx, day - window_days + 1)
+
+    current = {field: pd.to_numeric(day_df[field], errors="coerce").to_numpy(dtype=float) for field in RING_FIELDS}
+    earnings, impressions = current["est_earnings"], current["uniq_impr"]
+
+    if "daily_rev_share" in day_df:
+        share = pd.to_numeric(day_df["daily_rev_share"], errors="coerce").to_numpy(dtype=float)
+    else:
+        share = safe_ratio(earnings, np.nansum(earnings))
+
+    earn_7, earn_7_n = _window_sum(earnings, hist["est_earnings"], valid, 7)
+    earn_30, earn_30_n = _window_sum(earnings, hist["est_earnings"], valid, 30)
+    impr_7, impr_7_n = _window_sum(impressions, hist["uniq_impr"], valid, 7)
+    rows_in_window = valid.sum(axis=1) + 1
+
+    features = {}
+    for metric, spec in METRIC_SPECS.items():
+        value = current[metric]
+        den = spec["denominator"]
+        den_7, _ = _window_sum(current[den], hist[den], valid, 7)
+        den_30, _ = _window_sum(current[den], hist[den], valid, 30)
+
+        value_7d = safe_ratio(earn_7, den_7)
+        earn_7d_avg = safe_ratio(earn_7, earn_7_n)
+        impr_7d_avg = safe_ratio(impr_7, impr_7_n)
+        prev_value = np.where(valid[:, 0], hist[metric][:, 0], np.nan)
+
+        flags = flag_features(value, value_7d, prev_value, earnings, earn_7d_avg, impressions, impr_7d_avg)
+        volume_led = flags.pop("volume_led")
+        not_led_before = (valid & ~hist[f"{metric}_led"]).sum(axis=1)
+        flags["stagnation"] = flags["stagnation"] & (not_led_before == 1)
+
+        # An open streak can never be longer than the block's rows inside the scan window
+        streaks = {}
+        for flag in STREAK_FLAGS:
+            key = f"{metric}_{flag}_streak"
+            running = np.where(flags[flag], state[key][idx] + 1, 0)
+            state[f"{key}_prev"][idx] = state[key][idx]
+            state[key][idx] = running
+            streaks[f"{flag}_len"] = np.minimum(running, rows_in_window)
+            streaks[f"{flag}_end"] = flags[flag].astype(int)
+
+        state[f"{metric}_led"][idx, state["head"][idx] % HISTORY_ROWS] = volume_led
+
+        features[metric] = {
+            "value": value, "value_7d": value_7d, "value_30d": safe_ratio(earn_30, den_30),
+            "earn_7d_avg": earn_7d_avg, "earn_30d_avg": safe_ratio(earn_30, earn_30_n),
+            "impr_7d_avg": impr_7d_avg, "share": share,
+            "prev_value": prev_value, "earnings": earnings,
+            **flags,
+            **streaks,
+        }
+
+    slot = state["head"][idx] % HISTORY_ROWS
+    state["dates"][idx, slot] = day
+    for field in RING_FIELDS:
+        state[field][idx, slot] = current[field]
+    state["head"][idx] += 1
+    state["prev_last_date"] = np.array(int(state["last_date"]), dtype=np.int64)
+    state["last_date"] = np.array(day, dtype=np.int64)
+
+    return day_df, features
+
+
+def _tail_dates(state):
+    """eventDate ordinal of each block's newest row (0 for none) and its slot"""
+    tail = (state["head"] - 1) % HISTORY_ROWS
+    dates = state["dates"][np.arange(len(tail)), tail]
+    return np.where(state["head"] > 0, dates, 0), tail
+
+
+def rollback_last_day(state):
+    """
+    Undo the newest fold so that day can be read and folded again. Returns
+    None when the day before it is unknown (the state must be rebuilt).
+    """
+    day, previous = int(state["last_date"]), int(state["prev_last_date"])
+    if not day or not previous:
+        return None
+
+    tail_dates, tail = _tail_dates(state)
+    rows = np.flatnonzero(tail_dates == day)
+    slot = tail[rows]
+
+    state["head"][rows] -= 1
+    state["dates"][rows, slot] = 0
+    for field in RING_FIELDS:
+        state[field][rows, slot] = np.nan
+    for metric in METRIC_SPECS:
+        state[f"{metric}_led"][rows, slot] = False
+        for flag in STREAK_FLAGS:
+            key = f"{metric}_{flag}_streak"
+            state[key][rows] = state[f"{key}_prev"][rows]
+
+    state["last_date"] = np.array(previous, dtype=np.int64)
+    state["prev_last_date"] = np.array(0, dtype=np.int64)
+    return state
+
+
+def prune_state(state):
+    """Drop blocks with no rows in the last HISTORY_ROWS days"""
+    tail_dates, _ = _tail_dates(state)
+    keep = tail_dates > int(state["last_date"]) - HISTORY_ROWS
+    if keep.all():
+        return state
+
+    return {
+        key: value if key in ("last_date", "prev_last_date") else value[keep]
+        for key, value in state.items()
+    }
+
+
+def classify_day(day_df, features, metric, style="dashboard"):
+    """Alerts for a day returned by advance_state, laid out like the dashboard or email tracker"""
+    f = dict(features[metric])
+    perf_decimals = EMAIL_PERF_DECIMALS if style == "email" else METRIC_SPECS[metric]["perf_decimals"]
+    f.update(pct_features(f["value"], f["value_7d"], f["prev_value"], f["earnings"], f["earn_7d_avg"], perf_decimals))
+
+    return tracker_frame(day_df, f, metric, style)
+
+
+# --------------------------------------------------
+# SYNC WITH THE DATABASE
+# --------------------------------------------------
+
+def sync_state(state, alert_date, run_query, window_days=CALC_WINDOW_DAYS, run_query_chunks=None):
+    """
+    Bring the state up to alert_date, reading only the days it has not seen
+    (and its newest day again, in case that was read while still loading).
+    A missing or stale state is rebuilt from one scan of the last HISTORY_ROWS days.
+
+    Returns (state, day_df, features) for alert_date; raises ValueError if the
+    state has already moved past alert_date.
+    """
+    state, days = sync_state_range(state, alert_date, alert_date, run_query, window_days, run_query_chunks)
+    day_df, features = days.get(alert_date, (pd.DataFrame(), {}))
+    return state, day_df, features
+
+
+def sync_state_range(state, first_date, end_date, run_query, window_days=CALC_WINDOW_DAYS, run_query_chunks=None):
+    """
+    sync_state for several consecutive alert dates: one history scan, then one
+    fold per day. Returns (state, {event_date: (day_df, features)}) for the
+    dates in first_date..end_date that have rows.
+
+    With run_query_chunks the scan is streamed in eventDate order and each day
+    is folded as soon as it is complete, instead of holding the whole scan.
+    """
+    current = last_date(state) if state is not None else None
+    if current is not None and current > first_date:
+        raise ValueError(f"State is at {current}, past {first_date}")
+
+    # The newest folded day may have been partially loaded: fold it again from a fresh read
+    if current is not None:
+        state = rollback_last_day(state)
+        current = last_date(state) if state is not None else None
+
+    seed_start = first_date - timedelta(days=HISTORY_ROWS - 1)
+    if current is None or current < seed_start:
+        state = empty_state()
+        fetch_start = seed_start
+    else:
+        fetch_start = current + timedelta(days=1)
+
+    if run_query_chunks is not None:
+        day_groups = iter_event_days(run_query_chunks(f"{block_base_query(fetch_start, end_date)} ORDER BY eventDate"))
+    else:
+        rows = run_query(block_base_query(fetch_start, end_date))
+        day_groups = rows.groupby(pd.to_datetime(rows["eventDate"]).dt.date, sort=True) if not rows.empty else []
+
+    days = {}
+    for event_date, day_rows in day_groups:
+        day_df, features = advance_state(state, day_rows, window_days)
+        if event_date >= first_date:
+            days[event_date] = (day_df, features)
+
+    return prune_state(state), days
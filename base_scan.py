@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from queries.sql_params import in_list
+
+
+# --------------------------------------------------
+# SHARED BLOCK BASE SCAN
+# --------------------------------------------------
+# EPC and EPI trackers read the same slice of team_block_stats. Keeping the
+# slice definition here guarantees both trackers (and anything built on top
+# of the base rows) see identical filters, and lets the daily revenue share be
+# computed in the same pass instead of a second scan of the table.
+#
+# Query builders only (no Streamlit), so the email job can share them.
+
+EXCLUDED_PARTNERS = ("DIN", "TWS", "XYZ", "XXX")
+
+BASE_COLUMNS = [
+    "eventDate", "partner", "keyword_block_id", "block_name",
+    "est_earnings", "uniq_impr", "paid_clicks", "epc", "epi",
+]
+
+
+def base_where_clause(calc_start_date, end_date):
+    """Row filters every block tracker applies to team_block_stats"""
+    excluded = "', '".join(EXCLUDED_PARTNERS)
+    return " AND ".join([
+        f"eventDate BETWEEN '{calc_start_date}' AND '{end_date}'",
+        "est_earnings > 5 and uniq_impr > 50",
+        f"partner NOT IN ('{excluded}')",
+    ])
+
+
+def user_filter_clause(partners=None, block_ids=None, block_names=None):
+    """Sidebar filters as (clause, params), applied after the revenue share so the share stays global"""
+    conditions, params = [], {}
+
+    for column, name, values in (
+        ("partner", "partner", partners),
+        ("keyword_block_id", "block_id", [int(b) for b in block_ids or ()]),
+        ("block_name", "block_name", block_names),
+    ):
+        if values:
+            placeholders, in_params = in_list(name, values)
+            conditions.append(f"{column} IN ({placeholders})")
+            params.update(in_params)
+
+    return (" AND ".join(conditions) if conditions else "1 = 1"), params
+
+
+def block_base_cte(calc_start_date, end_date, partners=None, block_ids=None, block_names=None):
+    """`base` CTE as (sql, params): filtered block rows plus each block's share of that day's revenue"""
+    columns = ",\n                ".join(BASE_COLUMNS)
+    filter_sql, params = user_filter_clause(partners, block_ids, block_names)
+
+    return f"""
+    base AS (
+        SELECT *
+        FROM (
+            SELECT
+                {columns},
+                (est_earnings * 1.0) / NULLIF(SUM(est_earnings) OVER (PARTITION BY eventDate), 0) AS daily_rev_share
+            FROM team_block_stats
+            WHERE {base_where_clause(calc_start_date, end_date)}
+        ) scan
+        WHERE {filter_sql}
+    )""", params
+
+
+def block_base_query(calc_start_date, end_date):
+    """Unfiltered base rows (with daily revenue share) for the Python alert engine"""
+    columns = ", ".join(BASE_COLUMNS)
+
+    return f"""
+    SELECT
+        {columns},
+        (est_earnings * 1.0) / NULLIF(SUM(est_earnings) OVER (PARTITION BY eventDate), 0) AS daily_rev_share
+    FROM team_block_stats
+    WHERE {base_where_clause(calc_start_date, end_date)}
+    """
+
+
+def block_base_from_rows(rows, calc_start_date, end_date):
+    """block_base_query applied to raw team_block_stats rows (e.g. read from the local mirror)"""
+    dates = pd.to_datetime(rows["eventDate"]).dt.date
+    mask = (
+        dates.between(calc_start_date, end_date)
+        & (rows["est_earnings"] > 5) & (rows["uniq_impr"] > 50)
+        & ~rows["partner"].isin(EXCLUDED_PARTNERS)
+    )
+
+    base = rows.loc[mask, BASE_COLUMNS].assign(eventDate=dates[mask]).reset_index(drop=True)
+    day_total = base.groupby("eventDate")["est_earnings"].transform("sum")
+    base["daily_rev_share"] = (base["est_earnings"] * 1.0) / day_total.where(day_total != 0)
+    return base
+
+
+def filter_block_base(base_df, partners=None, block_ids=None, block_names=None):
+    """Pandas version of user_filter_clause"""
+    mask = pd.Series(True, index=base_df.index)
+
+    if partners:
+        mask &= base_df["partner"].isin(partners)
+    if block_ids:
+        mask &= base_df["keyword_block_id"].isin(list(block_ids))
+    if block_names:
+        mask &= base_df["block_name"].isin(block_names)
+
+    return base_df[mask]
+
+
+def iter_event_days(chunks):
+    """
+    (eventDate, rows) per day from row chunks ordered by eventDate (e.g.
+    db_pool.run_query_chunks); only the open day and one chunk are held
+    """
+    pending, pending_day = [], None
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+
+        days = pd.to_datetime(chunk["eventDate"]).dt.date.to_numpy()
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        stops = np.r_[starts[1:], len(chunk)]
+
+        for start, stop in zip(starts, stops):
+            if pending and days[start] != pending_day:
+                yield pending_day, pd.concat(pending, ignore_index=True)
+                pending = []
+            pending_day = days[start]
+            pending.append(chunk.iloc[start:stop])
+
+    if pending:
+        yield pending_day, pd.concat(pending, ignore_index=True)
@@ -1,11 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import threading
 from datetime import timedelta
+from types import SimpleNamespace
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from utils.db import run_query
+from utils.db import run_query as db_run_query
+from queries.base_scan import block_base_query, block_base_from_rows
+from queries import stats_mirror
+from queries import block_dim
+from queries import partner_cube
+from queries.data_watermark import get_watermark
+from queries.filter_index import build_filter_index, blocks_for, ids_for
+from queries.paged_table import render_paged_table
+from queries.sql_params import in_list, run_bound
+from queries.query_stats import timed
+
+
+# Every dashboard query is timed and counted (see query_stats); the trackers import it from here
+run_query = timed(db_run_query)
 
 
 # --------------------------------------------------
@@ -13,8 +28,16 @@ from utils.db import run_query
 # --------------------------------------------------
 
 @st.cache_data(ttl=3600)
-def fetch_complete_mapping():
-    """Fetch partner/block mapping for filters"""
+def fetch_complete_mapping(as_of=None):
+    """Fetch partner/block mapping for filters (as_of: data watermark)"""
+    dim = block_dim.read_block_dim()
+    if dim is not None:
+        # Top up in memory with any eventDates the email job has not folded in yet
+        since = block_dim.dim_watermark(dim)
+        if as_of is not None and since is not None and since < as_of:
+            dim = block_dim.merge_dim(dim, block_dim.pull_dim_rows(run_query, since))
+        return block_dim.active_mapping(dim, as_of)
+
     query = """
     SELECT DISTINCT partner, keyword_block_id, block_name 
     FROM team_block_stats
@@ -23,20 +46,33 @@ def fetch_complete_mapping():
     return run_query(query)
 
 
-#@st.cache_data(ttl=3600)
+@st.cache_resource(ttl=3600)
+def fetch_filter_index(as_of=None):
+    """Sidebar cascade index over fetch_complete_mapping (shared, read-only; no per-rerun copy)"""
+    return build_filter_index(fetch_complete_mapping(as_of))
+
+
 def get_latest_event_date():
-    """Get most recent event date"""
-    query = "SELECT MAX(eventDate) AS latest_date FROM team_block_stats"
-    df = run_query(query)
-    return df.iloc[0]["latest_date"] if not df.empty else None
+    """Get most recent event date (memoized watermark, see data_watermark)"""
+    return get_watermark()
 
 
 
 
 @st.cache_data(ttl=3600)
-def fetch_system_stats():
+def fetch_block_base(calc_start_date, end_date):
+    """Shared base rows behind the EPC/EPI trackers' Python engine (local mirror first, then MySQL)"""
+    rows = stats_mirror.read_mirror(calc_start_date, end_date)
+    if rows is not None:
+        return block_base_from_rows(rows, calc_start_date, end_date)
+
+    return run_query(block_base_query(calc_start_date, end_date))
 
-    date = get_latest_event_date()
+
+@st.cache_data(ttl=3600)
+def fetch_system_stats(end_date=None):
+
+    date = end_date or get_latest_event_date()
     
     query = f"""
     select 
@@ -57,11 +93,27 @@ def fetch_system_stats():
 
 
 
-@st.cache_data(ttl=3600)
-def fetch_block_history(block_id):
-    """Fetch 45-day history for deep dive analysis"""
-    query = f"""
+# --------------------------------------------------
+# DEEP DIVE HISTORY (batched, per-block cache)
+# --------------------------------------------------
+# After a tracker run every flagged block's 45-day history is loaded with one
+# IN (...) query per HISTORY_BATCH ids and split into per-block frames, so
+# the deep-dive selectbox and the category modal open without a round trip.
+# The store is shared by every session: each store has a lock around the
+# miss check and the fill, so two sessions never pull the same blocks, and
+# fetch_block_history hands out copies so no caller can write into it.
+
+HISTORY_COLUMNS = ["Date", "EPC", "EPI", "Impressions", "Clicks", "Revenue"]
+HISTORY_BATCH = 1000
+
+
+def block_history_query(block_ids, end_date):
+    """45-day history for a set of blocks, newest first, as (sql, params)"""
+    id_list, params = in_list("block_id", [int(b) for b in block_ids])
+
+    return f"""
     SELECT 
+        keyword_block_id,
         eventDate as Date, 
         epc as EPC, 
         epi as EPI,
@@ -69,11 +121,47 @@ def fetch_block_history(block_id):
         paid_clicks as Clicks,
         est_earnings as Revenue
     FROM team_block_stats
-    WHERE keyword_block_id = '{block_id}'
-      AND eventDate >= (SELECT MAX(eventDate) FROM team_block_stats) - INTERVAL 45 DAY
+    WHERE keyword_block_id IN ({id_list})
+      AND eventDate >= :end_date - INTERVAL 45 DAY
     ORDER BY eventDate DESC
-    """
-    return run_query(query)
+    """, dict(params, end_date=end_date)
+
+
+@st.cache_resource(ttl=3600, max_entries=2)
+def block_history_store(end_date):
+    """Process-wide {block_id: history frame} for one watermark date, with its fill lock"""
+    return SimpleNamespace(blocks={}, lock=threading.Lock())
+
+
+def prefetch_block_history(block_ids, end_date=None):
+    """Load every not-yet-cached block's history in batched IN queries; returns how many were fetched"""
+    end_date = end_date or get_latest_event_date()
+    store = block_history_store(end_date)
+
+    with store.lock:
+        missing = [b for b in dict.fromkeys(int(b) for b in block_ids) if b not in store.blocks]
+        for i in range(0, len(missing), HISTORY_BATCH):
+            batch = missing[i:i + HISTORY_BATCH]
+            rows = run_bound(run_query, *block_history_query(batch, end_date))
+
+            per_block = {
+                int(block_id): block_rows[HISTORY_COLUMNS].reset_index(drop=True)
+                for block_id, block_rows in rows.groupby("keyword_block_id", sort=False)
+            }
+            for block_id in batch:
+                store.blocks[block_id] = per_block.get(block_id, pd.DataFrame(columns=HISTORY_COLUMNS))
+
+    return len(missing)
+
+
+def fetch_block_history(block_id, end_date=None):
+    """Fetch 45-day history for deep dive analysis (a copy of the prefetched frame)"""
+    end_date = end_date or get_latest_event_date()
+    store = block_history_store(end_date)
+
+    if int(block_id) not in store.blocks:
+        prefetch_block_history([block_id], end_date)
+    return store.blocks[int(block_id)].copy()
 
 
     
@@ -94,40 +182,63 @@ def fetch_block_history(block_id):
 
 
 
-@st.cache_data(ttl=3600)
+@st.cache_resource(ttl=3600, max_entries=2)
+def fetch_partner_cube(end_date=None):
+    """Partner x block x date cube for the spike window (shared, read-only)"""
+    end_date = end_date or get_latest_event_date()
+    start_date = end_date - timedelta(days=partner_cube.CUBE_WINDOW_DAYS)
+
+    mirror_rows = stats_mirror.read_mirror(start_date, end_date)
+    if mirror_rows is not None:
+        cells = partner_cube.cube_from_rows(mirror_rows, start_date, end_date)
+    else:
+        cells = run_query(partner_cube.partner_cube_query(start_date, end_date))
+
+    return partner_cube.build_partner_cube(cells, start_date, end_date)
+
+
 def fetch_partner_category_snapshot(partner, date):
-    query = f"""
+    cube = fetch_partner_cube(get_latest_event_date())
+    if partner_cube.covers(cube, date):
+        return partner_cube.partner_snapshot(cube, partner, date)
+
+    query = """
     SELECT 
         eventDate, block_name as 'Block Name',
         uniq_impr AS Impressions,
         paid_clicks AS Clicks,
         est_earnings AS Earnings
     FROM team_block_stats
-    WHERE partner = '{partner}' AND eventDate = '{date}' and uniq_impr > 0
+    WHERE partner = :partner AND eventDate = :date and uniq_impr > 0
     #GROUP BY eventDate, block_name
     order by est_earnings desc;
     """
-    return run_query(query)
+    return run_bound(run_query, query, {"partner": partner, "date": date})
 
 
 
 
-@st.cache_data(ttl=3600)
-def fetch_partner_category_trend(partner):#, end_date):
-    query = f"""
+def fetch_partner_category_trend(partner, end_date=None):
+    end_date = end_date or get_latest_event_date()
+
+    cube = fetch_partner_cube(end_date)
+    if partner_cube.covers(cube, end_date - timedelta(days=45), end_date):
+        return partner_cube.partner_trend(cube, partner)
+
+    query = """
     SELECT 
         eventDate AS Date,
         COUNT(DISTINCT block_name) AS `Live Categories`,
         SUM(est_earnings) AS Earnings
     FROM team_block_stats
-    WHERE partner = '{partner}'
-      AND eventDate >= (SELECT MAX(eventDate) FROM team_block_stats) - INTERVAL 45 DAY
+    WHERE partner = :partner
+      AND eventDate >= :end_date - INTERVAL 45 DAY
       and uniq_impr > 0 #and est_earnings > 0
     GROUP BY eventDate 
     ORDER BY eventDate desc;
     """
     
-    return run_query(query)
+    return run_bound(run_query, query, {"partner": partner, "end_date": end_date})
 
 
 
@@ -138,15 +249,15 @@ def fetch_partner_category_trend(partner):#, end_date):
 # --------------------------------------------------
 
 def apply_display_days(df, date_col="Date", days=1, date_range=None):
-    """Filter dataframe by display window or custom date range"""
-    dff = df.copy()
-    #dff[date_col] = pd.to_datetime(dff[date_col], errors="coerce").dt.normalize()
-    
+    """
+    Filter dataframe by display window or custom date range.
+    Returns a slice of df: treat it as read-only and .copy() before adding columns.
+    """
+    dff = df
+
     if date_range is not None and len(date_range) > 0:
-        #start_dt = pd.Timestamp(date_range[0]).normalize()
         start_dt = date_range[0]
         if len(date_range) == 2:
-            #end_dt = pd.Timestamp(date_range[1]).normalize()
             end_dt = date_range[1]
             return dff[dff[date_col].between(start_dt, end_dt, inclusive="both")]
         return dff[dff[date_col] == start_dt]
@@ -158,8 +269,11 @@ def apply_display_days(df, date_col="Date", days=1, date_range=None):
 
 
 def apply_user_filters(df, partners=None, blocks=None, ids=None):
-    """Apply user-side partner/block filters"""
-    filtered = df.copy()
+    """
+    Apply user-side partner/block filters.
+    Returns df itself when no filter is set: treat the result as read-only.
+    """
+    filtered = df
     
     if partners:
         filtered = filtered[filtered["Partner"].isin(partners)]
@@ -176,8 +290,10 @@ def apply_user_filters(df, partners=None, blocks=None, ids=None):
 # UI COMPONENTS
 # --------------------------------------------------
 
-def render_sidebar(mapping_df, latest_date):
-    """Render filter sidebar"""
+def render_sidebar(mapping, latest_date):
+    """Render filter sidebar (mapping: fetch_filter_index result or the raw mapping frame)"""
+    filter_index = mapping if isinstance(mapping, dict) else build_filter_index(mapping)
+
     with st.sidebar:
         st.header("🔍 Filters")
         st.markdown(f"📅 Latest: **{latest_date}**")
@@ -206,20 +322,12 @@ def render_sidebar(mapping_df, latest_date):
             display_days = int(window_options[:-1])
         
         # Partner/Block cascading filters
-        partners = sorted(mapping_df["partner"].unique())
-        selected_partners = st.multiselect("**👥 Partner**", partners)
-        
-        filtered = mapping_df.copy()
-        if selected_partners:
-            filtered = filtered[filtered["partner"].isin(selected_partners)]
+        selected_partners = st.multiselect("**👥 Partner**", filter_index["partners"])
         
-        blocks = sorted(filtered["block_name"].unique())
+        blocks = blocks_for(filter_index, selected_partners)
         selected_blocks = st.multiselect("**🧱 Block Name**", blocks)
         
-        if selected_blocks:
-            filtered = filtered[filtered["block_name"].isin(selected_blocks)]
-        
-        block_ids = sorted(filtered["keyword_block_id"].unique())
+        block_ids = ids_for(filter_index, selected_partners, selected_blocks)
         selected_ids = st.multiselect("**🆔 Block ID**", block_ids)
 
         #min_earnings = st.slider("**💰 Min Earnings Threshold ($)**", min_value=0.0, max_value=50.0, value=5.0, step=0.5)
@@ -277,22 +385,22 @@ def render_kpis(raw_df, filtered_df=None, alert_view='RED'):
 
 
 
-def render_alert_table(df, column_config=None):
-    
-    st.dataframe(df, column_config=column_config or {}, width='stretch', hide_index=True)
+def render_alert_table(df, column_config=None, key=None):
+    """Paginated, column-pruned alert table"""
+    render_paged_table(df, column_config, key=key or f"alert_table_{'_'.join(map(str, df.columns))}")
 
 
 def render_alert_table_volume(df, column_config=None, selectable=False, selection_mode="single-row", key=None):
-    
-    return st.dataframe(
-        df, 
-        column_config=column_config or {}, 
-        width='stretch', 
-        hide_index=True,
-        on_select="rerun" if selectable else None,
-        selection_mode=selection_mode if selectable else None,
-        key=key
+    """
+    Paginated alert table with row selection. The returned event mirrors
+    st.dataframe's, with selection.rows as positions in df rather than in
+    the visible page, so df.iloc[event.selection.rows[0]] keeps working.
+    """
+    rows = render_paged_table(
+        df, column_config, key=key or f"alert_table_{'_'.join(map(str, df.columns))}",
+        selectable=selectable, selection_mode=selection_mode,
     )
+    return SimpleNamespace(selection=SimpleNamespace(rows=rows, columns=[]))
 
 
 # --------------------------------------------------
@@ -312,12 +420,12 @@ def render_performance_corridor(df, metric):
     # df['mean'] = df['Earnings'].rolling(window=window).mean()
     # df['std'] = df['Earnings'].rolling(window=window).std()
 
-    df['mean'] = df[metric].rolling(window=window).mean()
-    df['std'] = df[metric].rolling(window=window).std()
+    # df comes from the shared result store: build the bands on a new frame, never write into it
+    rolling = df[metric].rolling(window=window)
+    df = df.assign(mean=rolling.mean(), std=rolling.std())
     
     # Upper and Lower Bounds (1.5 STD covers ~85% of 'normal' movement)
-    df['upper'] = df['mean'] + (1.5 * df['std'])
-    df['lower'] = df['mean'] - (1.5 * df['std'])
+    df = df.assign(upper=df['mean'] + (1.5 * df['std']), lower=df['mean'] - (1.5 * df['std']))
 
     st.markdown("##### 🛡️ System KPI")
     st.caption("The shaded area represents the 'Normal' performance range based on a 7-day rolling window")
@@ -637,7 +745,7 @@ def open_partner_modal(selected_row):
 
     df_cat = fetch_partner_category_snapshot(partner, selected_date)
     
-    df_trend = fetch_partner_category_trend(partner)
+    df_trend = fetch_partner_category_trend(partner, get_latest_event_date())
     # df_trend = volume_df[volume_df["Partner"] == partner][["Date", "Live Categories"]]
 
     if df_cat.empty:
@@ -769,7 +877,7 @@ def open_category_modal(selected_row, end_date):
     """, unsafe_allow_html=True)
     
     # Fetch 45-day history
-    hist_df = fetch_block_history(target_block_id)
+    hist_df = fetch_block_history(target_block_id, end_date)
 
     
     thirty_days_ago = end_date - timedelta(days=30)
@@ -0,0 +1,117 @@
+import os
+import tempfile
+from datetime import timedelta
+import pandas as pd
+from queries.base_scan import EXCLUDED_PARTNERS
+
+
+# --------------------------------------------------
+# PARTNER / BLOCK DIMENSION
+# --------------------------------------------------
+# One row per (partner, keyword_block_id, block_name) ever seen, with the
+# first and last eventDate it had data. The email job keeps it in a local
+# Parquet file and only scans eventDates at or after the newest last_seen
+# (the watermark), so the sidebar mapping no longer needs a DISTINCT over
+# the whole of team_block_stats. last_seen lets the sidebar hide blocks
+# that have been dead for a while.
+
+BLOCK_DIM_PATH = os.environ.get("BLOCK_ALERT_BLOCK_DIM_PATH")
+ACTIVE_DAYS = int(os.environ.get("BLOCK_ALERT_ACTIVE_DAYS", 90))
+
+DIM_KEYS = ["partner", "keyword_block_id", "block_name"]
+DIM_COLUMNS = DIM_KEYS + ["first_seen", "last_seen"]
+
+
+def empty_dim():
+    return pd.DataFrame(columns=DIM_COLUMNS)
+
+
+def read_block_dim(path=None):
+    """The stored dimension (None when not configured or not built yet)"""
+    path = path or BLOCK_DIM_PATH
+    if not path or not os.path.exists(path):
+        return None
+
+    dim = pd.read_parquet(path)
+    for col in ("first_seen", "last_seen"):
+        dim[col] = pd.to_datetime(dim[col]).dt.date
+    return dim
+
+
+def dim_watermark(dim):
+    """Newest eventDate folded into the dimension"""
+    return dim["last_seen"].max() if dim is not None and not dim.empty else None
+
+
+def _write_dim(path, dim):
+    """Replace the Parquet file atomically so the dashboard never reads a partial file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".parquet")
+    os.close(fd)
+    try:
+        dim.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def pull_dim_rows(run_query, since=None):
+    """first/last seen per key for eventDates >= since (the whole table when since is None)"""
+    excluded = "', '".join(EXCLUDED_PARTNERS)
+    since_sql = f"AND eventDate >= '{since}'" if since is not None else ""
+
+    rows = run_query(f"""
+        SELECT partner, keyword_block_id, block_name,
+               MIN(eventDate) AS first_seen, MAX(eventDate) AS last_seen
+        FROM team_block_stats
+        WHERE partner NOT IN ('{excluded}')
+          {since_sql}
+        GROUP BY partner, keyword_block_id, block_name
+    """)
+
+    for col in ("first_seen", "last_seen"):
+        rows[col] = pd.to_datetime(rows[col]).dt.date
+    return rows
+
+
+def merge_dim(dim, new_rows):
+    """Fold freshly pulled rows into the dimension (earliest first_seen, latest last_seen)"""
+    if dim is None or dim.empty:
+        return new_rows[DIM_COLUMNS].reset_index(drop=True)
+    if new_rows.empty:
+        return dim
+
+    both = pd.concat([dim[DIM_COLUMNS], new_rows[DIM_COLUMNS]], ignore_index=True)
+    return (
+        both.groupby(DIM_KEYS, as_index=False, sort=False)
+        .agg(first_seen=("first_seen", "min"), last_seen=("last_seen", "max"))
+    )
+
+
+def sync_block_dim(run_query, path=None):
+    """
+    Pull every eventDate at or after the watermark (the watermark day is
+    re-pulled in case it was still loading) and rewrite the dimension.
+    The first run has no watermark and scans the whole table once.
+    """
+    path = path or BLOCK_DIM_PATH
+    if not path:
+        raise RuntimeError("Block dimension path not configured. Set BLOCK_ALERT_BLOCK_DIM_PATH.")
+
+    dim = read_block_dim(path)
+    since = dim_watermark(dim)
+    new_rows = pull_dim_rows(run_query, since)
+
+    dim = merge_dim(dim, new_rows)
+    _write_dim(path, dim)
+    return {"watermark": dim_watermark(dim), "keys": len(dim), "rows_pulled": len(new_rows)}
+
+
+def active_mapping(dim, as_of, active_days=None):
+    """partner/keyword_block_id/block_name seen within active_days of as_of (all keys when 0)"""
+    active_days = ACTIVE_DAYS if active_days is None else active_days
+    if active_days and as_of is not None:
+        dim = dim[dim["last_seen"] >= as_of - timedelta(days=active_days - 1)]
+    return dim[DIM_KEYS].reset_index(drop=True)
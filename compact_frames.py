@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+# COMPACT TRACKER FRAMES
+# --------------------------------------------------
+# Tracker frames stay resident in the result store and session state for the
+# whole day. Text columns with few distinct values (partner, block name,
+# alert label, bucket) become categoricals and counts / IDs become int32,
+# each only when the round trip is lossless. Money, rates and shares stay
+# float64: float32 only carries ~7 significant digits, so sums over many
+# rows (KPI totals, exports) would drift off the cent.
+
+CATEGORY_COLUMNS = ("Partner", "Block Name", "Alerts", "alert_bucket", "partner", "block_name")
+COUNT_COLUMNS = ("Impressions", "Clicks", "Live Categories", "uniq_impr", "paid_clicks")
+CATEGORY_MAX_RATIO = 0.5
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def _compact_count(series):
+    """Integral counts (SUM() comes back as DECIMAL / float) without NULLs as int32"""
+    values = series.to_numpy(dtype=np.float64)
+    if not len(values) or not np.isfinite(values).all() or not np.array_equal(values, np.round(values)):
+        return series
+    if values.min() >= INT32_MIN and values.max() <= INT32_MAX:
+        return series.astype(np.int32)
+    return series
+
+
+def _compact_int(series):
+    if len(series) and series.min() >= INT32_MIN and series.max() <= INT32_MAX:
+        return series.astype(np.int32)
+    return series
+
+
+def compact_frame(df, category_columns=CATEGORY_COLUMNS, keep=()):
+    """df with categorical text and int32 counts / IDs where lossless (columns in keep untouched)"""
+    if df is None or df.empty:
+        return df
+
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col in keep:
+            continue
+
+        if col in category_columns and (series.dtype == object or pd.api.types.is_string_dtype(series.dtype)):
+            if series.nunique(dropna=True) <= max(1, len(series) * CATEGORY_MAX_RATIO):
+                columns[col] = series.astype("category")
+        elif pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        elif col in COUNT_COLUMNS and pd.api.types.is_float_dtype(series.dtype):
+            compact = _compact_count(series)
+            if compact is not series:
+                columns[col] = compact
+        elif pd.api.types.is_integer_dtype(series.dtype) and series.dtype.itemsize > 4:
+            compact = _compact_int(series)
+            if compact is not series:
+                columns[col] = compact
+
+    return df.assign(**columns) if columns else df
+
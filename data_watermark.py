@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+import pandas as pd
+from utils.db import run_query as db_run_query
+from queries.query_stats import timed
+
+
+# --------------------------------------------------
+# DATA WATERMARK
+# --------------------------------------------------
+# Latest eventDate in team_block_stats, shared by every session in the
+# process. Within WATERMARK_TTL seconds the cached date is returned as-is;
+# after that a probe only asks for dates newer than the known one (a range
+# read on the eventDate index) instead of a MAX over the whole table.
+#
+# Cached fetchers take the watermark as an argument, so their caches roll
+# over exactly when new data lands rather than on the hourly TTL.
+#
+# Counters have their own lock, so a cache hit never waits behind a probe
+# that holds _lock while it queries.
+
+WATERMARK_TTL = int(os.environ.get("BLOCK_ALERT_WATERMARK_TTL", 60))
+
+_latest = None
+_checked_at = 0.0
+_lock = threading.Lock()
+_stats = {"hits": 0, "probes": 0, "full_scans": 0, "advances": 0}
+_stats_lock = threading.Lock()
+
+run_query = timed(db_run_query)
+
+
+def _query_latest(after=None):
+    where = f"WHERE eventDate > '{after}'" if after is not None else ""
+    df = run_query(f"SELECT MAX(eventDate) AS latest_date FROM team_block_stats {where}")
+
+    if df.empty or pd.isna(df.iloc[0]["latest_date"]):
+        return None
+    return pd.to_datetime(df.iloc[0]["latest_date"]).date()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_watermark(max_age=None):
+    """Latest eventDate, at most max_age (default WATERMARK_TTL) seconds stale"""
+    global _latest, _checked_at
+
+    max_age = WATERMARK_TTL if max_age is None else max_age
+    if _latest is not None and time.monotonic() - _checked_at < max_age:
+        _count("hits")
+        return _latest
+
+    with _lock:
+        # Another session may have refreshed it while this one waited
+        if _latest is not None and time.monotonic() - _checked_at < max_age:
+            _count("hits")
+            return _latest
+
+        if _latest is None:
+            _count("full_scans")
+            _latest = _query_latest()
+        else:
+            _count("probes")
+            newer = _query_latest(after=_latest)
+            if newer is not None:
+                _count("advances")
+                _latest = newer
+
+        _checked_at = time.monotonic()
+        return _latest
+
+
+def invalidate():
+    """Force the next get_watermark() to probe the database"""
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
+
+
+def watermark_stats():
+    """Cache hits vs probes vs full MAX scans since the process started"""
+    with _stats_lock:
+        return dict(_stats, latest=_latest)
@@ -0,0 +1,243 @@
+import os
+import time
+import threading
+import pandas as pd
+from sqlalchemy import create_engine, event, text, make_url
+from queries.compact_frames import compact_frame
+from queries import query_stats
+from queries.sqlite_compat import register_sqlite_compat
+
+try:
+    import pyarrow as pa
+except ImportError:  # pd.read_sql fallback
+    pa = None
+
+
+# --------------------------------------------------
+# POOL CONFIGURATION
+# --------------------------------------------------
+# One engine (and so one MySQL connection pool) per process. Sizing can be
+# tuned per deployment through the environment without touching the code.
+
+POOL_SIZE = int(os.environ.get("BLOCK_ALERT_DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("BLOCK_ALERT_DB_MAX_OVERFLOW", 5))
+POOL_RECYCLE = int(os.environ.get("BLOCK_ALERT_DB_POOL_RECYCLE", 3600))
+POOL_TIMEOUT = int(os.environ.get("BLOCK_ALERT_DB_POOL_TIMEOUT", 30))
+
+_engine = None
+_engine_url = os.environ.get("BLOCK_ALERT_DB_URL")
+_pool_options = {}
+_engine_lock = threading.Lock()
+
+_pool_metrics = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0}
+_metrics_lock = threading.Lock()
+
+
+def configure(url, pool_size=None, max_overflow=None):
+    """Register the database URL (and optional pool sizing) for the shared engine"""
+    global _engine, _engine_url
+
+    options = {}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+
+    with _engine_lock:
+        if url == _engine_url and (not options or options == _pool_options):
+            return
+
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+        _engine_url = url
+        _pool_options.clear()
+        _pool_options.update(options)
+
+
+def get_engine():
+    """Return the process-wide engine, creating it on first use"""
+    global _engine
+
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            if not _engine_url:
+                raise RuntimeError("Database URL not configured. Call db_pool.configure() or set BLOCK_ALERT_DB_URL.")
+
+            sqlite = make_url(_engine_url).get_backend_name() == "sqlite"
+
+            # SQLite (the local stand-in, see local_stats_db / sqlite_compat) picks its own pool class;
+            # :memory: uses SingletonThreadPool, which takes no sizing arguments
+            sizing = {} if sqlite else {
+                "pool_size": _pool_options.get("pool_size", POOL_SIZE),
+                "max_overflow": _pool_options.get("max_overflow", MAX_OVERFLOW),
+                "pool_timeout": POOL_TIMEOUT,
+            }
+            _engine = create_engine(_engine_url, pool_recycle=POOL_RECYCLE, pool_pre_ping=True, **sizing)
+            _register_pool_listeners(_engine)
+            if sqlite:
+                register_sqlite_compat(_engine, event.listen)
+
+    return _engine
+
+
+def dispose_engine():
+    """Close every pooled connection (end of a batch job, or before fork)"""
+    global _engine
+
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+# --------------------------------------------------
+# CONNECTION REUSE METRICS
+# --------------------------------------------------
+
+def _bump(metric):
+    with _metrics_lock:
+        _pool_metrics[metric] += 1
+
+
+def _register_pool_listeners(engine):
+    event.listen(engine, "connect", lambda dbapi_conn, record: _bump("connects"))
+    event.listen(engine.pool, "checkout", lambda dbapi_conn, record, proxy: _bump("checkouts"))
+    event.listen(engine.pool, "checkin", lambda dbapi_conn, record: _bump("checkins"))
+    event.listen(engine.pool, "invalidate", lambda dbapi_conn, record, exc: _bump("invalidations"))
+
+
+def pool_stats():
+    """Snapshot of pool usage: new connections vs checkouts served from the pool"""
+    with _metrics_lock:
+        stats = dict(_pool_metrics)
+
+    checkouts = stats["checkouts"]
+    stats["reused"] = max(checkouts - stats["connects"], 0)
+    stats["reuse_ratio"] = round(stats["reused"] / checkouts, 3) if checkouts else 0.0
+    stats["pool_status"] = _engine.pool.status() if _engine is not None else "not created"
+
+    return stats
+
+
+# --------------------------------------------------
+# QUERY EXECUTION
+# --------------------------------------------------
+
+ARROW_FETCH = pa is not None and os.environ.get("BLOCK_ALERT_ARROW_FETCH", "1") != "0"
+
+
+def _rows_to_frame(names, rows):
+    """
+    Decode fetched rows column by column into Arrow arrays (DECIMAL -> float64,
+    like pd.read_sql's coerce_float) and hand pandas the columnar buffers.
+    Returns (frame, decoded bytes).
+    """
+    if not ARROW_FETCH:
+        df = pd.DataFrame.from_records(rows, columns=names, coerce_float=True)
+        return df, int(df.memory_usage(index=False, deep=True).sum())
+
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+
+    arrays = []
+    for values in columns:
+        array = pa.array(values, from_pandas=True)
+        if pa.types.is_decimal(array.type):
+            array = array.cast(pa.float64())
+        arrays.append(array)
+
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.to_pandas(), table.nbytes
+
+
+def _execute(conn, query, params=None):
+    """Bound :name parameters go through text(); plain SQL straight to the driver (as pd.read_sql does)"""
+    if params:
+        return conn.execute(text(query), params)
+    return conn.exec_driver_sql(query)
+
+
+def run_query(query, compact=False, params=None):
+    """
+    Run a query on a pooled connection; statements without a result set return
+    an empty frame. params binds :name placeholders (see sql_params).
+    compact=True returns categorical text and int32 counts / IDs where
+    lossless (see compact_frames). Every call is recorded in query_stats.
+    """
+    name = query_stats.current_name()
+    started = time.perf_counter()
+    nbytes = 0
+
+    try:
+        engine = get_engine()
+        with engine.begin() as conn:
+            if ARROW_FETCH:
+                result = _execute(conn, query, params)
+                rows = result.fetchall() if result.returns_rows else None
+                db_s = time.perf_counter() - started
+                df, nbytes = _rows_to_frame(list(result.keys()), rows) if rows is not None else (pd.DataFrame(), 0)
+            else:
+                try:
+                    df = pd.read_sql(text(query) if params else query, conn, params=params)
+                except Exception:
+                    conn.execute(text(query), params or {})
+                    df = pd.DataFrame()
+                db_s = time.perf_counter() - started
+                nbytes = int(df.memory_usage(index=False, deep=True).sum())
+    except Exception as e:
+        query_stats.record(name, wall_s=time.perf_counter() - started, error=str(e)[:200])
+        raise
+
+    df = compact_frame(df) if compact else df
+    query_stats.record(name, wall_s=time.perf_counter() - started, db_s=db_s, rows=len(df), nbytes=nbytes)
+    return df
+
+
+# --------------------------------------------------
+# STREAMING EXECUTION
+# --------------------------------------------------
+# run_query holds the whole result in memory before returning. For long
+# history pulls run_query_chunks reads through a server-side cursor (where
+# the driver supports one) and yields frames of at most chunk_size rows, so
+# callers can process and drop each chunk. The pooled connection stays
+# checked out until the generator is exhausted or closed.
+
+QUERY_CHUNK_ROWS = int(os.environ.get("BLOCK_ALERT_QUERY_CHUNK_ROWS", 50000))
+
+
+def run_query_chunks(query, chunk_size=None, params=None):
+    """Generator of DataFrame chunks of at most chunk_size rows (nothing for statements without rows)"""
+    chunk_size = chunk_size or QUERY_CHUNK_ROWS
+    name = query_stats.current_name()
+    started = time.perf_counter()
+    db_s, rows_total, bytes_total = None, 0, 0
+    engine = get_engine()
+
+    try:
+        with engine.connect() as conn:
+            result = _execute(conn.execution_options(stream_results=True, max_row_buffer=chunk_size), query, params)
+            db_s = time.perf_counter() - started
+            if not result.returns_rows:
+                conn.commit()
+                return
+
+            names = list(result.keys())
+            partitions = result.partitions(chunk_size)
+            while True:
+                fetch_started = time.perf_counter()
+                rows = next(partitions, None)
+                db_s += time.perf_counter() - fetch_started
+                if rows is None:
+                    break
+
+                df, nbytes = _rows_to_frame(names, rows)
+                rows_total += len(df)
+                bytes_total += nbytes
+                yield df
+    finally:
+        # Wall time covers the consumer's processing between chunks too
+        query_stats.record(name, wall_s=time.perf_counter() - started, db_s=db_s, rows=rows_total, nbytes=bytes_total)
@@ -11,7 +11,6 @@ from datetime import datetime
 import sys
 import tempfile
 import urllib.parse
-from sqlalchemy import create_engine, text
 from datetime import date, timedelta
 import pytz
 import warnings
@@ -26,8 +25,11 @@ warnings.filterwarnings("ignore", message=".*No runtime found.*")
 warnings.filterwarnings("ignore", message=".*ScriptRunContext.*")
 
 
-# Add dashboard path
+# Add dashboard path (this directory, and its parent for the queries.* imports)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queries import db_pool
 
 
 # --- CONFIGURATION ---
@@ -55,18 +57,14 @@ def get_engine():
     host = urllib.parse.quote_plus("dataanalystdb.dinerotesting.com")
     database = urllib.parse.quote_plus("DataAnalyst_Jatin")
 
-    engine = create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}?charset=utf8mb4", pool_pre_ping=True, pool_recycle=3600)
-    return engine
+    # Shared lazily-created engine: every query in the run reuses the same pool
+    db_pool.configure(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}?charset=utf8mb4")
+    return db_pool.get_engine()
 
 
 def run_query(query):
-    engine = get_engine()
-    with engine.begin() as conn:
-        try:
-            return pd.read_sql(query, conn)
-        except:
-            conn.execute(text(query))
-            return pd.DataFrame()
+    get_engine()
+    return db_pool.run_query(query)
 
 
 # --- DB Helpers --- #
@@ -1150,6 +1148,7 @@ def main():
         finally:
             end_time = time.time()
             print(f"⏱ Total execution time: {end_time - start_time:.2f} seconds")
+            print(f"🔌 DB pool usage: {db_pool.pool_stats()}")
 
 
 MAX_RETRIES = 3
@@ -1,5 +1,4 @@
 import time
-start_time = time.time()
 
 import smtplib
 import ssl
@@ -11,7 +10,6 @@ from datetime import datetime
 import sys
 import tempfile
 import urllib.parse
-from sqlalchemy import create_engine, text
 from datetime import date, timedelta
 import pytz
 import warnings
@@ -26,8 +24,16 @@ warnings.filterwarnings("ignore", message=".*No runtime found.*")
 warnings.filterwarnings("ignore", message=".*ScriptRunContext.*")
 
 
-# Add dashboard path
+# Add dashboard path (this directory, and its parent for the queries.* imports)
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queries import db_pool
+from queries.tracker_runner import run_trackers
+from queries import alert_state
+from queries import stats_mirror
+from queries import block_dim
+from queries import query_stats
 
 
 # --- CONFIGURATION ---
@@ -55,18 +61,20 @@ def get_engine():
     host = urllib.parse.quote_plus("dataanalystdb.dinerotesting.com")
     database = urllib.parse.quote_plus("DataAnalyst_Jatin")
 
-    engine = create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}?charset=utf8mb4", pool_pre_ping=True, pool_recycle=3600)
-    return engine
+    # Shared lazily-created engine: every query in the run reuses the same pool
+    db_pool.configure(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}?charset=utf8mb4")
+    return db_pool.get_engine()
 
 
 def run_query(query):
-    engine = get_engine()
-    with engine.begin() as conn:
-        try:
-            return pd.read_sql(query, conn)
-        except:
-            conn.execute(text(query))
-            return pd.DataFrame()
+    get_engine()
+    return db_pool.run_query(query)
+
+
+def run_query_chunks(query):
+    """Stream a long scan in BLOCK_ALERT_QUERY_CHUNK_ROWS-row chunks (history and mirror pulls)"""
+    get_engine()
+    return db_pool.run_query_chunks(query)
 
 
 # --- DB Helpers --- #
@@ -694,10 +702,12 @@ def fetch_epi_tracker(alert_date):
 # --- Partner Volume Spike Tracker Query --- #
 
 
-def fetch_volume_spike_tracker(alert_date):
+def fetch_volume_spike_tracker(alert_date, first_date=None):
     #alert_date = get_latest_event_date()
 
-    start_date = alert_date - timedelta(days=45)
+    # first_date: backfill several alert dates from one scan (rolling windows are only 7 rows)
+    first_date = first_date or alert_date
+    start_date = first_date - timedelta(days=45)
 
     query = f"""
     WITH base AS (
@@ -788,7 +798,7 @@ def fetch_volume_spike_tracker(alert_date):
         END AS Alerts
     
     FROM metrics
-    having Date = '{alert_date}'
+    having Date between '{first_date}' and '{alert_date}'
     and Alerts in ('Strong Scale', 'Suspicious Spike', 'Bot Surge', 'Traffic DOWN - Revenue UP', 'Early Decline')
     and Earnings > 50
      
@@ -804,15 +814,177 @@ def fetch_volume_spike_tracker(alert_date):
 # --- Helper Functions --- #
 
 
+TRACKER_TIMEOUT = 600
+
+# Opt-in: keep per-block rolling state on disk and classify only the new day
+ALERT_STATE_PATH = os.environ.get("BLOCK_ALERT_STATE_PATH")
+
+
+def fetch_block_alerts_incremental(alert_date):
+    """EPC and EPI alerts for alert_date from the persisted block state; only unseen days are read"""
+    state = alert_state.load_state(ALERT_STATE_PATH)
+
+    try:
+        state, day_df, features = alert_state.sync_state(
+            state, alert_date, run_query, window_days=alert_state.EMAIL_WINDOW_DAYS,
+            run_query_chunks=run_query_chunks,
+        )
+    except ValueError as e:
+        # Re-run of a date the state has already moved past: use the full queries
+        print(f"⚠️ {e}. Using full EPC/EPI queries.")
+        return fetch_epc_tracker(alert_date), fetch_epi_tracker(alert_date)
+
+    alert_state.save_state(state, ALERT_STATE_PATH)
+
+    if day_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    results = []
+    for metric in ("epc", "epi"):
+        df = alert_state.classify_day(day_df, features, metric, style="email")
+        df = df[df["Earnings"] > 50].sort_values("Earnings", ascending=False).reset_index(drop=True)
+        results.append(df)
+
+    return tuple(results)
+
+
+def fetch_trackers(alert_date):
+    """
+    Run the EPC, EPI and partner spike queries in parallel, each on its own pooled connection.
+    A failed tracker is retried once on its own; the others keep their results.
+    """
+    if ALERT_STATE_PATH:
+        tracker_jobs = {
+            "EPC/EPI": lambda: fetch_block_alerts_incremental(alert_date),
+            "Partner Spike": lambda: fetch_volume_spike_tracker(alert_date),
+        }
+    else:
+        tracker_jobs = {
+            "EPC": lambda: fetch_epc_tracker(alert_date),
+            "EPI": lambda: fetch_epi_tracker(alert_date),
+            "Partner Spike": lambda: fetch_volume_spike_tracker(alert_date),
+        }
+
+    results, errors, timings = run_trackers(tracker_jobs, timeout=TRACKER_TIMEOUT)
+
+    for name, err in errors.items():
+        # A timed-out tracker is still running on its abandoned thread: a retry would
+        # double the DB load (and race it on the alert state file)
+        if isinstance(err, TimeoutError):
+            raise RuntimeError(f"{name} tracker timed out: {err}")
+
+        print(f"⚠️ {name} tracker failed ({err}). Retrying once...")
+        retry_results, retry_errors, retry_timings = run_trackers({name: tracker_jobs[name]}, timeout=TRACKER_TIMEOUT)
+
+        if retry_errors:
+            raise RuntimeError(f"{name} tracker failed twice: {retry_errors[name]}")
+
+        results.update(retry_results)
+        timings[name] += retry_timings[name]
+
+    if "EPC/EPI" in results:
+        results["EPC"], results["EPI"] = results.pop("EPC/EPI")
+        timings["EPC"] = timings["EPI"] = timings.pop("EPC/EPI")
+
+    for name in ("EPC", "EPI", "Partner Spike"):
+        print(f"⏱ {name} tracker: {timings[name]:.2f}s ({len(results[name])} rows)")
+
+    return results["EPC"], results["EPI"], results["Partner Spike"]
+
+
+def fetch_block_alerts_batch(alert_dates):
+    """EPC and EPI alerts for several dates from one shared history scan: {date: (epc_df, epi_df)}"""
+    first_date, last_date = min(alert_dates), max(alert_dates)
+
+    state = alert_state.load_state(ALERT_STATE_PATH)
+    try:
+        state, days = alert_state.sync_state_range(
+            state, first_date, last_date, run_query, window_days=alert_state.EMAIL_WINDOW_DAYS,
+            run_query_chunks=run_query_chunks,
+        )
+    except ValueError as e:
+        # Persisted state is already ahead: rebuild in memory and leave the file alone
+        print(f"⚠️ {e}. Rebuilding block state in memory for the backfill.")
+        state, days = alert_state.sync_state_range(
+            None, first_date, last_date, run_query, window_days=alert_state.EMAIL_WINDOW_DAYS,
+            run_query_chunks=run_query_chunks,
+        )
+    else:
+        if ALERT_STATE_PATH:
+            alert_state.save_state(state, ALERT_STATE_PATH)
+
+    results = {}
+    for alert_date in alert_dates:
+        if alert_date not in days:
+            results[alert_date] = (pd.DataFrame(), pd.DataFrame())
+            continue
+
+        day_df, features = days[alert_date]
+        frames = []
+        for metric in ("epc", "epi"):
+            df = alert_state.classify_day(day_df, features, metric, style="email")
+            frames.append(df[df["Earnings"] > 50].sort_values("Earnings", ascending=False).reset_index(drop=True))
+        results[alert_date] = tuple(frames)
+
+    return results
+
+
+def fetch_block_alerts_sql(alert_dates):
+    """EPC and EPI alerts per date from the SQL trackers, like the daily run without a state file"""
+    return {alert_date: (fetch_epc_tracker(alert_date), fetch_epi_tracker(alert_date)) for alert_date in alert_dates}
+
+
+def get_alerts_batch(alert_dates):
+    """
+    get_alerts for several pending dates: one partner spike scan covers all of
+    them, and with ALERT_STATE_PATH one block history scan does too (otherwise
+    the SQL trackers run per date, the same engine as the daily run).
+    Returns {alert_date: get_alerts output}.
+    """
+    print(f"📤 Preparing alerts for {len(alert_dates)} dates: {alert_dates[0]} → {alert_dates[-1]}")
+
+    if ALERT_STATE_PATH:
+        block_job, block_timeout = lambda: fetch_block_alerts_batch(alert_dates), TRACKER_TIMEOUT
+    else:
+        block_job, block_timeout = lambda: fetch_block_alerts_sql(alert_dates), TRACKER_TIMEOUT * len(alert_dates)
+
+    jobs = {
+        "EPC/EPI": block_job,
+        "Partner Spike": lambda: fetch_volume_spike_tracker(alert_dates[-1], first_date=alert_dates[0]),
+    }
+    results, errors, timings = run_trackers(jobs, timeout=TRACKER_TIMEOUT, timeouts={"EPC/EPI": block_timeout})
+
+    if errors:
+        raise RuntimeError(f"Backfill trackers failed: {errors}")
+
+    for name, t in timings.items():
+        print(f"⏱ {name} backfill: {t:.2f}s")
+
+    block_alerts, partner_all = results["EPC/EPI"], results["Partner Spike"]
+    if not partner_all.empty:
+        partner_all["Date"] = pd.to_datetime(partner_all["Date"]).dt.date
+
+    alerts = {}
+    for alert_date in alert_dates:
+        epc_df, epi_df = block_alerts[alert_date]
+        partner_df = partner_all[partner_all["Date"] == alert_date].reset_index(drop=True) if not partner_all.empty else pd.DataFrame()
+        alerts[alert_date] = summarize_alerts(alert_date, epc_df, epi_df, partner_df)
+
+    return alerts
+
+
 def get_alerts(alert_date):
     
     print("🔄 Running dashboard trackers...")
     
     print(f"📤 Preparing alerts for {alert_date}")
     
-    epc_df = fetch_epc_tracker(alert_date)
-    epi_df = fetch_epi_tracker(alert_date)
-    partner_df = fetch_volume_spike_tracker(alert_date)
+    epc_df, epi_df, partner_df = fetch_trackers(alert_date)
+
+    return summarize_alerts(alert_date, epc_df, epi_df, partner_df)
+
+
+def summarize_alerts(alert_date, epc_df, epi_df, partner_df):
     
     # -----------------------------
     # 1. Filter RED & GREEN alerts
@@ -984,6 +1156,368 @@ def create_csv(red_alerts, green_alerts, partner_spikes, temp_dir, alert_date):
 
 
 
+# --- LOCAL MIRROR --- #
+
+
+def refresh_mirror(complete_day=None):
+    """Pull new eventDates into the dashboard's local mirror; a failure never blocks the alert email"""
+    try:
+        summary = stats_mirror.sync_mirror(run_query, run_query_chunks=run_query_chunks, complete_day=complete_day)
+        print(f"🗄 Mirror synced: {summary['dates_written']} date(s), {summary['rows']} rows, watermark {summary['watermark']}")
+    except Exception as e:
+        print(f"⚠️ Mirror sync failed: {e}")
+
+
+def refresh_block_dim():
+    """Fold new eventDates into the partner/block dimension behind the sidebar; never blocks the email"""
+    try:
+        summary = block_dim.sync_block_dim(run_query)
+        print(f"🗂 Block dimension synced: {summary['keys']} keys, {summary['rows_pulled']} rows pulled, watermark {summary['watermark']}")
+    except Exception as e:
+        print(f"⚠️ Block dimension sync failed: {e}")
+
+
+def refresh_local_copies(complete_day=None):
+    """Refresh whichever of the local mirror / block dimension are configured (complete_day: see sync_mirror)"""
+    if stats_mirror.MIRROR_DIR:
+        refresh_mirror(complete_day)
+
+    if block_dim.BLOCK_DIM_PATH:
+        refresh_block_dim()
+
+
+# --- ALERT EMAIL --- #
+
+
+def send_html_email(subject, html_body, attachments):
+    """Send an HTML email with CSV attachments to the alert recipients; returns the recipient list"""
+    msg = MIMEMultipart()
+    msg["From"] = USERNAME
+    msg["To"] = ", ".join(TO_EMAILS)
+    msg["Cc"] = ", ".join(CC_EMAILS)
+    msg["Subject"] = subject
+    
+    msg.attach(MIMEText(html_body, "html"))
+
+    # Attach CSV if exists
+    for file_path in attachments:
+        with open(file_path, "rb") as f:
+            part = MIMEText(f.read().decode("utf-8"), "csv")
+            part.add_header(
+                "Content-Disposition",
+                f'attachment; filename="{os.path.basename(file_path)}"',
+            )
+            msg.attach(part)
+
+    all_recipients = TO_EMAILS + CC_EMAILS
+    
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=60)
+    server.ehlo()
+        
+    print("🔐 Starting TLS handshake...")
+    server.starttls(context=context)
+    server.ehlo()
+        
+    server.login(USERNAME, PASSWORD)
+    server.send_message(msg, from_addr=USERNAME, to_addrs=all_recipients)
+    server.quit()
+
+    return all_recipients
+
+
+def send_alert_email(alert_date, all_red_alerts, combined_red_alerts, all_green_alerts, combined_green_alerts, partner_spikes):
+    """Build the CSVs and summary for one alert_date, send it and log it as alert_email"""
+    # STEP 2: Create temp directory for attachments
+    with tempfile.TemporaryDirectory() as temp_dir:
+        attachments = []
+        
+        # STEP 3: Create CSV attachment if alerts exist
+        if not combined_red_alerts.empty or not partner_spikes.empty or not combined_green_alerts.empty:
+            
+            csv_path = create_csv(combined_red_alerts, combined_green_alerts, partner_spikes, temp_dir, alert_date)
+            
+            if csv_path:
+                attachments.extend(csv_path)
+        else:
+            print("ℹ️ No RED alerts or GREEN alerts or Partner spikes found. Skipping CSV generation.")
+        
+        # STEP 4: Email subject & contents
+        
+        subject = f"KPI Alerts – {alert_date}"
+
+        unique_red_blocks = combined_red_alerts.drop_duplicates(subset=['Block ID'])
+
+        unique_green_blocks = combined_green_alerts.drop_duplicates(subset=['Block ID'])
+
+        unique_partners = partner_spikes['Partner'].nunique() if not partner_spikes.empty else 0
+        
+        total_red_blocks = len(unique_red_blocks)
+
+        total_green_blocks = len(unique_green_blocks)
+        
+        total_red_revenue = unique_red_blocks['Earnings'].sum()
+
+        total_green_revenue = unique_green_blocks['Earnings'].sum()
+
+        pst_timezone = pytz.timezone('US/Pacific')
+        
+        pst_now = datetime.now(pst_timezone)
+
+
+        html_body = f"""
+            <html>
+            <head>
+                <style>
+                body {{
+                    font-family: Arial, sans-serif;
+                    color: #333;
+                }}
+                .container {{
+                    padding: 20px;
+                    max-width: 600px;
+                }}
+                .alert-summary {{
+                    margin: 20px 0;
+                }}
+                .red-kpi {{
+                    padding: 12px;
+                    background-color: #fff5f5;
+                    border-left: 5px solid #d32f2f;
+                    margin-bottom: 10px;
+                }}
+                .green-kpi {{
+                    padding: 12px;
+                    background-color: #f1f8e9;
+                    border-left: 5px solid #689f38;
+                }}
+                .footer {{
+                    margin-top: 25px;
+                    font-size: 12px;
+                    color: #777;
+                }}
+                </style>
+            </head>
+            
+            <body>
+                <div class="container">
+                
+                    <p>Hello Team,</p>
+                    
+                    <div class="alert-summary">
+                    
+                        <p><strong>Daily KPI Alert Summary for {alert_date}:</strong></p>
+                        <ul>
+                            <li><strong>{len(all_red_alerts)} <span style="color: #d32f2f;">Red alerts</span></strong> detected</li>
+                            <li><strong>{len(all_green_alerts)} <span style="color: #689f38;">Green alerts</span></strong> detected</li>
+                            <li><strong>{unique_partners}</strong> partner(s) with volume anomalies</li>
+                        </ul>
+                    </div>
+                
+                    <div class="red-kpi">
+                        <strong>Red Alert Highlights:</strong><br>
+                        • <strong>{total_red_blocks}</strong> unique blocks affected<br>
+                        • <strong>${total_red_revenue:,.2f}</strong> revenue impacted
+                    </div>
+                    
+                    <div class="green-kpi">
+                        <strong>Green Alert Highlights:</strong><br>
+                        • <strong>{total_green_blocks}</strong> unique blocks performing well<br>
+                        • <strong>${total_green_revenue:,.2f}</strong> positive revenue contribution
+                    </div>
+                
+                    <p>
+                    Detailed block-level and partner-level diagnostics are attached for immediate review.
+                    </p>
+                    
+                    <p>
+                        Access the live dashboard here:<br>
+                        <a href="https://keywordtool.simpleadmin.io/Block_Alert_System">
+                        KPI Alert Console
+                        </a>
+                    </p>
+                    
+                    <div class="footer">
+                        Generated on {pst_now.strftime('%Y-%m-%d %H:%M:%S PST')}<br>
+                        KPI Alert Console
+                    </div>
+                </div>
+            </body>
+            </html>
+            """
+        try:
+            all_recipients = send_html_email(subject, html_body, attachments)
+
+            try:
+                log_email_alert(alert_date=alert_date, 
+                                red_df=all_red_alerts, 
+                                green_df=all_green_alerts, 
+                                partner_df=partner_spikes,
+                                email_type='alert_email',
+                                csv_paths=attachments)
+                print(f"📝 Logged email alert for {alert_date}")
+            except Exception as e:
+                print("⚠️ Email sent BUT logging failed:", e)
+    
+            print(f"✅ SUCCESS! Email sent to {len(all_recipients)} execs")
+
+        except Exception as e:
+            print(f"❌ Email failed: {str(e)}")
+
+        finally:
+            print(f"🔌 DB pool usage: {db_pool.pool_stats()}")
+
+
+def send_digest_email(alerts_by_date):
+    """One email covering several backfilled dates: a summary row per date and every date's CSVs"""
+    alert_dates = sorted(alerts_by_date)
+    subject = f"KPI Alerts – {alert_dates[0]} to {alert_dates[-1]}"
+
+    pst_now = datetime.now(pytz.timezone('US/Pacific'))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        attachments = []
+        summary_rows = []
+
+        for alert_date in alert_dates:
+            all_red_alerts, combined_red_alerts, all_green_alerts, combined_green_alerts, partner_spikes = alerts_by_date[alert_date]
+
+            csv_paths = create_csv(combined_red_alerts, combined_green_alerts, partner_spikes, temp_dir, alert_date) or []
+            attachments.extend(csv_paths)
+
+            unique_red_blocks = combined_red_alerts.drop_duplicates(subset=['Block ID'])
+            unique_green_blocks = combined_green_alerts.drop_duplicates(subset=['Block ID'])
+            unique_partners = partner_spikes['Partner'].nunique() if not partner_spikes.empty else 0
+
+            summary_rows.append(f"""
+                        <tr>
+                            <td>{alert_date}</td>
+                            <td style="color: #d32f2f;">{len(all_red_alerts)} ({len(unique_red_blocks)} blocks, ${unique_red_blocks['Earnings'].sum():,.2f})</td>
+                            <td style="color: #689f38;">{len(all_green_alerts)} ({len(unique_green_blocks)} blocks, ${unique_green_blocks['Earnings'].sum():,.2f})</td>
+                            <td>{unique_partners}</td>
+                        </tr>""")
+
+        html_body = f"""
+            <html>
+            <head>
+                <style>
+                body {{
+                    font-family: Arial, sans-serif;
+                    color: #333;
+                }}
+                .container {{
+                    padding: 20px;
+                    max-width: 700px;
+                }}
+                table {{
+                    border-collapse: collapse;
+                    margin: 20px 0;
+                }}
+                th, td {{
+                    padding: 6px 12px;
+                    border-bottom: 1px solid #ddd;
+                    text-align: left;
+                }}
+                .footer {{
+                    margin-top: 25px;
+                    font-size: 12px;
+                    color: #777;
+                }}
+                </style>
+            </head>
+            
+            <body>
+                <div class="container">
+                
+                    <p>Hello Team,</p>
+                    
+                    <p>Data ingestion caught up on several days at once, so the daily KPI alerts for
+                    <strong>{alert_dates[0]}</strong> to <strong>{alert_dates[-1]}</strong> are combined below.</p>
+                    
+                    <table>
+                        <tr><th>Date</th><th>Red alerts</th><th>Green alerts</th><th>Partner anomalies</th></tr>{"".join(summary_rows)}
+                    </table>
+                    
+                    <p>
+                    Detailed block-level and partner-level diagnostics for each date are attached.
+                    </p>
+                    
+                    <p>
+                        Access the live dashboard here:<br>
+                        <a href="https://keywordtool.simpleadmin.io/Block_Alert_System">
+                        KPI Alert Console
+                        </a>
+                    </p>
+                    
+                    <div class="footer">
+                        Generated on {pst_now.strftime('%Y-%m-%d %H:%M:%S PST')}<br>
+                        KPI Alert Console
+                    </div>
+                </div>
+            </body>
+            </html>
+            """
+
+        try:
+            all_recipients = send_html_email(subject, html_body, attachments)
+
+            for alert_date in alert_dates:
+                all_red_alerts, _, all_green_alerts, _, partner_spikes = alerts_by_date[alert_date]
+                date_csvs = [p for p in attachments if alert_date.strftime('%Y%m%d') in os.path.basename(p)]
+                try:
+                    log_email_alert(alert_date=alert_date,
+                                    red_df=all_red_alerts,
+                                    green_df=all_green_alerts,
+                                    partner_df=partner_spikes,
+                                    email_type='alert_email',
+                                    csv_paths=date_csvs)
+                    print(f"📝 Logged email alert for {alert_date}")
+                except Exception as e:
+                    print(f"⚠️ Digest sent BUT logging failed for {alert_date}:", e)
+
+            print(f"✅ SUCCESS! Digest for {len(alert_dates)} dates sent to {len(all_recipients)} execs")
+
+        except Exception as e:
+            print(f"❌ Digest email failed: {str(e)}")
+
+        finally:
+            print(f"🔌 DB pool usage: {db_pool.pool_stats()}")
+
+
+# --- BACKFILL --- #
+
+# "off": one date per run (default), "per_date": one email per pending date,
+# "digest": a single email covering every pending date
+BACKFILL_MODE = os.environ.get("BLOCK_ALERT_BACKFILL", "off")
+
+
+def get_pending_alert_dates(pst_today):
+    """Every unsent alert date from the last logged alert_date up to MAX(eventDate), before today"""
+    next_date = get_next_alert_date()
+    latest_stats_date = get_latest_event_date()
+
+    if next_date is None or latest_stats_date is None:
+        return []
+
+    last_date = min(latest_stats_date, pst_today - timedelta(days=1))
+    pending = [next_date + timedelta(days=i) for i in range((last_date - next_date).days + 1)]
+
+    return [d for d in pending if not was_alert_sent(d)]
+
+
+def run_backfill(pending_dates):
+    """Alerts for every pending date from shared scans, sent per date or as one digest"""
+    print(f"⏩ Backfill ({BACKFILL_MODE}): {len(pending_dates)} pending dates")
+
+    alerts_by_date = get_alerts_batch(pending_dates)
+
+    if BACKFILL_MODE == "digest":
+        send_digest_email(alerts_by_date)
+        return
+
+    for alert_date in pending_dates:
+        send_alert_email(alert_date, *alerts_by_date[alert_date])
+
+
 # --- MAIN FUNCTION --- #
 
 
@@ -1014,6 +1548,18 @@ def main():
     if alert_date >= pst_today:
         print(f"Alert_date {alert_date} is today or future. Data won't be available until tomorrow. Exiting.")
         return
+
+    # --------------------------
+    # ⏩ CATCH-UP (several dates pending)
+    # --------------------------
+    if BACKFILL_MODE in ("per_date", "digest"):
+        pending_dates = get_pending_alert_dates(pst_today)
+
+        if len(pending_dates) > 1:
+            # Several new days landed: sync the dashboard's local copies before catching up
+            refresh_local_copies(complete_day=pending_dates[-1])
+            run_backfill(pending_dates)
+            return
     
 
     # --------------------------
@@ -1131,6 +1677,11 @@ def main():
         return
 
 
+    # --------------------------
+    # 🗄 LOCAL MIRROR + BLOCK DIMENSION REFRESH
+    # --------------------------
+    refresh_local_copies(complete_day=alert_date)
+
     # --------------------------
     # 2️⃣ ALERT ALREADY SENT?
     # --------------------------
@@ -1145,174 +1696,26 @@ def main():
     # STEP 1: Get alerts
     all_red_alerts, combined_red_alerts, all_green_alerts, combined_green_alerts, partner_spikes = get_alerts(alert_date)
     
-    # STEP 2: Create temp directory for attachments
-    with tempfile.TemporaryDirectory() as temp_dir:
-        attachments = []
-        
-        # STEP 3: Create CSV attachment if alerts exist
-        if not combined_red_alerts.empty or not partner_spikes.empty or not combined_green_alerts.empty:
-            
-            csv_path = create_csv(combined_red_alerts, combined_green_alerts, partner_spikes, temp_dir, alert_date)
-            
-            if csv_path:
-                attachments.extend(csv_path)
-        else:
-            print("ℹ️ No RED alerts or GREEN alerts or Partner spikes found. Skipping CSV generation.")
-        
-        # STEP 4: Email subject & contents
-        
-        subject = f"KPI Alerts – {alert_date}"
+    send_alert_email(alert_date, all_red_alerts, combined_red_alerts, all_green_alerts, combined_green_alerts, partner_spikes)
 
-        unique_red_blocks = combined_red_alerts.drop_duplicates(subset=['Block ID'])
 
-        unique_green_blocks = combined_green_alerts.drop_duplicates(subset=['Block ID'])
+# --- QUERY DIAGNOSTICS --- #
 
-        unique_partners = partner_spikes['Partner'].nunique() if not partner_spikes.empty else 0
-        
-        total_red_blocks = len(unique_red_blocks)
+QUERY_LOG_PATH = os.environ.get("BLOCK_ALERT_QUERY_LOG")
 
-        total_green_blocks = len(unique_green_blocks)
-        
-        total_red_revenue = unique_red_blocks['Earnings'].sum()
 
-        total_green_revenue = unique_green_blocks['Earnings'].sum()
+def dump_query_stats():
+    """Print the slowest queries of the run and append every measurement to BLOCK_ALERT_QUERY_LOG (JSON lines)"""
+    summary = query_stats.summary()
+    for row in summary.head(5).itertuples(index=False):
+        print(f"⏱ {row.name}: {row.calls} call(s), max {row.wall_max_s:.2f}s, {int(row.rows)} rows, {row.bytes / 1e6:.1f} MB")
 
-        pst_timezone = pytz.timezone('US/Pacific')
-        
-        pst_now = datetime.now(pst_timezone)
-
-
-        html_body = f"""
-            <html>
-            <head>
-                <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    color: #333;
-                }}
-                .container {{
-                    padding: 20px;
-                    max-width: 600px;
-                }}
-                .alert-summary {{
-                    margin: 20px 0;
-                }}
-                .red-kpi {{
-                    padding: 12px;
-                    background-color: #fff5f5;
-                    border-left: 5px solid #d32f2f;
-                    margin-bottom: 10px;
-                }}
-                .green-kpi {{
-                    padding: 12px;
-                    background-color: #f1f8e9;
-                    border-left: 5px solid #689f38;
-                }}
-                .footer {{
-                    margin-top: 25px;
-                    font-size: 12px;
-                    color: #777;
-                }}
-                </style>
-            </head>
-            
-            <body>
-                <div class="container">
-                
-                    <p>Hello Team,</p>
-                    
-                    <div class="alert-summary">
-                    
-                        <p><strong>Daily KPI Alert Summary for {alert_date}:</strong></p>
-                        <ul>
-                            <li><strong>{len(all_red_alerts)} <span style="color: #d32f2f;">Red alerts</span></strong> detected</li>
-                            <li><strong>{len(all_green_alerts)} <span style="color: #689f38;">Green alerts</span></strong> detected</li>
-                            <li><strong>{unique_partners}</strong> partner(s) with volume anomalies</li>
-                        </ul>
-                    </div>
-                
-                    <div class="red-kpi">
-                        <strong>Red Alert Highlights:</strong><br>
-                        • <strong>{total_red_blocks}</strong> unique blocks affected<br>
-                        • <strong>${total_red_revenue:,.2f}</strong> revenue impacted
-                    </div>
-                    
-                    <div class="green-kpi">
-                        <strong>Green Alert Highlights:</strong><br>
-                        • <strong>{total_green_blocks}</strong> unique blocks performing well<br>
-                        • <strong>${total_green_revenue:,.2f}</strong> positive revenue contribution
-                    </div>
-                
-                    <p>
-                    Detailed block-level and partner-level diagnostics are attached for immediate review.
-                    </p>
-                    
-                    <p>
-                        Access the live dashboard here:<br>
-                        <a href="https://keywordtool.simpleadmin.io/Block_Alert_System">
-                        KPI Alert Console
-                        </a>
-                    </p>
-                    
-                    <div class="footer">
-                        Generated on {pst_now.strftime('%Y-%m-%d %H:%M:%S PST')}<br>
-                        KPI Alert Console
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
+    if QUERY_LOG_PATH:
         try:
-            msg = MIMEMultipart()
-            msg["From"] = USERNAME
-            msg["To"] = ", ".join(TO_EMAILS)
-            msg["Cc"] = ", ".join(CC_EMAILS)
-            msg["Subject"] = subject
-            
-            msg.attach(MIMEText(html_body, "html"))
-    
-            # Attach CSV if exists
-            for file_path in attachments:
-                with open(file_path, "rb") as f:
-                    part = MIMEText(f.read().decode("utf-8"), "csv")
-                    part.add_header(
-                        "Content-Disposition",
-                        f'attachment; filename="{os.path.basename(file_path)}"',
-                    )
-                    msg.attach(part)
-    
-            all_recipients = TO_EMAILS + CC_EMAILS
-            
-            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=60)
-            server.ehlo()
-                
-            print("🔐 Starting TLS handshake...")
-            server.starttls(context=context)
-            server.ehlo()
-                
-            server.login(USERNAME, PASSWORD)
-            server.send_message(msg, from_addr=USERNAME, to_addrs=all_recipients)
-            server.quit()
-
-            try:
-                log_email_alert(alert_date=alert_date, 
-                                red_df=all_red_alerts, 
-                                green_df=all_green_alerts, 
-                                partner_df=partner_spikes,
-                                email_type='alert_email',
-                                csv_paths=attachments)
-                print(f"📝 Logged email alert for {alert_date}")
-            except Exception as e:
-                print("⚠️ Email sent BUT logging failed:", e)
-    
-            print(f"✅ SUCCESS! Email sent to {len(all_recipients)} execs")
-
+            written = query_stats.dump_jsonl(QUERY_LOG_PATH)
+            print(f"📝 {written} query measurements written to {QUERY_LOG_PATH}")
         except Exception as e:
-            print(f"❌ Email failed: {str(e)}")
-
-        finally:
-            end_time = time.time()
-            print(f"⏱ Total execution time: {end_time - start_time:.2f} seconds")
+            print(f"⚠️ Query log write failed: {e}")
 
 
 MAX_RETRIES = 3
@@ -1333,3 +1736,5 @@ if __name__ == "__main__":
                 time.sleep(RETRY_DELAY)
             else:
                 print("🛑 All retry attempts failed. Giving up.")
+
+    dump_query_stats()
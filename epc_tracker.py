@@ -1,63 +1,42 @@
 import streamlit as st
-from utils.db import run_query
-from queries.block_details import get_latest_event_date
+from queries.block_details import run_query, get_latest_event_date, fetch_block_base, apply_user_filters
+from queries.base_scan import block_base_cte
+from queries import stats_mirror
+from queries.alert_engine import DEFAULT_ENGINE, compute_epc_alerts
+from queries.compact_frames import compact_frame
+from queries.sql_params import run_bound
 from datetime import timedelta
 
 
 @st.cache_data(ttl=3600)
-def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
+def fetch_epc_universe(end_date=None, engine=None):
+    """Unfiltered EPC tracker, cached once per watermark date for every filter combination"""
 
     # --------------------------------------------------
     # 1. STATIC DATE LOGIC (V1)
     # --------------------------------------------------
-    end_date = get_latest_event_date()
+    end_date = end_date or get_latest_event_date()
     
     start_date = end_date - timedelta(days=44)
 
     calc_start_date = end_date - timedelta(days=89)
 
-    partners_selected = bool(partners)
+    # Python engine: same alerts, computed locally from the shared base rows
+    # (always taken when the local mirror already holds the whole window)
+    if (engine or DEFAULT_ENGINE) == "python" or stats_mirror.covers(calc_start_date, end_date):
+        base_df = fetch_block_base(calc_start_date, end_date)
+        return compact_frame(compute_epc_alerts(base_df, start_date, end_date))
 
     # --------------------------------------------------
-    # 2. WHERE CLAUSE (BASE DATA ONLY)
+    # 2. BASE SCAN (shared with the other block tracker)
     # --------------------------------------------------
-    conditions = [
-        f"eventDate BETWEEN '{calc_start_date}' AND '{end_date}'",
-        "est_earnings > 5 and uniq_impr > 50",
-        "partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')",
-    ]
-
-    if partners:
-        partner_list = "', '".join(partners)
-        conditions.append(f"partner IN ('{partner_list}')")
-
-    if block_ids:
-        block_id_list = ",".join(map(str, block_ids))
-        conditions.append(f"keyword_block_id IN ({block_id_list})")
-
-    if block_names:
-        block_name_list = "', '".join(block_names)
-        conditions.append(f"block_name IN ('{block_name_list}')")
-
-    where_clause = " AND ".join(conditions)
+    base_cte, base_params = block_base_cte(calc_start_date, end_date)
 
     # --------------------------------------------------
     # 4. OPTIMIZED QUERY
     # --------------------------------------------------
     query = f"""
-    WITH base AS (
-        SELECT
-            eventDate,
-            partner,
-            keyword_block_id,
-            block_name,
-            est_earnings,
-            uniq_impr,
-            paid_clicks,
-            epc
-        FROM team_block_stats
-        WHERE {where_clause}
-    ),
+    WITH {base_cte},
 
     rolling AS (
         SELECT
@@ -179,17 +158,6 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
     ),
 
     
-    global_block_revenue_share AS (
-        SELECT
-            t.eventDate, t.keyword_block_id,
-            --SUM(t.est_earnings) * 1.0 / NULLIF(SUM(SUM(t.est_earnings)) OVER (), 0) AS global_revenue_share,
-            (t.est_earnings * 1.0) / nullif(sum(sum(t.est_earnings)) over (partition by t.eventDate), 0) as daily_rev_share
-        FROM team_block_stats t
-        WHERE t.eventDate between '{calc_start_date}' and '{end_date}'
-          AND t.est_earnings > 5 and t.uniq_impr > 50
-          AND t.partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')
-        GROUP BY t.keyword_block_id, t.eventDate
-    ),
 
     
     final AS (
@@ -207,7 +175,7 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
             ROUND(s.epc_7d_avg, 4) AS `7D Avg EPC`,
             round(s.epc_30d_avg, 4) as `30D Avg EPC`,
             
-            round(g.daily_rev_share * 100, 2) as `Block's Daily Share`,
+            round(s.daily_rev_share * 100, 2) as `Block's Daily Share`,
 
             round(impr_7d_avg, 2) as `7D Avg Impressions`,
             
@@ -215,19 +183,19 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
 
             CASE
                 -- 1) CRITICAL RED (streak / sharp drops)
-                WHEN s.low_streak_len >= 3 AND g.daily_rev_share > 0.015 AND s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPC ↓ ', s.low_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg | High Rev Block')                
+                WHEN s.low_streak_len >= 3 AND s.daily_rev_share > 0.015 AND s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPC ↓ ', s.low_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg | High Rev Block')                
                 
                 WHEN s.low_streak_len >= 3 AND s.is_current_low_streak_end = 1 THEN CONCAT('⚠️ EPC ↓ ', s.low_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg')               
-                WHEN s.sharp_drop_flag = 1 AND g.daily_rev_share > 0.015 THEN CONCAT('🚨 Sharp EPC ↓ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
+                WHEN s.sharp_drop_flag = 1 AND s.daily_rev_share > 0.015 THEN CONCAT('🚨 Sharp EPC ↓ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
                 
                 WHEN s.sharp_drop_flag = 1 THEN CONCAT('🚨 Sharp EPC ↓ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday')
 
                 
                 -- 2) CRITICAL GREEN (streak / sharp rises)
-                WHEN s.high_streak_len >= 3 AND g.daily_rev_share > 0.015 AND s.is_current_high_streak_end = 1 THEN CONCAT('🔥 EPC ↑ ', s.high_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg | High Rev Block')
+                WHEN s.high_streak_len >= 3 AND s.daily_rev_share > 0.015 AND s.is_current_high_streak_end = 1 THEN CONCAT('🔥 EPC ↑ ', s.high_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg | High Rev Block')
                 
                 WHEN s.high_streak_len >= 3 AND s.is_current_high_streak_end = 1 THEN CONCAT('📈 EPC ↑ ', s.low_streak_len, 'D Streak | ', s.epc_perf_pct, '% vs 7D Avg')                
-                WHEN s.sharp_rise_flag = 1 AND g.daily_rev_share > 0.015 THEN CONCAT('🏆 Sharp EPC ↑ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
+                WHEN s.sharp_rise_flag = 1 AND s.daily_rev_share > 0.015 THEN CONCAT('🏆 Sharp EPC ↑ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
                 
                 WHEN s.sharp_rise_flag = 1 then CONCAT('✨ Sharp EPC ↑ ', ROUND(((s.epc - s.prev_epc) / NULLIF(s.prev_epc, 0)) * 100, 2), '% vs Yesterday')
 
@@ -242,17 +210,17 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
 
                 
                 -- 4) SINGLE-DAY diagnostics
-                WHEN s.low_epc_low_rev_flag = 1 AND g.daily_rev_share > 0.015 THEN '❌ Both EPC & Rev Low | High Rev Block'
+                WHEN s.low_epc_low_rev_flag = 1 AND s.daily_rev_share > 0.015 THEN '❌ Both EPC & Rev Low | High Rev Block'
                 WHEN s.low_epc_high_rev_flag = 1 THEN CONCAT('⚠️ EPC: ', s.epc_perf_pct, '% | Rev: ', s.rev_perf_pct, '%')
                 
 
-                WHEN s.high_epc_high_rev_flag = 1 AND g.daily_rev_share > 0.015 THEN '✅ EPC & Revenue Both High | High Rev Block'
+                WHEN s.high_epc_high_rev_flag = 1 AND s.daily_rev_share > 0.015 THEN '✅ EPC & Revenue Both High | High Rev Block'
                 WHEN s.high_epc_low_rev_flag = 1 THEN CONCAT('✨ EPC: ', s.epc_perf_pct, '% | Rev: ', s.rev_perf_pct, '%')
                 WHEN s.high_epc_high_rev_flag = 1 THEN '✅ EPC & Revenue Both Higher Than 7D Avg'
 
                 
-                WHEN s.low_epc_flag = 1 AND g.daily_rev_share > 0.015 THEN '🔎 Low EPC - High Revenue Block'
-                WHEN s.high_epc_flag = 1 AND g.daily_rev_share > 0.015 THEN '🔎 High EPC - High Revenue Block'
+                WHEN s.low_epc_flag = 1 AND s.daily_rev_share > 0.015 THEN '🔎 Low EPC - High Revenue Block'
+                WHEN s.high_epc_flag = 1 AND s.daily_rev_share > 0.015 THEN '🔎 High EPC - High Revenue Block'
                 
 
                 WHEN s.low_epc_flag = 1 THEN CONCAT('⚠️ EPC DOWN | ', s.epc_perf_pct, '% vs 7D Avg')
@@ -260,21 +228,20 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
 
                 
                 -- 5) SCALE QUALITY WATCH
-            	WHEN s.volume_epc_stagnation_flag = 1 AND g.daily_rev_share > 0.01 THEN '📈 Traffic & Revenue Spike with Stable EPC on High Revenue Block'
+            	WHEN s.volume_epc_stagnation_flag = 1 AND s.daily_rev_share > 0.01 THEN '📈 Traffic & Revenue Spike with Stable EPC on High Revenue Block'
                 WHEN s.volume_epc_stagnation_flag = 1 THEN '📈 Traffic & Revenue Spike with Stable EPC'
 
                 ELSE 'Within Thresholds'
                 
             END AS Alerts,
 
-            CASE WHEN g.daily_rev_share > 0.015 THEN 1 ELSE 0 END AS is_high_revenue_block,
+            CASE WHEN s.daily_rev_share > 0.015 THEN 1 ELSE 0 END AS is_high_revenue_block,
 
             s.high_streak_len, s.sharp_rise_flag, s.high_epc_high_rev_flag, s.high_epc_low_rev_flag, s.high_epc_flag, s.mild_rise_streak_len,
             s.low_streak_len, s.sharp_drop_flag, s.low_epc_low_rev_flag, s.low_epc_high_rev_flag, s.low_epc_flag, s.mild_drift_streak_len,
             s.volume_epc_stagnation_flag
             
         FROM streaked s
-        LEFT JOIN global_block_revenue_share g ON s.keyword_block_id = g.keyword_block_id AND s.eventDate = g.eventDate
         
 
         
@@ -328,5 +295,15 @@ def fetch_epc_tracker(partners=None, block_ids=None, block_names=None):
     ORDER BY Date DESC, Earnings DESC;
     """
 
-    df = run_query(query)
-    return df
+    df = run_bound(run_query, query, base_params)
+    return compact_frame(df)
+
+
+def fetch_epc_tracker(partners=None, block_ids=None, block_names=None, engine=None, end_date=None):
+    """EPC tracker for the sidebar filters, sliced in memory from the cached universe"""
+    end_date = end_date or get_latest_event_date()
+
+    # Block features only look at the block's own rows and the daily revenue share is
+    # taken before the user filters, so filtering the output matches filtering the scan
+    universe = fetch_epc_universe(end_date, engine)
+    return apply_user_filters(universe, partners, block_names, block_ids)
@@ -1,45 +1,36 @@
 import streamlit as st
-from utils.db import run_query
-from queries.block_details import get_latest_event_date
+from queries.block_details import run_query, get_latest_event_date, fetch_block_base, apply_user_filters
+from queries.base_scan import block_base_cte
+from queries import stats_mirror
+from queries.alert_engine import DEFAULT_ENGINE, compute_epi_alerts
+from queries.compact_frames import compact_frame
+from queries.sql_params import run_bound
 from datetime import date, timedelta
 
 
 @st.cache_data(ttl=3600)
-def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
+def fetch_epi_universe(end_date=None, engine=None):
+    """Unfiltered EPI tracker, cached once per watermark date for every filter combination"""
 
     # --------------------------------------------------
     # 1. STATIC DATE LOGIC (V1)
     # --------------------------------------------------
-    end_date = get_latest_event_date()
+    end_date = end_date or get_latest_event_date()
     
     start_date = end_date - timedelta(days=44)
 
     calc_start_date = end_date - timedelta(days=89)
 
-    partners_selected = bool(partners)
+    # Python engine: same alerts, computed locally from the shared base rows
+    # (always taken when the local mirror already holds the whole window)
+    if (engine or DEFAULT_ENGINE) == "python" or stats_mirror.covers(calc_start_date, end_date):
+        base_df = fetch_block_base(calc_start_date, end_date)
+        return compact_frame(compute_epi_alerts(base_df, start_date, end_date))
 
     # --------------------------------------------------
-    # 2. WHERE CLAUSE (BASE DATA ONLY)
+    # 2. BASE SCAN (shared with the other block tracker)
     # --------------------------------------------------
-    conditions = [
-        f"eventDate BETWEEN '{calc_start_date}' AND '{end_date}'",
-        "est_earnings > 5 and uniq_impr > 50",
-        "partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')",
-    ]
-
-    if partners:
-        partner_list = "', '".join(partners)
-        conditions.append(f"partner IN ('{partner_list}')")
-
-    if block_ids:
-        block_id_list = ",".join(map(str, block_ids))
-        conditions.append(f"keyword_block_id IN ({block_id_list})")
-
-    if block_names:
-        block_name_list = "', '".join(block_names)
-        conditions.append(f"block_name IN ('{block_name_list}')")
-
-    where_clause = " AND ".join(conditions)
+    base_cte, base_params = block_base_cte(calc_start_date, end_date)
 
     # Optional: reuse partner filter inside partner share CTE for speed (only when partners selected)
     # partner_filter_sql = ""
@@ -86,19 +77,7 @@ def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
     # 4. FINAL QUERY
     # --------------------------------------------------
     query = f"""
-    WITH base AS (
-        SELECT
-            eventDate,
-            partner,
-            keyword_block_id,
-            block_name,
-            est_earnings,
-            uniq_impr,
-            epi,
-            paid_clicks
-        FROM team_block_stats
-        WHERE {where_clause}
-    ),
+    WITH {base_cte},
 
     rolling AS (
         SELECT
@@ -214,16 +193,6 @@ def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
         FROM flagged f
     ),
 
-    global_block_revenue_share AS (
-        SELECT
-            t.eventDate, t.keyword_block_id,
-            (t.est_earnings * 1.0) / nullif(sum(t.est_earnings) over (partition by t.eventDate), 0) as daily_rev_share
-        FROM team_block_stats t
-        WHERE t.eventDate between '{calc_start_date}' and '{end_date}'
-          AND t.est_earnings > 5 and t.uniq_impr > 50
-          AND t.partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')
-        GROUP BY t.keyword_block_id, t.eventDate
-    ),
     
     
     final AS (
@@ -241,26 +210,26 @@ def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
             ROUND(s.epi_7d_avg, 4) AS `7D Avg EPI`,
             round(s.epi_30d_avg, 4) as `30D Avg EPI`,
             
-            round(g.daily_rev_share * 100, 2) as `Block's Daily Share`,
+            round(s.daily_rev_share * 100, 2) as `Block's Daily Share`,
 
             round(impr_7d_avg, 2) as `7D Avg Impressions`,
 
             CASE
                 -- 1) CRITICAL RED (streak / sharp drops)
-                WHEN s.low_streak_len >= 3 AND g.daily_rev_share > 0.015 and s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPI ↓ ', s.low_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg | High Rev Block')
+                WHEN s.low_streak_len >= 3 AND s.daily_rev_share > 0.015 and s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPI ↓ ', s.low_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg | High Rev Block')
                 
                 WHEN s.low_streak_len >= 3 and s.is_current_low_streak_end = 1 then CONCAT('⚠️ EPI ↓ ', s.low_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg')
                 
-                WHEN s.sharp_drop_flag = 1 AND g.daily_rev_share > 0.015 THEN CONCAT('🚨 Sharp EPI ↓ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
+                WHEN s.sharp_drop_flag = 1 AND s.daily_rev_share > 0.015 THEN CONCAT('🚨 Sharp EPI ↓ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
                 
                 WHEN s.sharp_drop_flag = 1 THEN
                 CONCAT('🚨 Sharp EPI ↓ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday')
 
                 
                 -- 2) CRITICAL GREEN (streak / sharp rises)
-                WHEN s.high_streak_len >= 3 AND g.daily_rev_share > 0.015 and s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPI ↑ ', s.high_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg | High Rev Block')
+                WHEN s.high_streak_len >= 3 AND s.daily_rev_share > 0.015 and s.is_current_low_streak_end = 1 THEN CONCAT('🔥 EPI ↑ ', s.high_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg | High Rev Block')
                 WHEN s.high_streak_len >= 3 and s.is_current_low_streak_end = 1 THEN CONCAT('📈 EPI ↑ ', s.low_streak_len, 'D Streak | ', s.epi_perf_pct, '% vs 7D Avg')
-                WHEN s.sharp_rise_flag = 1 AND g.daily_rev_share > 0.015 THEN CONCAT('🏆 Sharp EPI ↑ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
+                WHEN s.sharp_rise_flag = 1 AND s.daily_rev_share > 0.015 THEN CONCAT('🏆 Sharp EPI ↑ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday | High Rev Block')
                 WHEN s.sharp_rise_flag = 1 THEN
                 CONCAT('✨ Sharp EPI ↑ ', ROUND(((s.epi - s.prev_epi) / NULLIF(s.prev_epi, 0)) * 100, 2), '% vs Yesterday')
 
@@ -273,35 +242,34 @@ def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
                     THEN concat('🏆 EPI Rising Daily For ', s.mild_rise_streak_len, ' Days')
 
                 -- 4) SINGLE-DAY diagnostics
-                WHEN s.low_epi_low_rev_flag = 1 AND g.daily_rev_share > 0.015 THEN '❌ Both EPI & Rev Low | High Rev Block'
+                WHEN s.low_epi_low_rev_flag = 1 AND s.daily_rev_share > 0.015 THEN '❌ Both EPI & Rev Low | High Rev Block'
                 WHEN s.low_epi_high_rev_flag = 1 THEN CONCAT('⚠️ EPI: ', s.epi_perf_pct, '% | Rev: ', s.rev_perf_pct, '%')
 
-                WHEN s.high_epi_high_rev_flag = 1 AND g.daily_rev_share > 0.015 THEN '✅ EPI & Revenue Both High | High Rev Block'
+                WHEN s.high_epi_high_rev_flag = 1 AND s.daily_rev_share > 0.015 THEN '✅ EPI & Revenue Both High | High Rev Block'
                 WHEN s.high_epi_low_rev_flag = 1 then CONCAT('✨ EPI: ', s.epi_perf_pct, '% | Rev: ', s.rev_perf_pct, '%')
                 WHEN s.high_epi_high_rev_flag = 1 THEN '✅ EPI & Revenue Both Higher Than 7D Avg'
 
-                WHEN s.low_epi_flag = 1 AND g.daily_rev_share > 0.015 THEN '🔎 Low EPI - High Revenue Block'
-                WHEN s.high_epi_flag = 1 AND g.daily_rev_share > 0.015 THEN '🔎 High EPI - High Revenue Block'
+                WHEN s.low_epi_flag = 1 AND s.daily_rev_share > 0.015 THEN '🔎 Low EPI - High Revenue Block'
+                WHEN s.high_epi_flag = 1 AND s.daily_rev_share > 0.015 THEN '🔎 High EPI - High Revenue Block'
                 
                 WHEN s.low_epi_flag = 1 THEN CONCAT('⚠️ EPI DOWN | ', s.epi_perf_pct, '% vs 7D Avg')
                 WHEN s.high_epi_flag = 1 THEN CONCAT('📈 EPI UP | ', s.epi_perf_pct, '% vs 7D Avg')
 
                 -- 🟡 SCALE QUALITY WATCH
-            	WHEN s.volume_epi_stagnation_flag = 1 AND g.daily_rev_share > 0.01 THEN '📈 Traffic & Revenue Spike with Stable EPI on High Revenue Block'
+            	WHEN s.volume_epi_stagnation_flag = 1 AND s.daily_rev_share > 0.01 THEN '📈 Traffic & Revenue Spike with Stable EPI on High Revenue Block'
                 WHEN s.volume_epi_stagnation_flag = 1 THEN '📈 Traffic & Revenue Spike with Stable EPI'
                 
 
                 ELSE 'Within Thresholds'
             END AS Alerts,
 
-            CASE WHEN g.daily_rev_share > 0.015 THEN 1 ELSE 0 END AS is_high_revenue_block,
+            CASE WHEN s.daily_rev_share > 0.015 THEN 1 ELSE 0 END AS is_high_revenue_block,
 
             s.high_streak_len, s.sharp_rise_flag, s.high_epi_high_rev_flag, s.high_epi_low_rev_flag, s.high_epi_flag, s.mild_rise_streak_len,
             s.low_streak_len, s.sharp_drop_flag, s.low_epi_low_rev_flag, s.low_epi_high_rev_flag, s.low_epi_flag, s.mild_drift_streak_len,
             s.volume_epi_stagnation_flag
 
         FROM streaked s
-        LEFT JOIN global_block_revenue_share g ON s.keyword_block_id = g.keyword_block_id AND s.eventDate = g.eventDate
         
     )
 
@@ -353,5 +321,15 @@ def fetch_epi_tracker(partners=None, block_ids=None, block_names=None):
     ORDER BY Date DESC, Earnings DESC;
     """
 
-    df = run_query(query)
-    return df
+    df = run_bound(run_query, query, base_params)
+    return compact_frame(df)
+
+
+def fetch_epi_tracker(partners=None, block_ids=None, block_names=None, engine=None, end_date=None):
+    """EPI tracker for the sidebar filters, sliced in memory from the cached universe"""
+    end_date = end_date or get_latest_event_date()
+
+    # Block features only look at the block's own rows and the daily revenue share is
+    # taken before the user filters, so filtering the output matches filtering the scan
+    universe = fetch_epi_universe(end_date, engine)
+    return apply_user_filters(universe, partners, block_names, block_ids)
@@ -0,0 +1,63 @@
+from heapq import merge
+
+
+# --------------------------------------------------
+# SIDEBAR FILTER INDEX
+# --------------------------------------------------
+# Partner -> Block Name -> Block ID cascade over the partner/block mapping,
+# built once per mapping refresh. Every option list is pre-sorted, so a
+# widget interaction only merges the lists for the current selection
+# instead of re-filtering and re-sorting the whole mapping.
+
+
+def _sorted_groups(df, key, value):
+    """{key: sorted unique values} for one pair of mapping columns"""
+    return {
+        k: sorted(set(group))
+        for k, group in df.groupby(key, sort=False)[value]
+    }
+
+
+def build_filter_index(mapping_df):
+    """Index a (partner, keyword_block_id, block_name) mapping for the sidebar cascade"""
+    mapping_df = mapping_df[["partner", "keyword_block_id", "block_name"]].dropna().drop_duplicates()
+
+    return {
+        "partners": sorted(mapping_df["partner"].unique()),
+        "blocks": sorted(mapping_df["block_name"].unique()),
+        "ids": sorted(mapping_df["keyword_block_id"].unique()),
+        "blocks_by_partner": _sorted_groups(mapping_df, "partner", "block_name"),
+        "partners_by_block": _sorted_groups(mapping_df, "block_name", "partner"),
+        "ids_by_partner": _sorted_groups(mapping_df, "partner", "keyword_block_id"),
+        "ids_by_block": _sorted_groups(mapping_df, "block_name", "keyword_block_id"),
+        "ids_by_pair": _sorted_groups(mapping_df, ["partner", "block_name"], "keyword_block_id"),
+    }
+
+
+def _merge_unique(lists):
+    """Union of already-sorted lists, still sorted"""
+    merged = []
+    for value in merge(*lists):
+        if not merged or merged[-1] != value:
+            merged.append(value)
+    return merged
+
+
+def blocks_for(index, partners=None):
+    """Sorted block names available for the selected partners (all blocks when none)"""
+    if not partners:
+        return index["blocks"]
+    return _merge_unique(index["blocks_by_partner"].get(p, []) for p in partners)
+
+
+def ids_for(index, partners=None, blocks=None):
+    """Sorted block IDs available for the selected partners and block names"""
+    if not partners and not blocks:
+        return index["ids"]
+    if not blocks:
+        return _merge_unique(index["ids_by_partner"].get(p, []) for p in partners)
+    if not partners:
+        return _merge_unique(index["ids_by_block"].get(b, []) for b in blocks)
+
+    pairs = index["ids_by_pair"]
+    return _merge_unique(pairs.get((p, b), []) for p in partners for b in blocks)
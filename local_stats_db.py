@@ -0,0 +1,189 @@
+import sqlite3
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from queries.base_scan import EXCLUDED_PARTNERS
+
+
+# --------------------------------------------------
+# SYNTHETIC team_block_stats + LOCAL SQLITE STAND-IN
+# --------------------------------------------------
+# Benchmarks and local runs need data without the analyst MySQL. This module
+# generates team_block_stats rows at any scale and with a fixed seed. Blocks
+# have lognormal traffic, weekly seasonality and daily noise, and some start
+# late or die early. Known anomalies are planted in the last days and listed
+# in an anomalies frame. The rows load into a SQLite file that
+# db_pool.configure("sqlite:///<path>") points run_query at.
+#
+# The tracker SQL is MySQL. On SQLite engines db_pool installs the shims in
+# sqlite_compat. Counts are stored as REAL so "/" divides like MySQL's.
+# Dates come back as ISO strings.
+
+STATS_COLUMNS = [
+    "eventDate", "partner", "keyword_block_id", "block_name",
+    "est_earnings", "uniq_impr", "paid_clicks", "epc", "epi", "ctr",
+]
+
+ANOMALY_COLUMNS = ["kind", "partner", "keyword_block_id", "start_date", "end_date"]
+
+NAME_HEADS = [
+    "Auto", "Home", "Health", "Life", "Travel", "Pet", "Dental", "Solar", "Roofing", "Legal",
+    "Credit", "Mortgage", "Student", "Business", "Senior", "Rehab", "Cloud", "Security", "Moving", "Fitness",
+]
+NAME_TAILS = [
+    "Insurance", "Loans", "Quotes", "Deals", "Services", "Repair", "Plans", "Cards", "Software", "Lawyers",
+    "Degrees", "Rentals", "Clinics", "Coverage", "Financing", "Providers", "Jobs", "Reviews", "Offers", "Near Me",
+]
+
+# kind: (trailing days, impressions x, CTR x, EPC x)
+ANOMALY_PLANS = {
+    "epc_drop_streak": (5, 1.0, 1.0, 0.45),
+    "epc_rise_streak": (5, 1.0, 1.0, 1.8),
+    "sharp_drop": (1, 0.15, 1.0, 1.0),
+    "bot_surge": (2, 6.0, 1 / 6.0, 1.0),
+}
+
+
+def _block_names(count):
+    """count distinct category-style names ("Auto Insurance", ... "Auto Insurance 2", ...)"""
+    names = [f"{head} {tail}" for head in NAME_HEADS for tail in NAME_TAILS]
+    return [names[i % len(names)] + (f" {i // len(names) + 1}" if i >= len(names) else "") for i in range(count)]
+
+
+def generate_stats(n_partners=50, n_blocks=20000, days=120, end_date=None, seed=0, anomaly_blocks=25, include_excluded=True):
+    """
+    (rows, anomalies): n_blocks blocks spread over n_partners partners for
+    `days` eventDates ending at end_date, plus the anomalies planted in them
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or date.today() - timedelta(days=1)
+    dates = np.array([end_date - timedelta(days=days - 1 - d) for d in range(days)])
+
+    # Partners: a few large, many small (Zipf-like), plus one excluded partner
+    partners = [f"Partner {i + 1:02d}" for i in range(n_partners)]
+    if include_excluded:
+        partners.append(EXCLUDED_PARTNERS[0])
+    weights = 1.0 / np.arange(1, len(partners) + 1) ** 0.8
+    block_partner = rng.choice(len(partners), size=n_blocks, p=weights / weights.sum())
+
+    names = _block_names(max(1, n_blocks // 25))
+    block_name = rng.integers(0, len(names), n_blocks)
+    block_ids = 100000 + np.arange(n_blocks)
+
+    # Lifetimes: most blocks live the whole window; some launch late, some go dark
+    first_day = np.where(rng.random(n_blocks) < 0.15, rng.integers(0, days, n_blocks), 0)
+    last_day = np.where(rng.random(n_blocks) < 0.10, rng.integers(first_day, days), days - 1)
+    day_index = np.arange(days)
+    alive = (day_index >= first_day[:, None]) & (day_index <= last_day[:, None])
+    alive &= rng.random((n_blocks, days)) > 0.03
+
+    # Baselines and daily noise
+    weekday = np.array([d.weekday() for d in dates])
+    season = 1 + 0.15 * np.sin(2 * np.pi * weekday / 7)
+    impr_mult = np.ones((n_blocks, days))
+    ctr_mult = np.ones((n_blocks, days))
+    epc_mult = np.ones((n_blocks, days))
+
+    base_impr = rng.lognormal(6.0, 1.2, n_blocks)
+    base_ctr = rng.beta(2, 20, n_blocks)
+    base_epc = rng.lognormal(np.log(0.6), 0.6, n_blocks)
+
+    # Anomalies on long-lived blocks that pass the trackers' earnings / impressions floors
+    anomalies = []
+    candidates = np.flatnonzero((base_impr * base_ctr * base_epc > 20) & (last_day == days - 1) & (first_day <= days - 31))
+    picks = rng.permutation(candidates)
+
+    for i, (kind, (length, impr_x, ctr_x, epc_x)) in enumerate(ANOMALY_PLANS.items()):
+        length = min(length, days)
+        for b in picks[i * anomaly_blocks:(i + 1) * anomaly_blocks]:
+            impr_mult[b, -length:] *= impr_x
+            ctr_mult[b, -length:] *= ctr_x
+            epc_mult[b, -length:] *= epc_x
+            alive[b, -length:] = True
+            anomalies.append((kind, partners[block_partner[b]], int(block_ids[b]), dates[-length], dates[-1]))
+
+    # Partner-wide volume spike on the last day
+    if n_partners > 1:
+        surge_partner = int(rng.integers(1, n_partners))
+        impr_mult[block_partner == surge_partner, -1] *= 3.0
+        anomalies.append(("partner_surge", partners[surge_partner], None, dates[-1], dates[-1]))
+
+    impr = np.round(base_impr[:, None] * season * rng.lognormal(0, 0.25, (n_blocks, days)) * impr_mult)
+    ctr = np.clip(base_ctr[:, None] * rng.lognormal(0, 0.1, (n_blocks, days)) * ctr_mult, 0, 1)
+    clicks = rng.binomial(impr.astype(np.int64), ctr).astype(float)
+    earnings = np.round(clicks * base_epc[:, None] * rng.lognormal(0, 0.2, (n_blocks, days)) * epc_mult, 2)
+
+    b_idx, d_idx = np.nonzero(alive)
+    impr, clicks, earnings = impr[b_idx, d_idx], clicks[b_idx, d_idx], earnings[b_idx, d_idx]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rows = pd.DataFrame({
+            "eventDate": dates[d_idx],
+            "partner": pd.Categorical.from_codes(block_partner[b_idx], partners),
+            "keyword_block_id": block_ids[b_idx],
+            "block_name": pd.Categorical.from_codes(block_name[b_idx], names),
+            "est_earnings": earnings,
+            "uniq_impr": impr,
+            "paid_clicks": clicks,
+            "epc": np.where(clicks > 0, np.round(earnings / clicks, 4), np.nan),
+            "epi": np.where(impr > 0, np.round(earnings / impr, 4), np.nan),
+            "ctr": np.where(impr > 0, np.round(clicks / impr * 100, 2), np.nan),
+        })
+
+    return rows, pd.DataFrame(anomalies, columns=ANOMALY_COLUMNS)
+
+
+# --------------------------------------------------
+# SQLITE LOAD
+# --------------------------------------------------
+
+def load_sqlite(rows, path, anomalies=None, chunk_rows=200000):
+    """(Re)create team_block_stats (and synthetic_anomalies) in a SQLite file with the trackers' indexes"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS team_block_stats")
+        conn.execute("""
+            CREATE TABLE team_block_stats (
+                eventDate TEXT, partner TEXT, keyword_block_id INTEGER, block_name TEXT,
+                est_earnings REAL, uniq_impr REAL, paid_clicks REAL, epc REAL, epi REAL, ctr REAL
+            )
+        """)
+
+        insert = f"INSERT INTO team_block_stats VALUES ({', '.join('?' * len(STATS_COLUMNS))})"
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows.iloc[start:start + chunk_rows][STATS_COLUMNS].astype(object)
+            chunk["eventDate"] = chunk["eventDate"].map(lambda d: d.isoformat())
+            chunk = chunk.where(chunk.notna(), None)
+            conn.executemany(insert, chunk.itertuples(index=False, name=None))
+
+        conn.execute("CREATE INDEX idx_stats_date ON team_block_stats (eventDate)")
+        conn.execute("CREATE INDEX idx_stats_block_date ON team_block_stats (keyword_block_id, eventDate)")
+        conn.execute("CREATE INDEX idx_stats_partner_date ON team_block_stats (partner, eventDate)")
+
+        if anomalies is not None:
+            anomalies.assign(
+                start_date=anomalies["start_date"].map(str), end_date=anomalies["end_date"].map(str)
+            ).to_sql("synthetic_anomalies", conn, if_exists="replace", index=False)
+
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+# python -m queries.local_stats_db stats.sqlite --blocks 20000 --days 120
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic team_block_stats into a SQLite file")
+    parser.add_argument("path")
+    parser.add_argument("--partners", type=int, default=50)
+    parser.add_argument("--blocks", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows, anomalies = generate_stats(args.partners, args.blocks, args.days, args.end_date, args.seed)
+    load_sqlite(rows, args.path, anomalies)
+    print(f"✅ {len(rows):,} rows, {len(anomalies)} planted anomalies written to {args.path}")
+    print(anomalies.groupby("kind").size().to_string())
@@ -1,15 +1,23 @@
 import streamlit as st
 import pandas as pd
 from datetime import timedelta
+from functools import partial
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from queries.block_details import (
-    fetch_complete_mapping, get_latest_event_date, fetch_block_history, 
-    apply_display_days, render_sidebar, render_kpis, render_alert_table, 
+    fetch_filter_index, get_latest_event_date, fetch_block_history, prefetch_block_history, 
+    render_sidebar, render_kpis, render_alert_table, 
     render_alert_table_volume, render_deep_dive, render_deep_dive_traffic, 
-    open_partner_modal, apply_user_filters, open_category_modal, fetch_system_stats, render_performance_corridor, render_impact_scatter
+    open_partner_modal, open_category_modal, fetch_system_stats, render_performance_corridor, render_impact_scatter
 )
 from queries.epc_tracker import fetch_epc_tracker
 from queries.epi_tracker import fetch_epi_tracker
 from queries.spike_tracker import fetch_volume_spike_tracker, fetch_category_spike_tracker
+from queries.tracker_runner import run_trackers
+from queries.tracker_view import build_tracker_view, select_view
+from queries import result_store
+from queries.warm_worker import start_warm_worker, warm_status
+from queries.data_watermark import watermark_stats
+from queries import query_stats
 
 
 # --------------------------------------------------
@@ -153,8 +161,11 @@ st.markdown("""
 # DATA SETUP
 # --------------------------------------------------
 
-mapping_df = fetch_complete_mapping()
-partners, block_ids, block_names, run_btn, display_days, custom_range = render_sidebar(mapping_df, get_latest_event_date())
+# One watermark per rerun; cached fetchers key on it so they refresh when new data lands
+latest_date = get_latest_event_date()
+
+filter_index = fetch_filter_index(as_of=latest_date)
+partners, block_ids, block_names, run_btn, display_days, custom_range = render_sidebar(filter_index, latest_date)
 
 # --------------------------------------------------
 # DATA FETCH & VALIDATION
@@ -163,35 +174,148 @@ partners, block_ids, block_names, run_btn, display_days, custom_range = render_s
 if "tracker_ran" not in st.session_state:
     st.session_state["tracker_ran"] = False
 
+TRACKER_LABELS = {
+    "epc_df": "EPC tracker",
+    "epi_df": "EPI tracker",
+    "volume_df": "Partner volume spike tracker",
+    "category_df": "Category volume spike tracker",
+    "sys_stats": "System stats",
+}
+
+TRACKER_VIEW_KEYS = ("epc_df", "epi_df", "volume_df", "category_df")
+
+session_id = get_script_run_ctx().session_id
+
+
+def tracker_jobs_for(filters, end_date):
+    """Tracker fetchers for one (partners, block names, block ids) selection"""
+    partner_key, block_name_key, block_id_key = filters
+    return {
+        "epc_df": partial(fetch_epc_tracker, partners=partner_key, block_names=block_name_key, block_ids=block_id_key, end_date=end_date),
+        "epi_df": partial(fetch_epi_tracker, partners=partner_key, block_names=block_name_key, block_ids=block_id_key, end_date=end_date),
+        "volume_df": partial(fetch_volume_spike_tracker, list(partner_key), end_date=end_date),
+        "category_df": partial(fetch_category_spike_tracker, block_names=block_name_key, block_ids=block_id_key, end_date=end_date),
+        "sys_stats": partial(fetch_system_stats, end_date=end_date),
+    }
+
+
+def load_trackers(keys, filters, end_date):
+    """Run trackers in parallel and publish them to the shared result store; returns {key: store key}"""
+    store_keys = {key: result_store.result_key(key, end_date, filters) for key in keys}
+
+    # Results already in the store (another session, or the warm worker) are not recomputed
+    ready = {key for key, store_key in store_keys.items() if result_store.acquire(store_key, session_id) is not None}
+    for key in ready:
+        query_stats.record(key, wall_s=0.0, cache="hit")
+    jobs = {key: job for key, job in tracker_jobs_for(filters, end_date).items() if key in keys and key not in ready}
+    results, tracker_errors, _ = run_trackers(
+        jobs,
+        thread_init=partial(add_script_run_ctx, ctx=get_script_run_ctx()),
+    )
+
+    for key, err in tracker_errors.items():
+        st.warning(f"⚠️ {TRACKER_LABELS[key]} failed: {err}")
+
+    for key, value in results.items():
+        # Date-sorted, indexed views; every slice below is served from these
+        if key in TRACKER_VIEW_KEYS:
+            value = build_tracker_view(value)
+        result_store.put(store_keys[key], value, session_id)
+    return {key: store_keys[key] for key in ready | set(results)}
+
+
+def warm_unfiltered_trackers(end_date):
+    """Warm worker job: unfiltered trackers for a new watermark, straight into the shared store"""
+    filters = ((), (), ())
+    results, errors, _ = run_trackers(tracker_jobs_for(filters, end_date))
+
+    for key, value in results.items():
+        if key in TRACKER_VIEW_KEYS:
+            value = build_tracker_view(value)
+        result_store.put(result_store.result_key(key, end_date, filters), value)
+    return errors
+
+
+@st.cache_resource
+def warm_worker():
+    """One warm worker per process, bound to the first session's warm job"""
+    return start_warm_worker(warm_unfiltered_trackers)
+
+
+warm_worker()
+
+
 if run_btn:
     with st.spinner("Running trackers..."):
-        
-        st.session_state["epc_df"] = fetch_epc_tracker(
-            partners=tuple(sorted(partners or [])), 
-            block_names=tuple(sorted(block_names or [])), 
-            block_ids=tuple(sorted(block_ids or []))
-        )
-        st.session_state["epi_df"] = fetch_epi_tracker(
-            partners=tuple(sorted(partners or [])), 
-            block_names=tuple(sorted(block_names or [])), 
-            block_ids=tuple(sorted(block_ids or []))
-        )
-        
-        st.session_state["volume_df"] = fetch_volume_spike_tracker(partners or [])
 
-        st.session_state['category_df'] = fetch_category_spike_tracker(
-            block_names=tuple(sorted(block_names or [])), 
-            block_ids=tuple(sorted(block_ids or []))
+        tracker_filters = (
+            tuple(sorted(partners or [])),
+            tuple(sorted(block_names or [])),
+            tuple(sorted(block_ids or [])),
         )
 
-        st.session_state["sys_stats"] = fetch_system_stats()
-        
+        tracker_keys = load_trackers(TRACKER_LABELS, tracker_filters, latest_date)
+        result_store.release(session_id, keep=tracker_keys.values())
+
+        st.session_state["tracker_keys"] = tracker_keys
+        st.session_state["tracker_filters"] = tracker_filters
+        st.session_state["tracker_end_date"] = latest_date
+
+        # 45-day history for every flagged block in one batched query, so deep dives and modals open instantly
+        flagged_ids = set()
+        for key, quiet_label in (("epc_df", "Within Thresholds"), ("epi_df", "Within Thresholds"), ("category_df", "➡️ Stable")):
+            if key in tracker_keys:
+                df = result_store.acquire(tracker_keys[key], session_id)["df"]
+                flagged_ids.update(df.loc[df["Alerts"] != quiet_label, "Block ID"].dropna())
+        try:
+            prefetch_block_history(sorted(flagged_ids), latest_date)
+        except Exception as e:
+            st.warning(f"⚠️ History prefetch failed, deep dives will load on demand: {e}")
+
         st.session_state["tracker_ran"] = True
 
 
-required_keys = {"epc_df", "epi_df", "volume_df", 'category_df'} #"combined_df"
+def render_diagnostics():
+    """Per-query latency / rows / bytes and the process-wide caches behind them"""
+    with st.expander("🩺 Diagnostics", expanded=False):
+        summary = query_stats.summary()
+        if summary.empty:
+            st.caption("No queries recorded yet.")
+        else:
+            st.dataframe(summary, hide_index=True, width='stretch')
+            st.caption("Recent queries (newest first)")
+            st.dataframe(pd.DataFrame(query_stats.recent(50)), hide_index=True, width='stretch')
+
+        store = result_store.store_stats()
+        st.caption(
+            f"Result store: {store['entries']} entries, {store['bytes'] / 1e6:.1f} / {store['max_bytes'] / 1e6:.0f} MB, "
+            f"{store['hits']} hits / {store['misses']} misses, {store['evictions']} evictions, {store['sessions']} sessions"
+        )
+        warm = warm_status()
+        st.caption(f"Warm worker: {'alive' if warm['alive'] else 'stopped'}, last warmed {warm['warmed']}, {warm['runs']} runs, last error {warm['last_error']}")
+        st.caption(f"Watermark: {watermark_stats()}")
+
+
+with st.sidebar:
+    render_diagnostics()
+
 
-if not required_keys.issubset(st.session_state) or not st.session_state["tracker_ran"]:
+tracker_keys = st.session_state.get("tracker_keys", {})
+
+if not set(TRACKER_VIEW_KEYS).issubset(tracker_keys) or not st.session_state["tracker_ran"]:
+    st.info("Click **Run Tracker** to view alerts.")
+    st.stop()
+
+# Shared, read-only results (never write columns into them); anything evicted from the store is rebuilt from the cached fetchers
+tracker_results = {key: result_store.acquire(store_key, session_id) for key, store_key in tracker_keys.items()}
+evicted = [key for key, value in tracker_results.items() if value is None]
+if evicted:
+    with st.spinner("Reloading tracker results..."):
+        reloaded = load_trackers(evicted, st.session_state["tracker_filters"], st.session_state["tracker_end_date"])
+    tracker_keys.update(reloaded)
+    tracker_results.update({key: result_store.acquire(store_key, session_id) for key, store_key in reloaded.items()})
+
+if any(tracker_results.get(key) is None for key in TRACKER_VIEW_KEYS):
     st.info("Click **Run Tracker** to view alerts.")
     st.stop()
 
@@ -199,11 +323,24 @@ if not required_keys.issubset(st.session_state) or not st.session_state["tracker
 #     st.session_state["active_dialog"] = None
 
 # Extracting core data
-epc_df = st.session_state["epc_df"]
-epi_df = st.session_state["epi_df"]
+tracker_views = {key: tracker_results[key] for key in TRACKER_VIEW_KEYS}
+epc_df = tracker_views["epc_df"]["df"]
+epi_df = tracker_views["epi_df"]["df"]
 #combined_df = st.session_state["combined_df"]
-volume_df = st.session_state["volume_df"]
-category_df = st.session_state['category_df']
+volume_df = tracker_views["volume_df"]["df"]
+category_df = tracker_views["category_df"]["df"]
+sys_stats = tracker_results.get("sys_stats")
+
+# References for other pages (chatbot); the frames themselves live in the shared store
+for key in TRACKER_VIEW_KEYS:
+    st.session_state[key] = tracker_views[key]["df"]
+
+with st.sidebar:
+    session_mem = result_store.session_memory(session_id)
+    st.caption(
+        f"🧠 Session results: {session_mem['bytes'] / 1e6:.1f} MB "
+        f"({session_mem['shared_bytes'] / 1e6:.1f} MB shared with other sessions)"
+    )
 
 
 
@@ -266,10 +403,31 @@ def apply_alert_filter(df):
     return filtered
 
 
-def prepare_for_display(df):
-    df_display = apply_display_days(df, date_col="Date", days=display_days, date_range=custom_range)
-    df_filtered = apply_alert_filter(df_display)
-    return df_filtered
+# Per-session memo of the filtered frames this run renders, keyed by everything
+# they depend on, so a rerun with unchanged inputs reuses them. Only frames
+# used by the current run are kept: switching tab or filter drops the others
+# rather than holding extra copies of the shared tracker frames per session.
+window_key = (display_days, tuple(custom_range) if custom_range else None)
+filter_key = (tuple(partners or []), tuple(block_names or []), tuple(block_ids or []))
+
+previous_tab_frames = st.session_state.get("tab_frames", {})
+st.session_state["tab_frames"] = {}
+
+
+def memo_frame(key, build):
+    memo = st.session_state["tab_frames"]
+    if key not in memo:
+        memo[key] = previous_tab_frames[key] if key in previous_tab_frames else build()
+    return memo[key]
+
+
+def prepare_for_display(tracker_key):
+    return memo_frame(
+        ("display", tracker_keys[tracker_key], alert_view, window_key, filter_key),
+        lambda: apply_alert_filter(
+            select_view(tracker_views[tracker_key], partners, block_names, block_ids, days=display_days, date_range=custom_range)
+        ),
+    )
 
 
 # --------------------------------------------------
@@ -277,9 +435,12 @@ def prepare_for_display(df):
 # --------------------------------------------------
 
 
-kpi_df_display = apply_display_days(epc_df if view == "EPC" else epi_df, date_col="Date", days=display_days, date_range=custom_range)
-kpi_final = apply_user_filters(kpi_df_display, partners, block_names, block_ids)
-kpi_filtered = apply_alert_filter(kpi_final)
+kpi_key = "epc_df" if view == "EPC" else "epi_df"
+kpi_final = memo_frame(
+    ("kpi", tracker_keys[kpi_key], window_key, filter_key),
+    lambda: select_view(tracker_views[kpi_key], partners, block_names, block_ids, days=display_days, date_range=custom_range),
+)
+kpi_filtered = prepare_for_display(kpi_key)
 
 render_kpis(kpi_final, kpi_filtered, alert_view)
 
@@ -313,28 +474,35 @@ render_kpis(kpi_final, kpi_filtered, alert_view)
 
 
 
-# --------------------------------------------------
-# USER FILTERING
-# --------------------------------------------------
-
-epc_filtered = apply_user_filters(epc_df, partners, block_names, block_ids)
-epi_filtered = apply_user_filters(epi_df, partners, block_names, block_ids)
-#combined_df_filtered = apply_user_filters(combined_df, partners, block_names, block_ids)
-volume_filtered = apply_user_filters(volume_df, partners, None, None)
-cat_filtered = apply_user_filters(category_df, partners, block_names, block_ids)
-
 # --------------------------------------------------
 # MAIN TABS
 # --------------------------------------------------
 
-if "active_tab" not in st.session_state:
-    st.session_state["active_tab"] = None
-
+# st.tabs runs every tab's body on each rerun (the browser only hides the
+# others), so the tabs are a radio and only the selected one is computed
+MAIN_TABS = {
+    "epc": "**📋 EPC Alerts**",
+    "epi": "**📋 EPI Alerts**",
+    "partner": "**📈 Partner Volume Spike Tracker**",
+    "category": "**📈 Category Volume Spike Tracker**",
+}
+
+active_tab = st.radio(
+    "Main tabs",
+    list(MAIN_TABS),
+    format_func=MAIN_TABS.get,
+    horizontal=True,
+    label_visibility="collapsed",
+    key="main_tab",
+)
 
-tab1, tab2, tab3, tab4 = st.tabs(["**📋 EPC Alerts**", "**📋 EPI Alerts**", "**📈 Partner Volume Spike Tracker**", "**📈 Category Volume Spike Tracker**"])
+if st.session_state.get("active_tab") != active_tab:
+    st.session_state["active_tab"] = active_tab
+    st.session_state.pop("last_partner_selection", None)
+    st.session_state.pop("last_category_selection", None)
 
-with tab1:
-    filtered_epc = prepare_for_display(epc_filtered)
+if active_tab == "epc":
+    filtered_epc = prepare_for_display("epc_df")
     if filtered_epc.empty:
         st.info(f"No {alert_view} EPC alerts for selected window.")
     else:
@@ -354,10 +522,10 @@ with tab1:
             'Alerts': st.column_config.Column('Alerts', width=340, pinned=True),
             '7D Avg Impressions': None,
             'is_high_revenue_block': None
-        })
+        }, key="epc_table")
 
-with tab2:
-    filtered_epi = prepare_for_display(epi_filtered)
+elif active_tab == "epi":
+    filtered_epi = prepare_for_display("epi_df")
     if filtered_epi.empty:
         st.info(f"No {alert_view} EPI alerts for selected window.")
     else:
@@ -377,19 +545,21 @@ with tab2:
             'Alerts': st.column_config.Column('Alerts', width=340, pinned=True),
             '7D Avg Impressions': None,
             'is_high_revenue_block': None
-        })
-
-with tab3:
-    #volume_filtered = st.session_state.get("volume_df")
+        }, key="epi_table")
 
-    if st.session_state.get("active_tab") != "partner":
-        st.session_state["active_tab"] = "partner"
-        st.session_state.pop("last_partner_selection", None)
+elif active_tab == "partner":
+    volume_filtered = memo_frame(
+        ("volume", tracker_keys["volume_df"], filter_key),
+        lambda: select_view(tracker_views["volume_df"], partners),
+    )
     
     if volume_filtered is None or volume_filtered.empty:
         st.info("No volume spike data available.")
     else:
-        final_volume_df = apply_display_days(volume_filtered, "Date", display_days, custom_range)
+        final_volume_df = memo_frame(
+            ("volume_display", tracker_keys["volume_df"], window_key, filter_key),
+            lambda: select_view(tracker_views["volume_df"], partners, days=display_days, date_range=custom_range),
+        )
         
         event = render_alert_table_volume(final_volume_df, {
             'Impressions': st.column_config.NumberColumn('Impressions', format="%d"),
@@ -426,15 +596,19 @@ with tab3:
         
             st.write("Selected:", selected_row["Partner"], selected_row["Date"])
 
-with tab4:
-    if st.session_state.get("active_tab") != "category":
-        st.session_state["active_tab"] = "category"
-        st.session_state.pop("last_category_selection", None)
+elif active_tab == "category":
+    cat_filtered = memo_frame(
+        ("category", tracker_keys["category_df"], filter_key),
+        lambda: select_view(tracker_views["category_df"], partners, block_names, block_ids),
+    )
     
     if cat_filtered is None or cat_filtered.empty:
         st.info('No block spike data available.')
     else:
-        final_cat_df = apply_display_days(cat_filtered, 'Date', display_days, custom_range)
+        final_cat_df = memo_frame(
+            ("category_display", tracker_keys["category_df"], window_key, filter_key),
+            lambda: select_view(tracker_views["category_df"], partners, block_names, block_ids, days=display_days, date_range=custom_range),
+        )
         cat_df = render_alert_table_volume(final_cat_df, {
             "Block's 45D Share": st.column_config.ProgressColumn("Block's 45D Share", format="%.2f%%", min_value=0.0, max_value=10),
             "Block's Daily Share": st.column_config.ProgressColumn("Block's Daily Share", format="%.2f%%", min_value=0.0001, max_value=20),
@@ -465,7 +639,7 @@ with tab4:
         if cat_df and cat_df.selection and cat_df.selection.rows:
             selected_row = final_cat_df.iloc[cat_df.selection.rows[0]]
         
-            end_date = get_latest_event_date()
+            end_date = latest_date
             key = (selected_row["Block ID"], selected_row["Date"])
         
             if st.session_state.get("last_category_selection") != key:
@@ -479,13 +653,15 @@ with tab4:
 # --------------------------------------------------
 #st.divider()
 
-epc_flagged = epc_df[epc_df['Alerts'] != 'Within Thresholds'][['Block Name', 'Block ID', 'Partner']].drop_duplicates()
-epi_flagged = epi_df[epi_df['Alerts'] != 'Within Thresholds'][['Block Name', 'Block ID', 'Partner']].drop_duplicates()
+def flagged_blocks():
+    flagged = []
+    for key in ("epc_df", "epi_df"):
+        selected = select_view(tracker_views[key], partners, block_names, block_ids)
+        flagged.append(selected[selected['Alerts'] != 'Within Thresholds'][['Block Name', 'Block ID', 'Partner']].drop_duplicates())
+    return pd.concat(flagged).drop_duplicates().sort_values("Block Name")
 
-epc_alerts_filtered = apply_user_filters(epc_flagged, partners, block_names, block_ids)
-epi_alerts_filtered = apply_user_filters(epi_flagged, partners, block_names, block_ids)
 
-all_flagged_blocks = pd.concat([epc_alerts_filtered, epi_alerts_filtered]).drop_duplicates().sort_values("Block Name")
+all_flagged_blocks = memo_frame(("flagged", tracker_keys["epc_df"], tracker_keys["epi_df"], filter_key), flagged_blocks)
 
 if not all_flagged_blocks.empty:
     flagged_names = all_flagged_blocks["Block Name"].unique()
@@ -499,7 +675,7 @@ if not all_flagged_blocks.empty:
     if target_block_name:
         target_id = all_flagged_blocks[all_flagged_blocks["Block Name"] == target_block_name]['Block ID'].iloc[0]
         with st.spinner(f"Fetching 45-day history for {target_block_name}..."):
-            hist_df = fetch_block_history(target_id)
+            hist_df = fetch_block_history(target_id, latest_date)
             col1, col2 = st.columns(2)
             with col1:
                 render_deep_dive(hist_df, target_block_name)
@@ -510,15 +686,12 @@ if not all_flagged_blocks.empty:
 # --------------------------------------------------
 # SYSTEM WIDE VISUALS
 # --------------------------------------------------
-#if st.session_state.get("tracker_ran") and "sys_stats" in st.session_state:
-    #render_performance_corridor(st.session_state["sys_stats"], view)
-
-if st.session_state.get("tracker_ran") and "sys_stats" in st.session_state:
+if sys_stats is not None:
     
     vis_col_left, vis_col_right = st.columns([2, 1.2])
     
     with vis_col_left:
-        render_performance_corridor(st.session_state["sys_stats"], view)
+        render_performance_corridor(sys_stats, view)
         
     # with vis_col_right:
     #     scatter_metric = "EPC" if view == "EPC" else "EPI"
@@ -531,4 +704,4 @@ if st.session_state.get("tracker_ran") and "sys_stats" in st.session_state:
         # Select the base dataframe
         #base_df = st.session_state["epc_df"] if scatter_metric == 'EPC' else st.session_state["epi_df"]
     
-        render_impact_scatter(st.session_state["volume_df"])
+        render_impact_scatter(volume_df)
@@ -0,0 +1,104 @@
+import weakref
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+# --------------------------------------------------
+# PAGINATED ALERT TABLES
+# --------------------------------------------------
+# st.dataframe serializes every row and column it is given, including the
+# columns column_config hides. render_paged_table drops hidden columns,
+# sorts / searches on the server and sends one page. Sort orders and the
+# lowercase search text are built once per frame and reused while the same
+# frame object is shown (tab frames are memoized in main.py). The index only
+# holds a weak reference, so it never keeps a dropped frame alive.
+
+PAGE_SIZES = [100, 250, 500, 1000]
+SEARCH_COLUMNS = ("Alerts", "Partner", "Block Name", "Block ID")
+DEFAULT_SORT = "Default order"
+
+
+def visible_columns(df, column_config=None):
+    """Columns column_config does not hide (mapped to None)"""
+    column_config = column_config or {}
+    return [col for col in df.columns if not (col in column_config and column_config[col] is None)]
+
+
+def _table_index(df, key):
+    """Per-frame sort orders and search text, rebuilt only when the frame changes"""
+    indexes = st.session_state.setdefault("paged_table_index", {})
+    index = indexes.get(key)
+    if index is None or index["frame"]() is not df:
+        index = {"frame": weakref.ref(df), "orders": {}, "search_text": None}
+        indexes[key] = index
+    return index
+
+
+def _sort_order(index, df, column, descending):
+    """Row positions of df sorted by column (NaNs last), cached per frame"""
+    if (column, descending) not in index["orders"]:
+        ordered = df[column].reset_index(drop=True).sort_values(
+            ascending=not descending, na_position="last", kind="stable"
+        )
+        index["orders"][(column, descending)] = ordered.index.to_numpy()
+    return index["orders"][(column, descending)]
+
+
+def _search_text(index, df):
+    """Lowercase searchable text per row, cached per frame"""
+    if index["search_text"] is None:
+        columns = [col for col in SEARCH_COLUMNS if col in df.columns]
+        text = pd.Series("", index=df.index)
+        for col in columns:
+            text = text + " " + df[col].astype(str)
+        index["search_text"] = text.str.lower().reset_index(drop=True)
+    return index["search_text"]
+
+
+def render_paged_table(df, column_config=None, key="table", selectable=False, selection_mode="single-row"):
+    """
+    Paginated st.dataframe with server-side sort and search. Returns the
+    selected rows as positions in df (not in the page), so df.iloc works.
+    """
+    columns = visible_columns(df, column_config)
+    index = _table_index(df, key)
+
+    c_search, c_sort, c_dir, c_size, c_page = st.columns([3, 2, 1, 1, 1])
+    search = c_search.text_input("Search", key=f"{key}_search", placeholder="Alert, partner, block...")
+    sort_col = c_sort.selectbox("Sort by", [DEFAULT_SORT] + columns, key=f"{key}_sort")
+    descending = c_dir.toggle("Desc", value=True, key=f"{key}_desc")
+    page_size = c_size.selectbox("Rows", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    if sort_col == DEFAULT_SORT:
+        positions = np.arange(len(df))
+    else:
+        positions = _sort_order(index, df, sort_col, descending)
+
+    if search:
+        matches = _search_text(index, df).str.contains(search.lower(), regex=False).to_numpy()
+        positions = positions[matches[positions]]
+
+    pages = max(1, -(-len(positions) // page_size))
+    # Keyed on the page count so a narrower search never leaves the stored page above max_value
+    page = c_page.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page_{pages}")
+    page = int(page)
+
+    page_positions = positions[(page - 1) * page_size: page * page_size]
+    st.caption(f"{len(positions):,} rows · page {page} of {pages}")
+
+    # A new page / order / search is a new widget, so a stale selection never maps to the wrong row
+    table_key = f"{key}_{page}_{sort_col}_{descending}_{page_size}_{search}"
+    event = st.dataframe(
+        df.iloc[page_positions][columns],
+        column_config={col: cfg for col, cfg in (column_config or {}).items() if cfg is not None},
+        width='stretch',
+        hide_index=True,
+        on_select="rerun" if selectable else "ignore",
+        selection_mode=selection_mode if selectable else "multi-row",
+        key=table_key,
+    )
+
+    if selectable and event and event.selection:
+        return [int(page_positions[row]) for row in event.selection.rows]
+    return []
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+# PARTNER x BLOCK x DATE CUBE
+# --------------------------------------------------
+# Daily impressions / clicks / earnings per (partner, block_name) over the
+# 46-day spike window, built once per watermark. The partner modal (category
+# snapshot + live-category trend) and the Live Categories column of the
+# partner spike tracker are slices of it instead of their own queries.
+#
+# Only rows with uniq_impr > 0 are folded in (the modal queries' filter);
+# live_spike marks cells with at least one row that also passes the spike
+# tracker's live-category filter (uniq_impr > 10 and est_earnings > 0).
+
+CUBE_WINDOW_DAYS = 45
+
+CUBE_COLUMNS = ["partner", "block_name", "eventDate", "Impressions", "Clicks", "Earnings", "live_spike"]
+
+
+def partner_cube_query(start_date, end_date):
+    return f"""
+    SELECT
+        partner, block_name, eventDate,
+        SUM(uniq_impr) AS Impressions,
+        SUM(paid_clicks) AS Clicks,
+        SUM(est_earnings) AS Earnings,
+        MAX(CASE WHEN uniq_impr > 10 AND est_earnings > 0 THEN 1 ELSE 0 END) AS live_spike
+    FROM team_block_stats
+    WHERE eventDate BETWEEN '{start_date}' AND '{end_date}'
+      AND uniq_impr > 0
+    GROUP BY partner, block_name, eventDate
+    """
+
+
+def cube_from_rows(rows, start_date, end_date):
+    """partner_cube_query applied to raw team_block_stats rows (e.g. read from the local mirror)"""
+    dates = pd.to_datetime(rows["eventDate"]).dt.date
+    rows = rows.assign(eventDate=dates)[dates.between(start_date, end_date) & (rows["uniq_impr"] > 0)]
+    rows = rows.assign(live_spike=((rows["uniq_impr"] > 10) & (rows["est_earnings"] > 0)).astype(int))
+
+    return (
+        rows.groupby(["partner", "block_name", "eventDate"], as_index=False, dropna=False)
+        .agg(
+            Impressions=("uniq_impr", "sum"),
+            Clicks=("paid_clicks", "sum"),
+            Earnings=("est_earnings", "sum"),
+            live_spike=("live_spike", "max"),
+        )
+    )
+
+
+def build_partner_cube(cells, start_date, end_date):
+    """Sort cube cells by partner (newest date, highest earnings first) and index each partner's row range"""
+    df = cells[CUBE_COLUMNS].assign(eventDate=pd.to_datetime(cells["eventDate"]).dt.date)
+    df = df.sort_values(
+        ["partner", "eventDate", "Earnings"], ascending=[True, False, False], kind="stable"
+    ).reset_index(drop=True)
+
+    partners = df["partner"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, partners[1:] != partners[:-1]]) if len(df) else np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(df)].astype(int)
+
+    return {
+        "df": df,
+        "start_date": start_date,
+        "end_date": end_date,
+        "partners": {partners[s]: (s, e) for s, e in zip(starts, stops)},
+    }
+
+
+def covers(cube, start_date, end_date=None):
+    """True when the cube window holds start_date..end_date"""
+    end_date = end_date or start_date
+    return cube["start_date"] <= start_date and end_date <= cube["end_date"]
+
+
+def partner_slice(cube, partner):
+    """All cells of one partner (a row-range view, no copy)"""
+    start, stop = cube["partners"].get(partner, (0, 0))
+    return cube["df"].iloc[start:stop]
+
+
+def partner_snapshot(cube, partner, day):
+    """fetch_partner_category_snapshot: one partner's blocks on one date, highest earnings first"""
+    cells = partner_slice(cube, partner)
+    cells = cells[cells["eventDate"] == day]
+    return cells.rename(columns={"block_name": "Block Name"})[
+        ["eventDate", "Block Name", "Impressions", "Clicks", "Earnings"]
+    ].reset_index(drop=True)
+
+
+def partner_trend(cube, partner):
+    """fetch_partner_category_trend: live categories and earnings per date, newest first"""
+    cells = partner_slice(cube, partner)
+    trend = cells.groupby("eventDate", sort=False).agg(
+        **{"Live Categories": ("block_name", "count"), "Earnings": ("Earnings", "sum")}
+    )
+    return trend.rename_axis("Date").reset_index()
+
+
+def live_category_counts(cube):
+    """{(eventDate, partner): live categories} with the spike tracker's live filter"""
+    live = cube["df"][cube["df"]["live_spike"] == 1]
+    return live.groupby(["eventDate", "partner"])["block_name"].count()
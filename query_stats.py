@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+import pandas as pd
+
+
+# --------------------------------------------------
+# PER-QUERY INSTRUMENTATION
+# --------------------------------------------------
+# Every run_query call records wall time, DB time (execute + fetch, where the
+# runner can tell them apart), rows and bytes into a rolling in-process
+# buffer. Queries are labelled by the innermost named_query block on the
+# current thread (run_trackers names each tracker), or else by the calling
+# function.
+#
+# A named block that finishes without running any query is recorded as a
+# cache hit: it was served from Streamlit's cache, the shared result store
+# or the local mirror rather than the database.
+
+STATS_SIZE = int(os.environ.get("BLOCK_ALERT_QUERY_STATS_SIZE", 500))
+
+_records = deque(maxlen=STATS_SIZE)
+_lock = threading.Lock()
+_local = threading.local()
+
+_SKIP_FILES = ("query_stats.py", "db_pool.py", "sql_params.py", "contextlib.py")
+
+
+def _caller_name():
+    """Name of the first function up the stack that is not query plumbing"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if "run_query" not in code.co_name and os.path.basename(code.co_filename) not in _SKIP_FILES:
+            return code.co_name
+        frame = frame.f_back
+    return "unnamed"
+
+
+def current_name():
+    scope = getattr(_local, "scope", None)
+    return scope["name"] if scope is not None else _caller_name()
+
+
+def record(name, wall_s=None, db_s=None, rows=None, nbytes=None, cache="miss", error=None):
+    """Append one measurement to the rolling buffer"""
+    entry = {
+        "ts": round(time.time(), 3),
+        "name": name,
+        "wall_s": None if wall_s is None else round(wall_s, 4),
+        "db_s": None if db_s is None else round(db_s, 4),
+        "rows": rows,
+        "bytes": nbytes,
+        "cache": cache,
+        "error": error,
+    }
+    with _lock:
+        _records.append(entry)
+
+    scope = getattr(_local, "scope", None)
+    if scope is not None and cache == "miss":
+        scope["queries"] += 1
+    return entry
+
+
+@contextmanager
+def named_query(name):
+    """Label the queries run inside the block (this thread only)"""
+    outer = getattr(_local, "scope", None)
+    scope = {"name": name, "queries": 0}
+    _local.scope = scope
+    started = time.perf_counter()
+    try:
+        yield scope
+    finally:
+        _local.scope = outer
+        if outer is not None:
+            outer["queries"] += scope["queries"]
+        if scope["queries"] == 0:
+            record(name, wall_s=time.perf_counter() - started, cache="hit")
+
+
+def timed(run_query):
+    """Wrap a run_query callable that does not record itself (wall time, rows, bytes)"""
+    @functools.wraps(run_query)
+    def wrapper(query, *args, **kwargs):
+        name = current_name()
+        started = time.perf_counter()
+        try:
+            df = run_query(query, *args, **kwargs)
+        except Exception as e:
+            record(name, wall_s=time.perf_counter() - started, error=str(e)[:200])
+            raise
+
+        nbytes = int(df.memory_usage(index=False, deep=True).sum()) if isinstance(df, pd.DataFrame) else None
+        record(name, wall_s=time.perf_counter() - started, rows=len(df) if df is not None else None, nbytes=nbytes)
+        return df
+    return wrapper
+
+
+# --------------------------------------------------
+# READ / EXPORT
+# --------------------------------------------------
+
+def recent(limit=None):
+    """Newest-first list of recorded measurements"""
+    with _lock:
+        entries = list(_records)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def summary():
+    """Per-name calls, hit rate, wall / DB time, rows and bytes over the buffer"""
+    df = pd.DataFrame(recent())
+    if df.empty:
+        return df
+
+    df["hit"] = df["cache"] == "hit"
+    out = df.groupby("name").agg(
+        calls=("name", "size"),
+        hits=("hit", "sum"),
+        wall_mean_s=("wall_s", "mean"),
+        wall_max_s=("wall_s", "max"),
+        db_mean_s=("db_s", "mean"),
+        rows=("rows", "sum"),
+        bytes=("bytes", "sum"),
+        errors=("error", "count"),
+    )
+    return out.sort_values("wall_max_s", ascending=False).reset_index()
+
+
+def dump_jsonl(path, since=None):
+    """Append measurements (newer than the since timestamp) as JSON lines; returns how many"""
+    entries = [e for e in reversed(recent()) if since is None or e["ts"] > since]
+    with open(path, "a") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, default=str) + "\n")
+    return len(entries)
+
+
+def clear():
+    with _lock:
+        _records.clear()
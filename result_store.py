@@ -0,0 +1,136 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+# SHARED TRACKER RESULT STORE
+# --------------------------------------------------
+# st.cache_data hands every caller its own copy, so twenty sessions on the
+# morning alert meant twenty copies of each tracker frame. This store keeps
+# one object per (tracker, watermark, filter hash) for the whole process and
+# gives sessions references to it. Results are shared across sessions and
+# threads: treat them as read-only. Renderers that need extra columns build
+# a new frame (df.assign(...) or df.copy()) instead of writing df[col] = ...
+# into a stored one.
+#
+# Each entry counts the sessions using it. When the store is over budget the
+# least recently used entries with no live session are evicted; a session
+# that has not touched an entry for REF_TTL seconds no longer counts (closed
+# browser tabs never release explicitly).
+
+STORE_MAX_BYTES = int(os.environ.get("BLOCK_ALERT_RESULT_STORE_MB", 1024)) * 1024 * 1024
+REF_TTL = int(os.environ.get("BLOCK_ALERT_RESULT_REF_TTL", 4 * 3600))
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "puts": 0, "evictions": 0}
+
+
+def result_key(tracker, watermark, filters=None):
+    """(tracker, watermark, filter hash) for a tracker result"""
+    digest = hashlib.sha1(repr(filters).encode()).hexdigest()[:16]
+    return (tracker, str(watermark), digest)
+
+
+def _nbytes(value):
+    """Approximate memory of a frame, a tracker view dict or anything holding them"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return 0
+
+
+def _live_refs(entry, now):
+    refs = entry["refs"]
+    for session_id in [s for s, seen in refs.items() if now - seen > REF_TTL]:
+        del refs[session_id]
+    return refs
+
+
+def _evict(now):
+    total = sum(entry["bytes"] for entry in _entries.values())
+    for key in list(_entries):
+        if total <= STORE_MAX_BYTES:
+            break
+        entry = _entries[key]
+        if not _live_refs(entry, now):
+            total -= entry["bytes"]
+            del _entries[key]
+            _stats["evictions"] += 1
+
+
+def put(key, value, session_id=None):
+    """Publish a result (an existing entry for the same key wins) and return the shared object"""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            entry = {"value": value, "bytes": _nbytes(value), "refs": {}}
+            _entries[key] = entry
+            _stats["puts"] += 1
+        _entries.move_to_end(key)
+        if session_id is not None:
+            entry["refs"][session_id] = now
+        _evict(now)
+        return entry["value"]
+
+
+def acquire(key, session_id=None):
+    """Shared, read-only result for key (None when never stored or evicted)"""
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+
+        _stats["hits"] += 1
+        _entries.move_to_end(key)
+        if session_id is not None:
+            entry["refs"][session_id] = now
+        return entry["value"]
+
+
+def release(session_id, keep=()):
+    """Drop a session's references, except for the keys in keep"""
+    keep = set(keep)
+    with _lock:
+        for key, entry in _entries.items():
+            if key not in keep:
+                entry["refs"].pop(session_id, None)
+
+
+def session_memory(session_id):
+    """Bytes of the results a session references, and how much of that other sessions share"""
+    now = time.monotonic()
+    with _lock:
+        used = [entry for entry in _entries.values() if session_id in _live_refs(entry, now)]
+        return {
+            "entries": len(used),
+            "bytes": sum(entry["bytes"] for entry in used),
+            "shared_bytes": sum(entry["bytes"] for entry in used if len(entry["refs"]) > 1),
+        }
+
+
+def store_stats():
+    """Entries, bytes, live sessions and hit/miss/eviction counters for the whole process"""
+    now = time.monotonic()
+    with _lock:
+        sessions = set()
+        for entry in _entries.values():
+            sessions.update(_live_refs(entry, now))
+        return dict(
+            _stats,
+            entries=len(_entries),
+            bytes=sum(entry["bytes"] for entry in _entries.values()),
+            max_bytes=STORE_MAX_BYTES,
+            sessions=len(sessions),
+        )
@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+from queries.alert_engine import block_positions, trailing_window, safe_ratio, sql_round
+from queries.base_scan import EXCLUDED_PARTNERS
+
+
+# --------------------------------------------------
+# SPIKE TRACKERS ON RAW ROWS
+# --------------------------------------------------
+# Python twins of fetch_volume_spike_tracker / fetch_category_spike_tracker,
+# for when the rows come from the local mirror instead of MySQL. Output
+# columns, labels and ordering match the SQL (including the trailing raw
+# est_earnings column select_spikes uses).
+
+SPIKE_LABELS = [
+    # Tier 1: Healthy
+    ("strong_scale", "🚀 Strong Scale"),
+    ("healthy_growth", "✅ Healthy Growth"),
+    # Tier 2: Warnings
+    ("early_decline", "📉 Early Decline"),
+    ("traffic_down_rev_up", "🔍 Traffic DOWN - Revenue UP"),
+    ("suspicious_spike", "⚠️ Suspicious Spike"),
+    # Tier 3: Critical
+    ("bot_surge", "☠️ Bot Surge"),
+    ("sharp_drop", "📉 Sharp Drop"),
+]
+
+
+def _in_range(rows, start_date, end_date):
+    dates = pd.to_datetime(rows["eventDate"]).dt.date
+    return rows.assign(eventDate=dates)[dates.between(start_date, end_date)]
+
+
+def _rolling_7d(df, group_col, value_cols):
+    """AVG(...) OVER (PARTITION BY group ORDER BY eventDate ROWS 6 PRECEDING) for each column"""
+    df = df.sort_values([group_col, "eventDate"], kind="stable").reset_index(drop=True)
+    _, pos = block_positions(df[group_col].to_numpy())
+
+    for col in value_cols:
+        total, count = trailing_window(df[col].to_numpy(dtype=float), pos, 7)
+        df[f"avg_{col}_7d"] = safe_ratio(total, count)
+    return df
+
+
+def spike_alerts(ctr, avg_ctr_7d, impr_pct, revenue_pct):
+    """The shared spike Alerts CASE"""
+    with np.errstate(invalid="ignore"):
+        conditions = {
+            "strong_scale": (impr_pct > 0.5) & (revenue_pct >= 0.2) & (ctr >= avg_ctr_7d * 0.9),
+            "healthy_growth": (impr_pct > 0.25) & (revenue_pct >= 0.1) & (ctr >= avg_ctr_7d * 0.7),
+            "early_decline": (impr_pct < -0.2) & (revenue_pct < -0.2),
+            "traffic_down_rev_up": (impr_pct < -0.2) & (revenue_pct > 0),
+            "suspicious_spike": (impr_pct > 0.25) & (revenue_pct <= 0.1),
+            "bot_surge": (impr_pct > 1.0) & (ctr < avg_ctr_7d * 0.5),
+            "sharp_drop": (impr_pct < -0.4) & (revenue_pct < -0.4),
+        }
+
+    return np.select(
+        [conditions[key] for key, _ in SPIKE_LABELS],
+        [label for _, label in SPIKE_LABELS],
+        default="➡️ Stable",
+    )
+
+
+def _pct_vs_7d(values, avg_7d):
+    return safe_ratio(values, avg_7d) - 1
+
+
+def _sorted_output(out):
+    return out.sort_values(["Date", "Earnings"], ascending=[False, False], kind="stable").reset_index(drop=True)
+
+
+def select_spikes(universe, filters, share_col):
+    """
+    Rows of a full-universe spike frame matching {column: values}. The daily
+    share is re-based on the selection (the SQL takes it after the user
+    filters) from the unrounded est_earnings column, which is then dropped.
+    """
+    mask = np.ones(len(universe), dtype=bool)
+    for col, values in filters.items():
+        if values:
+            mask &= universe[col].isin(list(values)).to_numpy()
+
+    if mask.all():
+        return universe.drop(columns="est_earnings")
+
+    out = universe[mask]
+    earnings = out["est_earnings"].to_numpy(dtype=float)
+    day_total = out.groupby("Date")["est_earnings"].transform("sum").to_numpy(dtype=float)
+    share = np.nan_to_num(safe_ratio(earnings, day_total))
+
+    return out.assign(**{share_col: sql_round(share * 100, 2)}).drop(columns="est_earnings")
+
+
+# --------------------------------------------------
+# PARTNER (VOLUME) SPIKES
+# --------------------------------------------------
+
+def compute_volume_spikes(rows, start_date, end_date, partners=None):
+    """fetch_volume_spike_tracker computed from raw team_block_stats rows"""
+    rows = _in_range(rows, start_date, end_date)
+    rows = rows[~rows["partner"].isin(EXCLUDED_PARTNERS)]
+    if partners:
+        rows = rows[rows["partner"].isin(partners)]
+
+    kept = rows[(rows["est_earnings"] > 0) & (rows["uniq_impr"] > 50)]
+    base = (
+        kept.groupby(["eventDate", "partner"], as_index=False)[["paid_clicks", "uniq_impr", "est_earnings"]]
+        .sum()
+    )
+    if base.empty:
+        return pd.DataFrame(columns=[
+            "Date", "Partner", "Alerts", "Earnings", "Live Categories", "Impressions", "Clicks", "CTR",
+            "Clicks vs 7D", "Impr vs 7D", "Rev vs 7D", "Partner's Daily Share", "est_earnings",
+        ])
+
+    base = _rolling_7d(base, "partner", ["paid_clicks", "uniq_impr", "est_earnings"])
+
+    # Share of the day's revenue among the partners in scope (the SQL computes it after the partner filter)
+    day_total = base.groupby("eventDate")["est_earnings"].transform("sum")
+    share = safe_ratio(base["est_earnings"].to_numpy(dtype=float), day_total.to_numpy(dtype=float))
+
+    live = rows[(rows["uniq_impr"] > 10) & (rows["est_earnings"] > 0)]
+    live_categories = live.groupby(["eventDate", "partner"])["block_name"].nunique().rename("live_categories")
+    base = base.join(live_categories, on=["eventDate", "partner"])
+
+    clicks = base["paid_clicks"].to_numpy(dtype=float)
+    impr = base["uniq_impr"].to_numpy(dtype=float)
+    earnings = base["est_earnings"].to_numpy(dtype=float)
+
+    ctr = safe_ratio(clicks, impr)
+    avg_ctr_7d = safe_ratio(base["avg_paid_clicks_7d"].to_numpy(), base["avg_uniq_impr_7d"].to_numpy())
+    click_pct = _pct_vs_7d(clicks, base["avg_paid_clicks_7d"].to_numpy())
+    impr_pct = _pct_vs_7d(impr, base["avg_uniq_impr_7d"].to_numpy())
+    revenue_pct = _pct_vs_7d(earnings, base["avg_est_earnings_7d"].to_numpy())
+
+    out = pd.DataFrame({
+        "Date": base["eventDate"],
+        "Partner": base["partner"],
+        "Alerts": spike_alerts(ctr, avg_ctr_7d, impr_pct, revenue_pct),
+        "Earnings": sql_round(earnings, 2),
+        "Live Categories": base["live_categories"],
+        "Impressions": base["uniq_impr"],
+        "Clicks": base["paid_clicks"],
+        "CTR": sql_round(ctr * 100, 2),
+        "Clicks vs 7D": sql_round(click_pct * 100, 2),
+        "Impr vs 7D": sql_round(impr_pct * 100, 2),
+        "Rev vs 7D": sql_round(revenue_pct * 100, 2),
+        "Partner's Daily Share": sql_round(np.nan_to_num(share) * 100, 2),
+        "est_earnings": earnings,
+    })
+    return _sorted_output(out)
+
+
+# --------------------------------------------------
+# CATEGORY (BLOCK) SPIKES
+# --------------------------------------------------
+
+def compute_category_spikes(rows, start_date, end_date, block_names=None, block_ids=None):
+    """fetch_category_spike_tracker computed from raw team_block_stats rows"""
+    rows = _in_range(rows, start_date, end_date)
+    rows = rows[
+        (rows["est_earnings"] > 5) & (rows["uniq_impr"] > 50) & ~rows["partner"].isin(EXCLUDED_PARTNERS)
+    ]
+
+    # 45-day share is taken across every block, before the user filters
+    block_earnings = rows.groupby("keyword_block_id")["est_earnings"].sum()
+    share_45d = block_earnings / block_earnings.sum() if len(block_earnings) else block_earnings
+
+    if block_names:
+        rows = rows[rows["block_name"].isin(block_names)]
+    if block_ids:
+        rows = rows[rows["keyword_block_id"].isin(list(block_ids))]
+
+    columns = [
+        "Date", "Block ID", "Alerts", "Partner", "Block Name", "Earnings", "Impressions", "Clicks", "CTR",
+        "Clicks vs 7D", "Impr vs 7D", "Rev vs 7D", "Block's 45D Share", "Block's Daily Share", "est_earnings",
+    ]
+    if rows.empty:
+        return pd.DataFrame(columns=columns)
+
+    base = _rolling_7d(rows, "keyword_block_id", ["paid_clicks", "uniq_impr", "est_earnings"])
+
+    clicks = base["paid_clicks"].to_numpy(dtype=float)
+    impr = base["uniq_impr"].to_numpy(dtype=float)
+    earnings = base["est_earnings"].to_numpy(dtype=float)
+    ctr = pd.to_numeric(base["ctr"], errors="coerce").to_numpy(dtype=float)
+
+    day_total = base.groupby("eventDate")["est_earnings"].transform("sum").to_numpy(dtype=float)
+    avg_ctr_7d = safe_ratio(base["avg_paid_clicks_7d"].to_numpy(), base["avg_uniq_impr_7d"].to_numpy())
+    click_pct = _pct_vs_7d(clicks, base["avg_paid_clicks_7d"].to_numpy())
+    impr_pct = _pct_vs_7d(impr, base["avg_uniq_impr_7d"].to_numpy())
+    revenue_pct = _pct_vs_7d(earnings, base["avg_est_earnings_7d"].to_numpy())
+    block_share_45d = base["keyword_block_id"].map(share_45d).fillna(0).to_numpy(dtype=float)
+
+    out = pd.DataFrame({
+        "Date": base["eventDate"],
+        "Block ID": base["keyword_block_id"],
+        "Alerts": spike_alerts(ctr, avg_ctr_7d, impr_pct, revenue_pct),
+        "Partner": base["partner"],
+        "Block Name": base["block_name"],
+        "Earnings": sql_round(earnings, 2),
+        "Impressions": base["uniq_impr"],
+        "Clicks": base["paid_clicks"],
+        "CTR": sql_round(ctr, 2),
+        "Clicks vs 7D": sql_round(click_pct * 100, 2),
+        "Impr vs 7D": sql_round(impr_pct * 100, 2),
+        "Rev vs 7D": sql_round(revenue_pct * 100, 2),
+        "Block's 45D Share": sql_round(block_share_45d * 100, 2),
+        "Block's Daily Share": sql_round(safe_ratio(earnings, day_total) * 100, 2),
+        "est_earnings": earnings,
+    })
+    return _sorted_output(out)
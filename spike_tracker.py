@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
-from utils.db import run_query
-from queries.block_details import get_latest_event_date
+from queries.block_details import run_query, get_latest_event_date, fetch_partner_cube
+from queries.partner_cube import live_category_counts
+from queries import stats_mirror
+from queries.spike_engine import compute_volume_spikes, compute_category_spikes, select_spikes
+from queries.compact_frames import compact_frame
 from datetime import date, timedelta
 
 
+# est_earnings re-bases the daily share on a selection: keep it float64
+RAW_COLUMNS = ("est_earnings",)
+
 
 # --------------------------------------------------
 # Partner Spike Tracker
@@ -13,15 +19,15 @@ from datetime import date, timedelta
 
 
 @st.cache_data(ttl=3600)
-def fetch_volume_spike_tracker(partners=None):
-    end_date = get_latest_event_date()
+def fetch_volume_spike_universe(end_date=None):
+    """Partner spikes for every partner, cached once per watermark date"""
+    end_date = end_date or get_latest_event_date()
 
     start_date = end_date - timedelta(days=45)
-    
-    partner_filter_sql = ""
-    if partners:
-        partner_list = "', '".join(partners)
-        partner_filter_sql = f"AND partner IN ('{partner_list}')"
+
+    mirror_rows = stats_mirror.read_mirror(start_date, end_date)
+    if mirror_rows is not None:
+        return compact_frame(compute_volume_spikes(mirror_rows, start_date, end_date), keep=RAW_COLUMNS)
 
     query = f"""
     WITH base AS (
@@ -36,7 +42,6 @@ def fetch_volume_spike_tracker(partners=None):
           #AND est_earnings > 5 and uniq_impr > 50
           and est_earnings > 0 and uniq_impr > 50
           AND partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')
-          {partner_filter_sql}
         GROUP BY eventDate, partner
     ),
 
@@ -57,24 +62,9 @@ def fetch_volume_spike_tracker(partners=None):
         FROM base
     ),
 
-    category_counts AS (
-        SELECT
-            eventDate,
-            partner,
-            COUNT(DISTINCT block_name) AS live_categories
-        FROM team_block_stats
-        WHERE eventDate between '{start_date}' and '{end_date}'
-          AND uniq_impr > 10 and est_earnings > 0
-          AND partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')
-          {partner_filter_sql}
-        GROUP BY eventDate, partner
-    ),
-    
-    
     metrics AS (
         SELECT
             r.*,
-            c.live_categories,
             paid_clicks * 1.0 / NULLIF(uniq_impr, 0) AS ctr,
             avg_clicks_7d * 1.0 / NULLIF(avg_impr_7d, 0) AS avg_ctr_7d,
 
@@ -87,7 +77,6 @@ def fetch_volume_spike_tracker(partners=None):
 
         FROM rolling r
         LEFT JOIN partner_rev_share p ON r.partner = p.partner and r.eventDate = p.eventDate
-        LEFT JOIN category_counts c ON r.partner = c.partner and r.eventDate = c.eventDate
     )
     
     SELECT
@@ -113,7 +102,7 @@ def fetch_volume_spike_tracker(partners=None):
 
         END AS Alerts,
 
-        ROUND(est_earnings, 2) AS Earnings, live_categories as `Live Categories`,
+        ROUND(est_earnings, 2) AS Earnings,
         
         uniq_impr AS Impressions,
         
@@ -125,15 +114,31 @@ def fetch_volume_spike_tracker(partners=None):
         ROUND(impr_pct * 100, 2) AS `Impr vs 7D`,
         ROUND(revenue_pct * 100, 2) AS `Rev vs 7D`,
 
-        ROUND(daily_rev_share * 100, 2) AS `Partner's Daily Share`
+        ROUND(daily_rev_share * 100, 2) AS `Partner's Daily Share`,
+
+        -- unrounded, to re-base the daily share on a partner selection
+        est_earnings
     
     FROM metrics
     ORDER BY Date DESC, Earnings DESC;
     """
     
     df = run_query(query)
+
+    # Live Categories come from the shared partner cube rather than another scan
+    live = live_category_counts(fetch_partner_cube(end_date))
+    keys = pd.MultiIndex.from_arrays([pd.to_datetime(df["Date"]).dt.date, df["Partner"]])
+    df.insert(df.columns.get_loc("Earnings") + 1, "Live Categories", live.reindex(keys).to_numpy())
     
-    return df
+    return compact_frame(df, keep=RAW_COLUMNS)
+
+
+def fetch_volume_spike_tracker(partners=None, end_date=None):
+    """Partner spikes for the selected partners, sliced in memory from the cached universe"""
+    end_date = end_date or get_latest_event_date()
+
+    universe = fetch_volume_spike_universe(end_date)
+    return select_spikes(universe, {"Partner": partners}, "Partner's Daily Share")
 
 
 
@@ -147,27 +152,21 @@ def fetch_volume_spike_tracker(partners=None):
 
 
 @st.cache_data(ttl=3600)
-def fetch_category_spike_tracker(block_names=None, block_ids=None):
-    end_date = get_latest_event_date()
+def fetch_category_spike_universe(end_date=None):
+    """Category spikes for every block, cached once per watermark date"""
+    end_date = end_date or get_latest_event_date()
 
     start_date = end_date - timedelta(days=45)
 
+    mirror_rows = stats_mirror.read_mirror(start_date, end_date)
+    if mirror_rows is not None:
+        return compact_frame(compute_category_spikes(mirror_rows, start_date, end_date), keep=RAW_COLUMNS)
+
     conditions = [
         f"eventDate between '{start_date}' and '{end_date}'",
         "est_earnings > 5 and uniq_impr > 50",
         "partner NOT IN ('DIN', 'TWS', 'XYZ', 'XXX')",
     ]
-    
-    #block_name_filter_sql = ""
-    if block_names:
-        block_names_list = "', '".join(block_names)
-        conditions.append(f"block_name IN ('{block_names_list}')")
-
-    #block_id_filter_sql = ""
-    if block_ids:
-        block_ids_list = ", ".join(map(str, block_ids))
-        conditions.append(f"keyword_block_id in ({block_ids_list})")
-
 
     where_clause = " and ".join(conditions)
 
@@ -256,7 +255,10 @@ def fetch_category_spike_tracker(block_names=None, block_ids=None):
         ROUND(revenue_pct * 100, 2) AS `Rev vs 7D`,
 
         ROUND(revenue_share_45d * 100, 2) AS `Block's 45D Share`,
-        round(daily_rev_share * 100, 2) as `Block's Daily Share`
+        round(daily_rev_share * 100, 2) as `Block's Daily Share`,
+
+        -- unrounded, to re-base the daily share on a block selection
+        est_earnings
     
     FROM metrics
     ORDER BY Date DESC, Earnings DESC;
@@ -264,4 +266,12 @@ def fetch_category_spike_tracker(block_names=None, block_ids=None):
     
     df = run_query(query)
     
-    return df
+    return compact_frame(df, keep=RAW_COLUMNS)
+
+
+def fetch_category_spike_tracker(block_names=None, block_ids=None, end_date=None):
+    """Category spikes for the selected blocks, sliced in memory from the cached universe"""
+    end_date = end_date or get_latest_event_date()
+
+    universe = fetch_category_spike_universe(end_date)
+    return select_spikes(universe, {"Block Name": block_names, "Block ID": block_ids}, "Block's Daily Share")
@@ -0,0 +1,80 @@
+import re
+import inspect
+from datetime import date, datetime
+
+
+# --------------------------------------------------
+# BOUND-PARAMETER QUERY BUILDING
+# --------------------------------------------------
+# Queries whose filter values change per call (block ids, partners, block
+# names) are built with named :binds instead of inlined literals. IN lists
+# are padded to a fixed set of sizes by repeating the last value, so every
+# call with, say, 5..8 ids sends the same statement text and the server can
+# reuse the parsed / prepared statement.
+#
+# Builders return (sql, params). run_bound executes them with any of the
+# repo's run_query callables: bound when it takes params (db_pool.run_query),
+# with the literals rendered in otherwise.
+
+IN_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def bucket_size(n):
+    """Smallest IN-list size >= n (multiples of the largest bucket beyond it)"""
+    for size in IN_BUCKETS:
+        if n <= size:
+            return size
+    top = IN_BUCKETS[-1]
+    return -(-n // top) * top
+
+
+def in_list(name, values):
+    """(":name_0, :name_1, ...", params) padded to bucket_size; values must not be empty"""
+    values = list(values)
+    if not values:
+        raise ValueError(f"Empty IN list for {name}")
+
+    padded = values + [values[-1]] * (bucket_size(len(values)) - len(values))
+    params = {f"{name}_{i}": v for i, v in enumerate(padded)}
+    return ", ".join(f":{key}" for key in params), params
+
+
+# --------------------------------------------------
+# EXECUTION
+# --------------------------------------------------
+
+def _literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (date, datetime)):
+        return f"'{value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()}'"
+    if hasattr(value, "item"):  # numpy scalars
+        return _literal(value.item())
+    text = str(value).replace("\\", "\\\\").replace("'", "''")
+    return f"'{text}'"
+
+
+def render_literals(sql, params):
+    """Inline params into sql (for run_query callables without bind support)"""
+    if not params:
+        return sql
+    names = "|".join(sorted(map(re.escape, params), key=len, reverse=True))
+    return re.sub(rf"(?<![:\w]):({names})\b", lambda m: _literal(params[m.group(1)]), sql)
+
+
+def _accepts_params(run_query):
+    try:
+        return "params" in inspect.signature(run_query).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def run_bound(run_query, sql, params=None):
+    """Run a (sql, params) query with bound parameters when run_query supports them"""
+    if params and _accepts_params(run_query):
+        return run_query(sql, params=params)
+    return run_query(render_literals(sql, params))
@@ -0,0 +1,138 @@
+import re
+
+
+# --------------------------------------------------
+# MYSQL SHIMS FOR SQLITE ENGINES
+# --------------------------------------------------
+# The tracker SQL is MySQL. When db_pool points at a SQLite file (the local
+# stand-in built by local_stats_db), it installs these shims: CONCAT with
+# MySQL's NULL rule, "#" comments stripped, and "<expr> +/- INTERVAL n DAY"
+# rewritten to date(<expr>, '+/-n day'). Quoted strings and identifiers are
+# never touched; any INTERVAL left untranslated raises instead of reaching
+# SQLite.
+
+_QUOTES = "'\"`"
+_MARK = "\x00"
+_INTERVAL = re.compile(r"([-+])\s*INTERVAL\s+(\d+)\s+DAY\b", re.IGNORECASE)
+_ANY_INTERVAL = re.compile(r"\bINTERVAL\b", re.IGNORECASE)
+_IDENT = re.compile(r"[\w.?:]+$")
+
+
+def _sql_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def mysql_concat(*args):
+    """MySQL CONCAT: NULL if any argument is NULL"""
+    if any(a is None for a in args):
+        return None
+    return "".join(_sql_text(a) for a in args)
+
+
+def _mask(statement):
+    """
+    (code, pieces): statement with quoted strings / identifiers and -- or /* */
+    comments replaced by \\x00<n>\\x00 markers, and "#" comments dropped
+    """
+    code, pieces = [], []
+    i, n = 0, len(statement)
+
+    while i < n:
+        ch = statement[i]
+
+        if ch in _QUOTES:
+            j = i + 1
+            while j < n:
+                if statement[j] == "\\" and ch != "`":
+                    j += 2
+                    continue
+                if statement[j] == ch:
+                    if j + 1 < n and statement[j + 1] == ch:  # doubled quote
+                        j += 2
+                        continue
+                    break
+                j += 1
+            end = min(j + 1, n)
+        elif statement.startswith("--", i) or statement.startswith("/*", i):
+            close = "\n" if ch == "-" else "*/"
+            j = statement.find(close, i + 2)
+            end = n if j < 0 else j + len(close)
+        elif ch == "#":
+            j = statement.find("\n", i)
+            i = n if j < 0 else j
+            continue
+        else:
+            code.append(ch)
+            i += 1
+            continue
+
+        code.append(f"{_MARK}{len(pieces)}{_MARK}")
+        pieces.append(statement[i:end])
+        i = end
+
+    return "".join(code), pieces
+
+
+def _unmask(code, pieces):
+    return re.sub(f"{_MARK}(\\d+){_MARK}", lambda m: pieces[int(m.group(1))], code)
+
+
+def _operand_start(code, end):
+    """Start of the operand that ends at code[end - 1]: a (call / subquery), a quoted literal or a name"""
+    if end > 0 and code[end - 1] == ")":
+        depth, i = 0, end - 1
+        while i >= 0:
+            depth += {")": 1, "(": -1}.get(code[i], 0)
+            if depth == 0:
+                break
+            i -= 1
+        if i < 0:
+            return None
+        name = _IDENT.search(code, 0, i)
+        return name.start() if name else i
+
+    if end > 0 and code[end - 1] == _MARK:
+        start = code.rfind(_MARK, 0, end - 1)
+        qualifier = _IDENT.search(code, 0, start) if start > 0 and code[start - 1] == "." else None
+        return qualifier.start() if qualifier else start
+
+    name = _IDENT.search(code, 0, end)
+    return name.start() if name else None
+
+
+def _rewrite_intervals(code):
+    while True:
+        match = _INTERVAL.search(code)
+        if match is None:
+            break
+
+        end = len(code[:match.start()].rstrip())
+        start = _operand_start(code, end)
+        if start is None:
+            break
+
+        sign, days = match.group(1), match.group(2)
+        code = f"{code[:start]}date({code[start:end]}, '{sign}{days} day'){code[match.end():]}"
+    return code
+
+
+def mysql_to_sqlite(statement):
+    """Rewrite the MySQL-only syntax the tracker SQL uses; raises ValueError on an INTERVAL it cannot translate"""
+    code, pieces = _mask(statement)
+    code = _rewrite_intervals(code)
+
+    if _ANY_INTERVAL.search(code):
+        raise ValueError(f"Untranslated MySQL INTERVAL for SQLite: {_unmask(code, pieces).strip()[:200]}")
+    return _unmask(code, pieces)
+
+
+def register_sqlite_compat(engine, listen):
+    """Install the shims on a SQLite engine (listen is sqlalchemy.event.listen)"""
+    listen(engine, "connect", lambda dbapi_conn, record: dbapi_conn.create_function("CONCAT", -1, mysql_concat))
+    listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, params, context, executemany: (mysql_to_sqlite(statement), params),
+        retval=True,
+    )
@@ -0,0 +1,191 @@
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+import pandas as pd
+from queries.base_scan import iter_event_days
+
+
+# --------------------------------------------------
+# LOCAL MIRROR OF team_block_stats
+# --------------------------------------------------
+# Every tracker reads the same trailing 45-90 days from the shared analyst DB.
+# The email job keeps a local Parquet copy of that slice, one file per
+# eventDate (<dir>/eventDate=YYYY-MM-DD/data.parquet), and only pulls dates
+# at or after the newest one it already has (the watermark). Trackers read
+# from the mirror when it covers their date range and fall back to MySQL
+# otherwise.
+#
+# The newest partition may hold a day that was still loading. It only counts
+# once the sync marks it complete (<dir>/_complete_through): when a later
+# eventDate exists, or when the email job has already alerted on it. Every
+# older partition was re-pulled after a later day landed, so it is settled.
+
+MIRROR_DIR = os.environ.get("BLOCK_ALERT_MIRROR_DIR")
+RETENTION_DAYS = int(os.environ.get("BLOCK_ALERT_MIRROR_RETENTION_DAYS", 120))
+
+MIRROR_COLUMNS = [
+    "eventDate", "partner", "keyword_block_id", "block_name",
+    "est_earnings", "uniq_impr", "paid_clicks", "epc", "epi", "ctr",
+]
+
+PARTITION_PREFIX = "eventDate="
+COMPLETE_MARKER = "_complete_through"
+
+
+def _partition_path(mirror_dir, day):
+    return os.path.join(mirror_dir, f"{PARTITION_PREFIX}{day.isoformat()}", "data.parquet")
+
+
+def mirrored_dates(mirror_dir=None):
+    """Sorted eventDates present in the mirror"""
+    mirror_dir = mirror_dir or MIRROR_DIR
+    if not mirror_dir or not os.path.isdir(mirror_dir):
+        return []
+
+    dates = []
+    for name in os.listdir(mirror_dir):
+        if name.startswith(PARTITION_PREFIX) and os.path.exists(os.path.join(mirror_dir, name, "data.parquet")):
+            dates.append(date.fromisoformat(name[len(PARTITION_PREFIX):]))
+    return sorted(dates)
+
+
+def watermark(mirror_dir=None):
+    """Newest eventDate in the mirror (None when empty or not configured)"""
+    dates = mirrored_dates(mirror_dir)
+    return dates[-1] if dates else None
+
+
+def complete_through(mirror_dir=None):
+    """Newest eventDate whose partition is known to be complete (None when empty)"""
+    mirror_dir = mirror_dir or MIRROR_DIR
+    dates = mirrored_dates(mirror_dir)
+    if not dates:
+        return None
+
+    settled = dates[-1] - timedelta(days=1)
+    marker = os.path.join(mirror_dir, COMPLETE_MARKER)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            settled = max(settled, date.fromisoformat(f.read().strip()))
+    return min(settled, dates[-1])
+
+
+def covers(start_date, end_date, mirror_dir=None):
+    """True when the mirror holds a complete partition for every date in start_date..end_date"""
+    mirror_dir = mirror_dir or MIRROR_DIR
+    settled = complete_through(mirror_dir)
+    if settled is None or end_date > settled:
+        return False
+
+    present = set(mirrored_dates(mirror_dir))
+    return all(start_date + timedelta(days=i) in present for i in range((end_date - start_date).days + 1))
+
+
+# --------------------------------------------------
+# SYNC (email job)
+# --------------------------------------------------
+
+def _write_partition(mirror_dir, day, rows):
+    """Replace one eventDate's file atomically so readers never see a partial partition"""
+    path = _partition_path(mirror_dir, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".parquet")
+    os.close(fd)
+    try:
+        rows.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def _mark_complete(mirror_dir, day):
+    fd, tmp_path = tempfile.mkstemp(dir=mirror_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(day.isoformat())
+    os.replace(tmp_path, os.path.join(mirror_dir, COMPLETE_MARKER))
+
+
+def sync_mirror(run_query, mirror_dir=None, run_query_chunks=None, complete_day=None):
+    """
+    Pull every eventDate at or after the watermark (the watermark day is
+    re-pulled in case it was still loading last time) and drop partitions
+    older than RETENTION_DAYS. Returns a small summary dict.
+
+    Days before the newest eventDate are marked complete; pass complete_day
+    (the date the email job alerts on) to mark the newest one too.
+
+    With run_query_chunks the pull is streamed in eventDate order and each
+    partition is written as soon as its day is complete.
+    """
+    mirror_dir = mirror_dir or MIRROR_DIR
+    if not mirror_dir:
+        raise RuntimeError("Mirror directory not configured. Set BLOCK_ALERT_MIRROR_DIR.")
+
+    latest = run_query("SELECT MAX(eventDate) AS latest_date FROM team_block_stats")
+    latest_date = pd.to_datetime(latest.iloc[0]["latest_date"]).date() if not latest.empty else None
+    if latest_date is None:
+        return {"watermark": watermark(mirror_dir), "dates_written": 0, "rows": 0}
+
+    oldest_kept = latest_date - timedelta(days=RETENTION_DAYS - 1)
+    current = watermark(mirror_dir)
+    pull_from = max(current, oldest_kept) if current else oldest_kept
+
+    columns = ", ".join(MIRROR_COLUMNS)
+    query = f"""
+        SELECT {columns}
+        FROM team_block_stats
+        WHERE eventDate BETWEEN '{pull_from}' AND '{latest_date}'
+    """
+
+    if run_query_chunks is not None:
+        day_groups = iter_event_days(run_query_chunks(f"{query} ORDER BY eventDate"))
+    else:
+        rows = run_query(query)
+        day_groups = rows.groupby(pd.to_datetime(rows["eventDate"]).dt.date, sort=True) if not rows.empty else []
+
+    written = row_count = 0
+    for day, day_rows in day_groups:
+        _write_partition(mirror_dir, day, day_rows.reset_index(drop=True))
+        written += 1
+        row_count += len(day_rows)
+
+    for day in mirrored_dates(mirror_dir):
+        if day < oldest_kept:
+            shutil.rmtree(os.path.dirname(_partition_path(mirror_dir, day)), ignore_errors=True)
+
+    settled = latest_date - timedelta(days=1)
+    if complete_day is not None:
+        settled = max(settled, min(complete_day, latest_date))
+    if mirrored_dates(mirror_dir):
+        _mark_complete(mirror_dir, settled)
+
+    return {
+        "watermark": watermark(mirror_dir), "complete_through": complete_through(mirror_dir),
+        "dates_written": written, "rows": row_count,
+    }
+
+
+# --------------------------------------------------
+# READ (trackers)
+# --------------------------------------------------
+
+def read_mirror(start_date, end_date, columns=None, mirror_dir=None):
+    """Raw team_block_stats rows for start_date..end_date, or None if the mirror does not cover the range"""
+    mirror_dir = mirror_dir or MIRROR_DIR
+    if not covers(start_date, end_date, mirror_dir):
+        return None
+
+    if columns is not None and "eventDate" not in columns:
+        columns = ["eventDate"] + list(columns)
+
+    frames = [
+        pd.read_parquet(_partition_path(mirror_dir, day), columns=columns)
+        for day in mirrored_dates(mirror_dir)
+        if start_date <= day <= end_date
+    ]
+    rows = pd.concat(frames, ignore_index=True)
+    rows["eventDate"] = pd.to_datetime(rows["eventDate"]).dt.date
+    return rows
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+# --------------------------------------------------
+# RUN-LENGTH STREAK DETECTION
+# --------------------------------------------------
+# The trackers find streaks with ROW_NUMBER() differences, then a COUNT(*)
+# OVER the island and a ROW_NUMBER() DESC for the end row - several sorts per
+# streak type. Here rows are sorted once (block, date) and every flag array is
+# run-length encoded in a single linear pass.
+#
+# Plain numpy on purpose: the dashboard engine and the email job both import it.
+
+
+def block_starts(block_ids):
+    """True on the first row of each block (rows sorted by block, then date)"""
+    block_ids = np.asarray(block_ids)
+    starts = np.ones(len(block_ids), dtype=bool)
+    if len(block_ids) > 1:
+        starts[1:] = block_ids[1:] != block_ids[:-1]
+    return starts
+
+
+def run_length_encode(flag, starts):
+    """
+    Split a flag array into runs that never cross a block boundary.
+
+    Returns (run_start, run_length, run_value): one entry per run.
+    """
+    flag = np.asarray(flag, dtype=bool)
+    n = len(flag)
+    if n == 0:
+        empty = np.array([], dtype=int)
+        return empty, empty, np.array([], dtype=bool)
+
+    boundary = np.asarray(starts, dtype=bool).copy()
+    boundary[0] = True
+    boundary[1:] |= flag[1:] != flag[:-1]
+
+    run_start = np.flatnonzero(boundary)
+    run_length = np.diff(np.r_[run_start, n])
+    return run_start, run_length, flag[run_start]
+
+
+def streak_lengths(flag, starts):
+    """
+    Per-row streak length (0 when the flag is off) and end marker (1 on the
+    last row of a streak), matching the SQL's COUNT(*) OVER island / rn_desc = 1.
+    """
+    n = len(flag)
+    run_start, run_length, run_value = run_length_encode(flag, starts)
+
+    lengths = np.repeat(np.where(run_value, run_length, 0), run_length)
+
+    ends = np.zeros(n, dtype=int)
+    ends[(run_start + run_length - 1)[run_value]] = 1
+
+    return lengths, ends
+
+
+def block_streaks(flags, starts):
+    """
+    Lengths and end markers for several flag arrays over the same sorted rows.
+
+    flags: {name: bool array}; returns {f"{name}_len": ..., f"{name}_end": ...}
+    """
+    out = {}
+    for name, flag in flags.items():
+        out[f"{name}_len"], out[f"{name}_end"] = streak_lengths(flag, starts)
+    return out
+
+
+def current_streaks(flag, starts):
+    """Length of the streak still open on each block's last row (0 if the flag is off there)"""
+    lengths, _ = streak_lengths(flag, starts)
+    last_rows = np.r_[np.flatnonzero(starts)[1:] - 1, len(lengths) - 1] if len(lengths) else np.array([], dtype=int)
+    return lengths[last_rows]
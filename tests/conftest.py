@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import types
+import importlib.util
+from datetime import date
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+
+
+# The modules import each other as queries.<name>. In the dashboard this
+# checkout sits at <app>/queries; anywhere else, expose the checkout as the
+# queries package so the tests can import it.
+if importlib.util.find_spec("queries") is None:
+    package = types.ModuleType("queries")
+    package.__path__ = [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))]
+    sys.modules["queries"] = package
+
+
+# block_details and data_watermark run their queries through the dashboard's
+# utils.db. The tests never touch the analyst database: utils.db is replaced
+# by db_pool on the synthetic SQLite file from the stats_db fixture, with
+# DATE columns returned as dates like the MySQL driver does.
+DATE_COLUMNS = ("Date", "eventDate")
+
+
+def _run_query(query):
+    from queries import db_pool
+
+    df = db_pool.run_query(query)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col]).dt.date
+    return df
+
+
+utils = types.ModuleType("utils")
+utils.__path__ = []
+utils.db = types.ModuleType("utils.db")
+utils.db.run_query = _run_query
+sys.modules["utils"] = utils
+sys.modules["utils.db"] = utils.db
+
+
+STATS_END_DATE = date(2025, 6, 30)
+
+
+@pytest.fixture(scope="session")
+def stats_db(tmp_path_factory):
+    """Synthetic team_block_stats in SQLite, with db_pool (and so utils.db) pointed at it"""
+    from queries import db_pool, local_stats_db
+
+    rows, anomalies = local_stats_db.generate_stats(
+        n_partners=6, n_blocks=300, days=100, end_date=STATS_END_DATE, seed=7
+    )
+    path = str(tmp_path_factory.mktemp("stats") / "stats.sqlite")
+    local_stats_db.load_sqlite(rows, path, anomalies)
+    db_pool.configure(f"sqlite:///{path}")
+
+    yield SimpleNamespace(path=path, end_date=STATS_END_DATE, rows=rows)
+    db_pool.dispose_engine()
+
+
+@pytest.fixture
+def scratch_db(stats_db, tmp_path):
+    """Writable copy of the synthetic database (restored to the shared one afterwards)"""
+    from queries import db_pool
+
+    path = str(tmp_path / "scratch.sqlite")
+    shutil.copy(stats_db.path, path)
+    db_pool.configure(f"sqlite:///{path}")
+    yield path
+    db_pool.configure(f"sqlite:///{stats_db.path}")
@@ -0,0 +1,31 @@
+from datetime import timedelta
+import pandas as pd
+import pytest
+
+from queries import alert_engine, db_pool, epc_tracker, epi_tracker
+from queries.base_scan import block_base_query
+
+# Outputs are rounded to 2 (money, %) or 4 (EPC/EPI) decimals; float vs
+# DECIMAL arithmetic can land either side of a rounding step
+TOLERANCE = 0.0101
+
+
+@pytest.mark.parametrize("metric, fetch_universe", [
+    ("epc", epc_tracker.fetch_epc_universe),
+    ("epi", epi_tracker.fetch_epi_universe),
+])
+def test_engine_matches_sql_tracker(stats_db, metric, fetch_universe):
+    end_date = stats_db.end_date
+    fetch_universe.clear()
+
+    sql_df = fetch_universe(end_date, engine="sql")
+
+    calc_start_date, start_date = end_date - timedelta(days=89), end_date - timedelta(days=44)
+    base_df = db_pool.run_query(block_base_query(calc_start_date, end_date))
+    engine_df = alert_engine.compute_block_alerts(base_df, metric, start_date, end_date)
+
+    assert len(sql_df) > 1000
+    assert (sql_df["Alerts"] != "Within Thresholds").any()
+
+    mismatches = alert_engine.compare_with_sql(sql_df, engine_df, tolerance=TOLERANCE)
+    assert mismatches.empty, mismatches.head().to_dict("records")
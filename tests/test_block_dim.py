@@ -0,0 +1,65 @@
+import sqlite3
+from datetime import date
+import pandas as pd
+
+from queries import block_dim, db_pool
+
+
+def _dim(rows):
+    return pd.DataFrame(rows, columns=block_dim.DIM_COLUMNS)
+
+
+def _sorted(dim):
+    return dim.sort_values(block_dim.DIM_KEYS).reset_index(drop=True)
+
+
+def test_merge_dim_widens_seen_range_and_adds_keys():
+    dim = _dim([
+        ("Partner 01", 1, "Auto Loans", date(2025, 1, 1), date(2025, 6, 1)),
+        ("Partner 01", 2, "Insurance", date(2025, 2, 1), date(2025, 6, 29)),
+    ])
+    new_rows = _dim([
+        ("Partner 01", 2, "Insurance", date(2025, 6, 29), date(2025, 6, 30)),
+        ("Partner 02", 2, "Insurance", date(2025, 6, 30), date(2025, 6, 30)),
+    ])
+
+    merged = _sorted(block_dim.merge_dim(dim, new_rows))
+    expected = _dim([
+        ("Partner 01", 1, "Auto Loans", date(2025, 1, 1), date(2025, 6, 1)),
+        ("Partner 01", 2, "Insurance", date(2025, 2, 1), date(2025, 6, 30)),
+        ("Partner 02", 2, "Insurance", date(2025, 6, 30), date(2025, 6, 30)),
+    ])
+    pd.testing.assert_frame_equal(merged, expected)
+
+    assert block_dim.merge_dim(dim, new_rows.iloc[0:0]) is dim
+    pd.testing.assert_frame_equal(block_dim.merge_dim(None, new_rows), new_rows)
+
+
+def test_sync_repulls_the_watermark_day(scratch_db, stats_db, tmp_path):
+    path = str(tmp_path / "block_dim.parquet")
+    end_date = stats_db.end_date.isoformat()
+
+    # The newest day is half loaded at the first sync
+    conn = sqlite3.connect(scratch_db)
+    conn.execute("CREATE TABLE held AS SELECT * FROM team_block_stats WHERE eventDate = ? AND keyword_block_id % 2 = 0", (end_date,))
+    conn.execute("DELETE FROM team_block_stats WHERE eventDate = ? AND keyword_block_id % 2 = 0", (end_date,))
+    conn.commit()
+
+    first = block_dim.sync_block_dim(db_pool.run_query, path)
+    assert first["watermark"] == stats_db.end_date
+
+    # The rest of the day lands, with a block that was never seen before
+    conn.execute("INSERT INTO team_block_stats SELECT * FROM held")
+    conn.execute("UPDATE held SET keyword_block_id = 990001, block_name = 'New Block'")
+    conn.execute("INSERT INTO team_block_stats SELECT * FROM held LIMIT 1")
+    conn.commit()
+    conn.close()
+
+    second = block_dim.sync_block_dim(db_pool.run_query, path)
+    assert second["keys"] > first["keys"]
+    assert second["rows_pulled"] < second["keys"]
+
+    dim = block_dim.read_block_dim(path)
+    full = block_dim.pull_dim_rows(db_pool.run_query)
+    pd.testing.assert_frame_equal(_sorted(dim), _sorted(full[block_dim.DIM_COLUMNS]), check_dtype=False)
+    assert (dim["keyword_block_id"] == 990001).sum() == 1
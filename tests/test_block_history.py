@@ -0,0 +1,45 @@
+import threading
+import time
+from datetime import timedelta
+
+from queries import block_details
+
+
+def test_concurrent_prefetch_pulls_each_block_once(stats_db, monkeypatch):
+    end_date = stats_db.end_date
+    block_details.block_history_store.clear()
+
+    pulled = []
+    run_query = block_details.run_query
+
+    def slow_run_query(query):
+        pulled.append(query)
+        time.sleep(0.05)
+        return run_query(query)
+
+    monkeypatch.setattr(block_details, "run_query", slow_run_query)
+
+    block_ids = sorted(stats_db.rows["keyword_block_id"].unique()[:30])
+    threads = [
+        threading.Thread(target=block_details.prefetch_block_history, args=(block_ids, end_date))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(pulled) == 1
+    assert set(block_details.block_history_store(end_date).blocks) == {int(b) for b in block_ids}
+
+
+def test_fetch_block_history_returns_a_copy(stats_db):
+    end_date = stats_db.end_date
+    block_details.block_history_store.clear()
+    block_id = int(stats_db.rows["keyword_block_id"].iloc[0])
+
+    hist = block_details.fetch_block_history(block_id, end_date)
+    assert len(hist) and hist["Date"].min() >= end_date - timedelta(days=45)
+
+    hist["EPC"] = 0.0
+    assert (block_details.fetch_block_history(block_id, end_date)["EPC"] != 0).any()
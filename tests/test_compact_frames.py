@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from queries.compact_frames import compact_frame
+
+
+def _tracker(n=5000):
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        "Partner": [f"Partner {i % 6:02d}" for i in range(n)],
+        "Block ID": np.arange(n, dtype=np.int64) + 10_000,
+        "Impressions": rng.integers(0, 1_000_000, n).astype(float),
+        "Clicks": rng.integers(0, 5_000, n).astype(float),
+        "Earnings": np.round(rng.random(n) * 100_000, 2),
+        "EPC": np.round(rng.random(n), 4),
+        "Partner Share": np.round(rng.random(n) * 100, 2),
+    })
+
+
+def test_money_and_rates_stay_float64():
+    df = _tracker()
+    compact = compact_frame(df)
+
+    for col in ("Earnings", "EPC", "Partner Share"):
+        assert compact[col].dtype == np.float64
+        assert compact[col].sum() == df[col].sum()
+
+
+def test_counts_ids_and_text_are_compacted():
+    compact = compact_frame(_tracker())
+    assert compact["Impressions"].dtype == np.int32
+    assert compact["Clicks"].dtype == np.int32
+    assert compact["Block ID"].dtype == np.int32
+    assert isinstance(compact["Partner"].dtype, pd.CategoricalDtype)
+
+
+def test_counts_with_nulls_or_fractions_are_left_alone():
+    df = _tracker(10)
+    df.loc[3, "Impressions"] = np.nan
+    df.loc[4, "Clicks"] = 2.5
+
+    compact = compact_frame(df, keep=("Partner",))
+    assert compact["Impressions"].dtype == np.float64
+    assert compact["Clicks"].dtype == np.float64
+    assert compact["Partner"].dtype == df["Partner"].dtype
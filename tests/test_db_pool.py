@@ -0,0 +1,46 @@
+import pandas as pd
+
+from queries import db_pool, query_stats
+from queries.base_scan import iter_event_days
+
+HISTORY = """
+    SELECT eventDate, keyword_block_id, est_earnings, uniq_impr
+    FROM team_block_stats
+    WHERE eventDate >= :since
+    ORDER BY eventDate, keyword_block_id
+"""
+
+
+def test_chunks_add_up_to_run_query(stats_db):
+    params = {"since": "2025-06-01"}
+    whole = db_pool.run_query(HISTORY, params=params)
+
+    query_stats.clear()
+    with query_stats.named_query("history_chunks"):
+        chunks = list(db_pool.run_query_chunks(HISTORY, chunk_size=1000, params=params))
+
+    assert len(whole) > 5000
+    assert [len(c) for c in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    assert 0 < len(chunks[-1]) <= 1000
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
+
+    record = query_stats.recent()[0]
+    assert (record["name"], record["rows"]) == ("history_chunks", len(whole))
+
+
+def test_event_days_regroup_across_chunk_edges(stats_db):
+    chunks = db_pool.run_query_chunks(HISTORY, chunk_size=777, params={"since": "2025-06-20"})
+    days = list(iter_event_days(chunks))
+
+    rows = stats_db.rows[stats_db.rows["eventDate"] >= pd.Timestamp("2025-06-20").date()]
+    expected = rows.groupby("eventDate").size()
+    assert [day for day, _ in days] == list(expected.index)
+    assert [len(day_rows) for _, day_rows in days] == expected.tolist()
+
+
+def test_statement_without_rows_yields_nothing(scratch_db):
+    chunks = db_pool.run_query_chunks("DELETE FROM team_block_stats WHERE eventDate < '2025-04-01'")
+    assert list(chunks) == []
+
+    remaining = db_pool.run_query("SELECT MIN(eventDate) AS first_day FROM team_block_stats")
+    assert str(remaining.iloc[0]["first_day"]) >= "2025-04-01"
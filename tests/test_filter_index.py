@@ -0,0 +1,49 @@
+import itertools
+import pandas as pd
+import pytest
+
+from queries.filter_index import build_filter_index, blocks_for, ids_for
+
+
+@pytest.fixture(scope="module")
+def mapping_df(stats_db):
+    mapping = stats_db.rows[["partner", "keyword_block_id", "block_name"]].drop_duplicates()
+    # Duplicates, missing values and a block name shared across partners, as the live mapping has
+    extra = pd.DataFrame({
+        "partner": ["Partner 01", "Partner 02", None, "Partner 03"],
+        "keyword_block_id": [990001, 990001, 990002, None],
+        "block_name": ["Shared Block", "Shared Block", "Orphan", "No ID"],
+    })
+    return pd.concat([mapping, mapping.head(20), extra], ignore_index=True)
+
+
+def _expected(mapping_df, partners, blocks):
+    """The sidebar cascade as render_sidebar computed it before the index"""
+    filtered = mapping_df.dropna()
+    if partners:
+        filtered = filtered[filtered["partner"].isin(partners)]
+    block_options = sorted(filtered["block_name"].unique())
+    if blocks:
+        filtered = filtered[filtered["block_name"].isin(blocks)]
+    return block_options, sorted(filtered["keyword_block_id"].unique())
+
+
+def test_top_level_options(mapping_df):
+    index = build_filter_index(mapping_df)
+    clean = mapping_df.dropna()
+    assert index["partners"] == sorted(clean["partner"].unique())
+    assert blocks_for(index) == sorted(clean["block_name"].unique())
+    assert ids_for(index) == sorted(clean["keyword_block_id"].unique())
+
+
+def test_cascade_matches_pandas_filter(mapping_df):
+    index = build_filter_index(mapping_df)
+    partners = sorted(mapping_df["partner"].dropna().unique())
+    names = ["Shared Block", "Orphan", "No ID", "Not A Block"] + sorted(mapping_df["block_name"].unique())[:3]
+
+    selections = [[]] + [[p] for p in partners[:3]] + [partners[:2], [partners[-1], "Unknown Partner"]]
+    for selected_partners in selections:
+        for selected_blocks in [[]] + [list(c) for c in itertools.combinations(names, 2)]:
+            block_options, id_options = _expected(mapping_df, selected_partners, selected_blocks)
+            assert blocks_for(index, selected_partners) == block_options
+            assert ids_for(index, selected_partners, selected_blocks) == id_options, (selected_partners, selected_blocks)
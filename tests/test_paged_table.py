@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from queries import paged_table
+
+CONFIG = {"alert_bucket": None, "is_high_revenue_block": None, "Earnings": None}
+
+
+def _alerts(n=730):
+    rng = np.random.default_rng(5)
+    earnings = rng.integers(0, 200, n).astype(float)
+    earnings[::37] = np.nan
+    return pd.DataFrame({
+        "Date": pd.date_range("2025-06-30", periods=n, freq="-1h").date,
+        "Partner": [f"Partner {i % 6:02d}" for i in range(n)],
+        "Block ID": np.arange(n) + 1000,
+        "Alerts": rng.choice(["🚨 Drop", "➡️ Stable", "✅ Healthy Growth"], n),
+        "Earnings": earnings,
+        "EPC": rng.random(n),
+        "alert_bucket": "red",
+        "is_high_revenue_block": False,
+    }, index=np.arange(n) * 3)
+
+
+def _table_app():
+    from queries.paged_table import render_paged_table
+    from tests_frame import frame
+
+    render_paged_table(frame, {"alert_bucket": None, "is_high_revenue_block": None}, key="t")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    import sys
+    import types
+
+    # The script runs in this process; hand it the frame through a throwaway module
+    module = types.ModuleType("tests_frame")
+    module.frame = _alerts()
+    monkeypatch.setitem(sys.modules, "tests_frame", module)
+
+    at = AppTest.from_function(_table_app, default_timeout=60)
+    at.run()
+    assert not at.exception
+    return at, module.frame
+
+
+def test_visible_columns_drop_hidden_ones():
+    assert paged_table.visible_columns(_alerts(), CONFIG) == ["Date", "Partner", "Block ID", "Alerts", "EPC"]
+    assert paged_table.visible_columns(_alerts()) == list(_alerts().columns)
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_sort_order_matches_pandas(descending):
+    df = _alerts()
+    order = paged_table._sort_order({"orders": {}}, df, "Earnings", descending)
+    expected = df.reset_index(drop=True).sort_values(
+        "Earnings", ascending=not descending, na_position="last", kind="stable"
+    ).index.to_numpy()
+    np.testing.assert_array_equal(order, expected)
+
+
+def test_first_page_hides_columns(app):
+    at, df = app
+    shown = at.dataframe[0].value
+    assert list(shown.columns) == ["Date", "Partner", "Block ID", "Alerts", "Earnings", "EPC"]
+    assert len(shown) == 250
+    assert shown["Block ID"].tolist() == df["Block ID"].iloc[:250].tolist()
+    assert at.caption[0].value == f"{len(df):,} rows · page 1 of 3"
+
+
+def test_sorted_search_pages_match_pandas(app):
+    at, df = app
+    at.selectbox(key="t_sort").set_value("Earnings")
+    at.toggle(key="t_desc").set_value(False)
+    at.selectbox(key="t_size").set_value(100)
+    at.text_input(key="t_search").set_value("partner 03").run()
+
+    expected = df[df["Partner"] == "Partner 03"].sort_values("Earnings", na_position="last", kind="stable")
+    assert at.caption[0].value == f"{len(expected):,} rows · page 1 of 2"
+    assert at.dataframe[0].value["Block ID"].tolist() == expected["Block ID"].iloc[:100].tolist()
+
+    at.number_input(key="t_page_2").set_value(2).run()
+    assert at.dataframe[0].value["Block ID"].tolist() == expected["Block ID"].iloc[100:200].tolist()
+
+    # A narrower search resets to its own page range instead of failing validation
+    at.text_input(key="t_search").set_value("drop").run()
+    assert not at.exception
+    assert at.dataframe[0].value["Alerts"].eq("🚨 Drop").all()
@@ -0,0 +1,92 @@
+from datetime import timedelta
+import pandas as pd
+import pytest
+
+from queries import partner_cube
+from queries.block_details import run_query
+from queries.sql_params import run_bound
+
+KEYS = ["partner", "block_name", "eventDate"]
+
+
+@pytest.fixture(scope="module")
+def window(stats_db):
+    end_date = stats_db.end_date
+    return end_date - timedelta(days=partner_cube.CUBE_WINDOW_DAYS), end_date
+
+
+@pytest.fixture(scope="module")
+def cube(window):
+    cells = run_query(partner_cube.partner_cube_query(*window))
+    return partner_cube.build_partner_cube(cells, *window)
+
+
+def _raw(stats_db):
+    return stats_db.rows.astype({"partner": str, "block_name": str})
+
+
+def test_cube_from_rows_matches_cube_query(stats_db, window):
+    from_sql = run_query(partner_cube.partner_cube_query(*window))
+    from_rows = partner_cube.cube_from_rows(_raw(stats_db), *window)
+
+    assert len(from_sql) > 1000
+    pd.testing.assert_frame_equal(
+        from_rows[partner_cube.CUBE_COLUMNS].sort_values(KEYS).reset_index(drop=True),
+        from_sql[partner_cube.CUBE_COLUMNS].sort_values(KEYS).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_partner_trend_matches_trend_query(stats_db, cube):
+    query = """
+    SELECT eventDate AS Date, COUNT(DISTINCT block_name) AS `Live Categories`, SUM(est_earnings) AS Earnings
+    FROM team_block_stats
+    WHERE partner = :partner AND eventDate >= :end_date - INTERVAL 45 DAY AND uniq_impr > 0
+    GROUP BY eventDate
+    ORDER BY eventDate DESC
+    """
+    for partner in sorted(cube["partners"]):
+        expected = run_bound(run_query, query, {"partner": partner, "end_date": stats_db.end_date})
+        pd.testing.assert_frame_equal(partner_cube.partner_trend(cube, partner), expected, check_dtype=False)
+
+    assert partner_cube.partner_trend(cube, "Unknown Partner").empty
+
+
+def test_partner_snapshot_sums_each_category(stats_db, cube):
+    day = stats_db.end_date - timedelta(days=3)
+    raw = _raw(stats_db)
+
+    for partner in sorted(cube["partners"]):
+        rows = raw[(raw["partner"] == partner) & (raw["eventDate"] == day) & (raw["uniq_impr"] > 0)]
+        expected = (
+            rows.groupby("block_name", as_index=False)
+            .agg(Impressions=("uniq_impr", "sum"), Clicks=("paid_clicks", "sum"), Earnings=("est_earnings", "sum"))
+            .sort_values("Earnings", ascending=False)
+        )
+        snapshot = partner_cube.partner_snapshot(cube, partner, day)
+        assert (snapshot["eventDate"] == day).all()
+        pd.testing.assert_frame_equal(
+            snapshot.drop(columns="eventDate"),
+            expected.rename(columns={"block_name": "Block Name"}).reset_index(drop=True),
+            check_dtype=False,
+        )
+
+
+def test_live_category_counts_use_the_spike_filter(stats_db, cube, window):
+    raw = _raw(stats_db)
+    live = raw[
+        raw["eventDate"].between(*window) & (raw["uniq_impr"] > 10) & (raw["est_earnings"] > 0)
+    ]
+    expected = live.groupby(["eventDate", "partner"])["block_name"].nunique()
+
+    counts = partner_cube.live_category_counts(cube)
+    assert len(counts) > 100
+    pd.testing.assert_series_equal(counts, expected, check_dtype=False, check_names=False)
+
+
+def test_covers(cube, window):
+    start_date, end_date = window
+    assert partner_cube.covers(cube, start_date, end_date)
+    assert partner_cube.covers(cube, end_date)
+    assert not partner_cube.covers(cube, start_date - timedelta(days=1), end_date)
+    assert not partner_cube.covers(cube, end_date + timedelta(days=1))
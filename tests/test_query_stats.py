@@ -0,0 +1,101 @@
+import json
+import threading
+from collections import deque
+import pandas as pd
+import pytest
+
+from queries import query_stats
+
+
+@pytest.fixture(autouse=True)
+def records(monkeypatch):
+    """A fresh buffer of five measurements per test"""
+    buffer = deque(maxlen=5)
+    monkeypatch.setattr(query_stats, "_records", buffer)
+    return buffer
+
+
+def _frame(n):
+    return pd.DataFrame({"Earnings": [1.5] * n})
+
+
+def fetch_partner_rows(run_query, n):
+    return run_query(n)
+
+
+def test_timed_records_rows_bytes_and_caller():
+    run_query = query_stats.timed(_frame)
+    fetch_partner_rows(run_query, 4)
+
+    entry = query_stats.recent()[0]
+    assert (entry["name"], entry["rows"], entry["cache"]) == ("fetch_partner_rows", 4, "miss")
+    assert entry["bytes"] == 32
+
+
+def test_timed_records_errors():
+    def failing(query):
+        raise RuntimeError("lost connection " + "x" * 300)
+
+    with pytest.raises(RuntimeError):
+        with query_stats.named_query("epc"):
+            query_stats.timed(failing)("SELECT 1")
+
+    entry = query_stats.recent()[0]
+    assert entry["name"] == "epc" and entry["error"].startswith("lost connection")
+    assert len(entry["error"]) == 200
+
+
+def test_named_blocks_count_queries_and_record_hits():
+    run_query = query_stats.timed(_frame)
+    with query_stats.named_query("trackers") as outer:
+        with query_stats.named_query("epc") as epc:
+            run_query(2)
+            run_query(3)
+        with query_stats.named_query("epi"):
+            pass
+
+    assert (epc["queries"], outer["queries"]) == (2, 2)
+    assert [(e["name"], e["cache"]) for e in query_stats.recent()] == [
+        ("epi", "hit"), ("epc", "miss"), ("epc", "miss"),
+    ]
+
+
+def test_names_are_per_thread():
+    run_query = query_stats.timed(_frame)
+
+    def worker():
+        with query_stats.named_query("warm"):
+            run_query(1)
+
+    with query_stats.named_query("session"):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        run_query(1)
+
+    assert sorted(e["name"] for e in query_stats.recent()) == ["session", "warm"]
+
+
+def test_buffer_rolls_over_and_summary_aggregates(records):
+    for i in range(7):
+        query_stats.record("epc" if i % 2 else "epi", wall_s=i, rows=10, cache="hit" if i == 6 else "miss")
+
+    assert len(records) == 5
+    summary = query_stats.summary().set_index("name")
+    assert summary.loc["epi", "calls"] == 3 and summary.loc["epi", "hits"] == 1
+    assert summary.loc["epc", "wall_max_s"] == 5
+    assert summary.loc["epc", "rows"] == 20
+    assert summary.index[0] == "epi"
+
+
+def test_dump_jsonl_appends_entries_after_since(tmp_path):
+    first = query_stats.record("epc", wall_s=0.1)
+    first["ts"] = 100.0
+    query_stats.record("epi", wall_s=0.2)["ts"] = 200.0
+
+    path = tmp_path / "stats.jsonl"
+    assert query_stats.dump_jsonl(path, since=150.0) == 1
+    assert query_stats.dump_jsonl(path) == 2
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [entry["name"] for entry in lines] == ["epi", "epc", "epi"]
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from queries import result_store
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """An empty store sized for three test frames, on a clock the test controls"""
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(result_store, "_entries", result_store.OrderedDict())
+    monkeypatch.setattr(result_store, "_stats", {"hits": 0, "misses": 0, "puts": 0, "evictions": 0})
+    monkeypatch.setattr(result_store, "STORE_MAX_BYTES", 3 * result_store._nbytes(_frame()))
+    monkeypatch.setattr(result_store, "REF_TTL", 60)
+    monkeypatch.setattr(result_store.time, "monotonic", lambda: clock["now"])
+    return clock
+
+
+def _frame():
+    return pd.DataFrame({"Earnings": np.arange(1000, dtype=float)})
+
+
+def _keys():
+    return set(result_store._entries)
+
+
+def test_put_keeps_the_first_object_and_acquire_counts(store):
+    first = _frame()
+    assert result_store.put("a", first) is first
+    assert result_store.put("a", _frame()) is first
+    assert result_store.acquire("a") is first
+    assert result_store.acquire("missing") is None
+
+    stats = result_store.store_stats()
+    assert (stats["puts"], stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1, 1)
+
+
+def test_evicts_least_recently_used_unreferenced_entries(store):
+    for key in ("a", "b", "c"):
+        result_store.put(key, _frame())
+    result_store.acquire("a")
+
+    result_store.put("d", _frame())
+    assert _keys() == {"a", "c", "d"}
+    assert result_store.store_stats()["evictions"] == 1
+
+
+def test_entries_with_live_sessions_are_kept_over_budget(store):
+    result_store.put("a", _frame(), session_id="s1")
+    result_store.put("b", _frame(), session_id="s2")
+    result_store.put("c", _frame())
+    result_store.put("d", _frame(), session_id="s1")
+    result_store.put("e", _frame(), session_id="s2")
+
+    # Only the unreferenced entry can go; the store stays over budget
+    assert _keys() == {"a", "b", "d", "e"}
+
+    result_store.release("s1", keep=["d"])
+    result_store.put("f", _frame())
+    assert _keys() == {"b", "d", "e"}
+
+
+def test_session_refs_expire_after_ref_ttl(store):
+    result_store.put("a", _frame(), session_id="s1")
+    result_store.put("b", _frame(), session_id="s1")
+    result_store.put("c", _frame(), session_id="s2")
+
+    store["now"] += 30
+    result_store.acquire("b", session_id="s1")
+    store["now"] += 40
+
+    # s1 last touched "a" 70s ago (> REF_TTL), "b" 40s ago
+    result_store.put("d", _frame(), session_id="s2")
+    assert _keys() == {"b", "c", "d"}
+    assert result_store.session_memory("s1")["entries"] == 1
+
+
+def test_session_memory_reports_shared_bytes(store):
+    size = result_store._nbytes(_frame())
+    result_store.put("a", _frame(), session_id="s1")
+    result_store.acquire("a", session_id="s2")
+    result_store.put("b", _frame(), session_id="s1")
+
+    assert result_store.session_memory("s1") == {"entries": 2, "bytes": 2 * size, "shared_bytes": size}
+    assert result_store.store_stats()["sessions"] == 2
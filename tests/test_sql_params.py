@@ -0,0 +1,71 @@
+from datetime import date, datetime
+import numpy as np
+import pytest
+
+from queries import db_pool
+from queries.sql_params import bucket_size, in_list, render_literals, run_bound
+
+
+def test_bucket_sizes():
+    assert [bucket_size(n) for n in (1, 2, 3, 5, 8, 9, 1000, 1024)] == [1, 2, 4, 8, 8, 16, 1024, 1024]
+    assert bucket_size(1025) == 2048
+    assert bucket_size(3000) == 3072
+
+
+def test_in_list_pads_with_the_last_value():
+    sql, params = in_list("id", [7, 3, 9])
+    assert sql == ":id_0, :id_1, :id_2, :id_3"
+    assert params == {"id_0": 7, "id_1": 3, "id_2": 9, "id_3": 9}
+
+    # Every size in a bucket sends the same statement text
+    texts = {in_list("id", range(n))[0] for n in range(5, 9)}
+    assert len(texts) == 1
+
+    with pytest.raises(ValueError):
+        in_list("id", [])
+
+
+def test_render_literals_quotes_values():
+    sql = "SELECT :s, :q, :b, :n, :t, :d, :dt, :f, :np_i"
+    params = {
+        "s": "Auto Loans", "q": "O'Brien \\ Co", "b": True, "n": None, "t": False,
+        "d": date(2025, 6, 30), "dt": datetime(2025, 6, 30, 8, 15), "f": 0.25, "np_i": np.int64(12),
+    }
+    assert render_literals(sql, params) == (
+        "SELECT 'Auto Loans', 'O''Brien \\\\ Co', 1, NULL, 0, "
+        "'2025-06-30', '2025-06-30 08:15:00', 0.25, 12"
+    )
+
+
+def test_render_literals_prefix_collisions():
+    _, ids = in_list("id", range(12))
+    params = dict(ids, id=99, id_1x="unused")
+    sql = "WHERE a = :id AND b IN (:id_1, :id_10, :id_11) AND c = :id_1x AND d = :idx"
+    assert render_literals(sql, params) == (
+        "WHERE a = 99 AND b IN (1, 10, 11) AND c = 'unused' AND d = :idx"
+    )
+
+
+def test_render_literals_leaves_casts_and_inserted_text_alone():
+    params = {"date": "x", "name": ":date"}
+    assert render_literals("SELECT '2025'::date, :name", params) == "SELECT '2025'::date, ':date'"
+    assert render_literals("SELECT 1", {}) == "SELECT 1"
+
+
+def test_run_bound_matches_with_and_without_binds(stats_db):
+    block_ids = sorted(stats_db.rows["keyword_block_id"].unique()[:5])
+    id_list, params = in_list("block_id", [int(b) for b in block_ids])
+    sql = f"""
+        SELECT keyword_block_id, COUNT(*) AS n
+        FROM team_block_stats
+        WHERE keyword_block_id IN ({id_list}) AND partner <> :partner
+        GROUP BY keyword_block_id
+        ORDER BY keyword_block_id
+    """
+    params = dict(params, partner="Partner 0'1")
+
+    bound = run_bound(db_pool.run_query, sql, params)
+    rendered = run_bound(lambda query: db_pool.run_query(query), sql, params)
+
+    assert bound["keyword_block_id"].tolist() == block_ids
+    assert bound.equals(rendered)
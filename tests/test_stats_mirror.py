@@ -0,0 +1,71 @@
+import shutil
+from datetime import date, timedelta
+import pandas as pd
+
+from queries import db_pool, stats_mirror
+
+DAY = date(2025, 6, 30)
+
+
+def _mirror(tmp_path, days, complete_through=None):
+    mirror_dir = str(tmp_path / "mirror")
+    for day in days:
+        rows = pd.DataFrame({"eventDate": [day], "keyword_block_id": [1]})
+        stats_mirror._write_partition(mirror_dir, day, rows)
+    if complete_through is not None:
+        stats_mirror._mark_complete(mirror_dir, complete_through)
+    return mirror_dir
+
+
+def _days(first, last):
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def test_covers_needs_every_date(tmp_path):
+    days = _days(DAY - timedelta(days=9), DAY)
+    mirror_dir = _mirror(tmp_path, [d for d in days if d != DAY - timedelta(days=5)], complete_through=DAY)
+
+    assert stats_mirror.covers(DAY - timedelta(days=4), DAY, mirror_dir)
+    assert not stats_mirror.covers(DAY - timedelta(days=9), DAY, mirror_dir)
+    assert not stats_mirror.covers(DAY - timedelta(days=10), DAY - timedelta(days=6), mirror_dir)
+    assert not stats_mirror.covers(DAY - timedelta(days=4), DAY + timedelta(days=1), mirror_dir)
+
+
+def test_covers_excludes_newest_day_until_marked_complete(tmp_path):
+    mirror_dir = _mirror(tmp_path, _days(DAY - timedelta(days=9), DAY))
+
+    assert stats_mirror.complete_through(mirror_dir) == DAY - timedelta(days=1)
+    assert stats_mirror.covers(DAY - timedelta(days=9), DAY - timedelta(days=1), mirror_dir)
+    assert not stats_mirror.covers(DAY - timedelta(days=9), DAY, mirror_dir)
+
+    stats_mirror._mark_complete(mirror_dir, DAY)
+    assert stats_mirror.covers(DAY - timedelta(days=9), DAY, mirror_dir)
+
+
+def test_covers_empty_mirror(tmp_path):
+    assert not stats_mirror.covers(DAY, DAY, str(tmp_path / "missing"))
+
+
+def test_sync_mirror_marks_days_and_reads_back(stats_db, tmp_path):
+    mirror_dir = str(tmp_path / "mirror")
+    end_date = stats_db.end_date
+
+    summary = stats_mirror.sync_mirror(db_pool.run_query, mirror_dir, run_query_chunks=db_pool.run_query_chunks)
+    assert summary["watermark"] == end_date
+    assert summary["complete_through"] == end_date - timedelta(days=1)
+    assert not stats_mirror.covers(end_date - timedelta(days=6), end_date, mirror_dir)
+
+    # The email job marks the day it alerts on; the watermark day is re-pulled
+    summary = stats_mirror.sync_mirror(db_pool.run_query, mirror_dir, complete_day=end_date)
+    assert summary["dates_written"] == 1
+    assert summary["complete_through"] == end_date
+
+    start_date = end_date - timedelta(days=6)
+    rows = stats_mirror.read_mirror(start_date, end_date, mirror_dir=mirror_dir)
+    expected = stats_db.rows[stats_db.rows["eventDate"].between(start_date, end_date)]
+    assert len(rows) == len(expected)
+    assert rows["eventDate"].between(start_date, end_date).all()
+
+    # A lost partition inside the range sends readers back to the database
+    shutil.rmtree(tmp_path / "mirror" / f"eventDate={(end_date - timedelta(days=3)).isoformat()}")
+    assert stats_mirror.read_mirror(start_date, end_date, mirror_dir=mirror_dir) is None
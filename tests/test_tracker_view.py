@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+
+from queries.block_details import apply_display_days, apply_user_filters
+from queries.tracker_view import build_tracker_view, select_view
+
+END_DATE = date(2025, 6, 30)
+
+
+@pytest.fixture(scope="module")
+def tracker_df():
+    rng = np.random.default_rng(3)
+    rows = []
+    for block_id in range(1, 41):
+        partner = f"Partner {block_id % 4}"
+        # Partner 3 stops reporting five days before the others
+        last = END_DATE - timedelta(days=5) if partner == "Partner 3" else END_DATE
+        for back in range(20):
+            if rng.random() < 0.15:
+                continue
+            rows.append({
+                "Date": last - timedelta(days=back),
+                "Partner": partner,
+                "Block Name": f"Block {block_id % 7}",
+                "Block ID": block_id,
+                "Earnings": float(rng.integers(1, 500)),
+            })
+    return pd.DataFrame(rows).sample(frac=1, random_state=1).reset_index(drop=True)
+
+
+FILTERS = [
+    {},
+    {"partners": ["Partner 1"]},
+    {"partners": ["Partner 3"]},
+    {"partners": ["Partner 0", "Partner 3"], "blocks": ["Block 2", "Block 5"]},
+    {"ids": [3, 7, 11]},
+    {"partners": ["Partner 1"], "ids": [4]},
+    {"partners": ["Partner 9"]},
+]
+
+WINDOWS = [
+    {"days": 1},
+    {"days": 7},
+    {"days": 30},
+    {"date_range": (END_DATE - timedelta(days=10), END_DATE - timedelta(days=4))},
+    {"date_range": (END_DATE - timedelta(days=6),)},
+]
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("filters", FILTERS)
+def test_select_view_matches_filter_then_display_days(tracker_df, filters, window):
+    view = build_tracker_view(tracker_df)
+
+    expected = apply_user_filters(view["df"], filters.get("partners"), filters.get("blocks"), filters.get("ids"))
+    if not expected.empty:
+        expected = apply_display_days(expected, "Date", **window)
+
+    actual = select_view(view, filters.get("partners"), filters.get("blocks"), filters.get("ids"), **window)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_select_view_without_window_keeps_every_date(tracker_df):
+    view = build_tracker_view(tracker_df)
+    actual = select_view(view, ["Partner 2"])
+    pd.testing.assert_frame_equal(actual, apply_user_filters(view["df"], ["Partner 2"]))
+    assert actual["Date"].is_monotonic_decreasing
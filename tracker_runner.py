@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from queries.query_stats import named_query
+
+
+# --------------------------------------------------
+# CONCURRENT TRACKER RUNNER
+# --------------------------------------------------
+# Each tracker is an independent heavy query, so they are submitted together
+# and collected as they finish. Wall time ends up close to the slowest query
+# instead of the sum of all of them.
+
+TRACKER_TIMEOUT = 180
+
+
+def _timed(key, fn):
+    # Queries run by the tracker are recorded under its key (see query_stats)
+    started = time.perf_counter()
+    with named_query(key):
+        result = fn()
+    return result, time.perf_counter() - started
+
+
+def run_trackers(jobs, timeout=TRACKER_TIMEOUT, timeouts=None, max_workers=None, on_result=None, thread_init=None):
+    """
+    Run zero-argument tracker callables concurrently.
+
+    jobs:        {key: callable}
+    timeout:     default per-tracker timeout in seconds (timeouts={key: s} overrides)
+    on_result:   called as on_result(key, result) on the calling thread as each tracker completes
+    thread_init: initializer for worker threads (e.g. to attach a Streamlit script context)
+
+    Returns (results, errors, timings) dicts keyed like `jobs`. A failing or
+    timed-out tracker only lands in `errors`; the others are unaffected.
+    """
+    results, errors, timings = {}, {}, {}
+    if not jobs:
+        return results, errors, timings
+
+    timeouts = timeouts or {}
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers or len(jobs),
+        initializer=thread_init,
+        thread_name_prefix="tracker",
+    )
+
+    started = time.perf_counter()
+    futures = {executor.submit(_timed, key, fn): key for key, fn in jobs.items()}
+    deadlines = {future: started + timeouts.get(key, timeout) for future, key in futures.items()}
+    pending = set(futures)
+
+    try:
+        while pending:
+            next_deadline = min(deadlines[f] for f in pending)
+            done, pending = wait(
+                pending,
+                timeout=max(next_deadline - time.perf_counter(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+
+            for future in done:
+                key = futures[future]
+                try:
+                    result, elapsed = future.result()
+                except Exception as e:
+                    errors[key] = e
+                    timings[key] = time.perf_counter() - started
+                    continue
+
+                results[key] = result
+                timings[key] = elapsed
+                if on_result is not None:
+                    on_result(key, result)
+
+            # A running query cannot be interrupted; it is abandoned and its
+            # connection goes back to the pool once the driver returns.
+            now = time.perf_counter()
+            for future in [f for f in pending if deadlines[f] <= now]:
+                key = futures[future]
+                future.cancel()
+                errors[key] = TimeoutError(f"{key} did not finish within {timeouts.get(key, timeout)}s")
+                timings[key] = now - started
+                pending.discard(future)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, errors, timings
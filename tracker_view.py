@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+
+# --------------------------------------------------
+# INDEXED TRACKER VIEWS
+# --------------------------------------------------
+# The dashboard slices the same four tracker frames ~10 times per rerun
+# (KPIs, tabs, flagged-block lookup). A view keeps the frame sorted by Date
+# (newest first) with a date -> row-range index and one inverted index
+# (value -> row positions) per filter column. A display window is then a
+# contiguous row slice (no copy), and the sidebar filters an intersection of
+# position arrays followed by a single take.
+
+FILTER_COLUMNS = ("Partner", "Block Name", "Block ID")
+
+
+def _inverted_index(values):
+    """{value: sorted row positions} for one column"""
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)}
+
+
+def build_tracker_view(df, date_col="Date"):
+    """Sort a tracker frame by date (keeping the within-day order) and index it"""
+    df = df.sort_values(date_col, ascending=False, kind="stable").reset_index(drop=True)
+
+    dates = df[date_col].to_numpy()
+    if len(dates):
+        new_day = np.r_[True, dates[1:] != dates[:-1]]
+        starts = np.flatnonzero(new_day)
+    else:
+        starts = np.array([], dtype=int)
+
+    return {
+        "df": df,
+        "date_col": date_col,
+        "dates": dates[starts],
+        "starts": starts,
+        "stops": np.r_[starts[1:], len(df)].astype(int),
+        "index": {col: _inverted_index(df[col]) for col in FILTER_COLUMNS if col in df.columns},
+    }
+
+
+def _date_rows(view, days=None, date_range=None, newest=None):
+    """
+    Row range (start, stop) for a display window, same rules as apply_display_days.
+    The last-N-days window counts back from newest (default: the view's newest date).
+    """
+    dates = view["dates"]
+    if not len(dates):
+        return 0, 0
+
+    if date_range is not None and len(date_range) > 0:
+        if len(date_range) == 2:
+            keep = (dates >= date_range[0]) & (dates <= date_range[1])
+        else:
+            keep = dates == date_range[0]
+    elif days:
+        newest = dates[0] if newest is None else newest
+        keep = dates >= newest - pd.Timedelta(days=days - 1)
+    else:
+        return 0, len(view["df"])
+
+    hits = np.flatnonzero(keep)
+    if not len(hits):
+        return 0, 0
+    return view["starts"][hits[0]], view["stops"][hits[-1]]
+
+
+def _filter_positions(view, filters):
+    """Row positions matching every non-empty {column: values} filter, or None when unfiltered"""
+    positions = None
+    for col, values in filters.items():
+        if not values or col not in view["index"]:
+            continue
+
+        index = view["index"][col]
+        hits = [index[v] for v in values if v in index]
+        col_positions = np.unique(np.concatenate(hits)) if hits else np.array([], dtype=int)
+        positions = col_positions if positions is None else np.intersect1d(positions, col_positions, assume_unique=True)
+    return positions
+
+
+def select_view(view, partners=None, blocks=None, ids=None, days=None, date_range=None):
+    """apply_user_filters then apply_display_days on an indexed view (days=None keeps every date)"""
+    positions = _filter_positions(view, {"Partner": partners, "Block Name": blocks, "Block ID": ids})
+
+    if positions is None:
+        start, stop = _date_rows(view, days, date_range)
+        return view["df"].iloc[start:stop]
+    if not len(positions):
+        return view["df"].iloc[0:0]
+
+    # Like apply_display_days on the filtered frame, the last N days end at the
+    # newest filtered date (rows are newest first, so the first position's day)
+    newest = view["dates"][np.searchsorted(view["starts"], positions[0], side="right") - 1]
+    start, stop = _date_rows(view, days, date_range, newest)
+    positions = positions[(positions >= start) & (positions < stop)]
+    return view["df"].take(positions)
@@ -0,0 +1,77 @@
+import os
+import time
+import threading
+from queries.data_watermark import get_watermark
+
+
+# --------------------------------------------------
+# BACKGROUND WARM WORKER
+# --------------------------------------------------
+# One daemon thread per dashboard process polls the eventDate watermark.
+# When it moves, the warm callable precomputes the day's unfiltered tracker
+# results, so the first "Run Tracker" after ingestion is served warm instead
+# of paying every cold query. _status is written by the worker and read from
+# script threads: both sides go through _lock.
+
+WARM_ENABLED = os.environ.get("BLOCK_ALERT_WARM_WORKER", "1") != "0"
+WARM_POLL_SECONDS = int(os.environ.get("BLOCK_ALERT_WARM_POLL_SECONDS", 300))
+
+_thread = None
+_lock = threading.Lock()
+_status = {"warmed": None, "runs": 0, "last_seconds": None, "last_error": None, "last_checked": None}
+
+
+def _warm_loop(warm, poll_seconds):
+    while True:
+        try:
+            watermark = get_watermark()
+            with _lock:
+                _status["last_checked"] = time.time()
+                warmed = _status["warmed"]
+
+            if watermark is not None and watermark != warmed:
+                started = time.perf_counter()
+                errors = warm(watermark) or {}
+                with _lock:
+                    _status.update(
+                        runs=_status["runs"] + 1,
+                        last_seconds=time.perf_counter() - started,
+                        last_error="; ".join(f"{k}: {e}" for k, e in errors.items()) or None,
+                    )
+                    # Anything that failed is retried on the next poll (finished trackers are cache hits)
+                    if not errors:
+                        _status["warmed"] = watermark
+        except Exception as e:
+            with _lock:
+                _status["last_error"] = str(e)
+
+        time.sleep(poll_seconds)
+
+
+def start_warm_worker(warm, poll_seconds=None):
+    """
+    Start the worker once per process; warm(watermark) returns {key: error}
+    for anything that failed. Call it from a st.cache_resource initializer,
+    not on every rerun.
+    """
+    global _thread
+
+    if not WARM_ENABLED:
+        return None
+
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=_warm_loop,
+                args=(warm, poll_seconds or WARM_POLL_SECONDS),
+                name="tracker-warm-worker",
+                daemon=True,
+            )
+            _thread.start()
+    return _thread
+
+
+def warm_status():
+    """Snapshot of the last warmed watermark, run count, duration and error"""
+    with _lock:
+        return dict(_status, alive=_thread is not None and _thread.is_alive())